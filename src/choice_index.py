@@ -0,0 +1,76 @@
+from array import array
+from collections import defaultdict
+from typing import Final, Sequence
+
+
+GRAM: Final[int] = 3 # longest gram indexed, longer queries are checked against their rarest trigram's choices
+RECENT_QUERIES: Final[int] = 64 # results IncrementalFilter keeps, enough to backspace over anything typed
+
+
+class ChoiceIndex:
+    """
+    case insensitive substring filter over a fixed list of choices, results keep the list's order.
+    every 1, 2 and 3 character gram of a choice points at the choices containing it, so a query of up to
+    3 characters is one lookup and a longer one only checks the choices holding its rarest trigram
+    """
+
+    def __init__(self, choices: Sequence[str]):
+        self.choices = tuple(choices)
+        self._lowered = tuple(choice.lower() for choice in self.choices)
+        postings: defaultdict[str, list[int]] = defaultdict(list)
+        for idx, text in enumerate(self._lowered):
+            for gram in {text[start:start + size] for size in range(1, GRAM + 1)
+                         for start in range(len(text) - size + 1)}:
+                postings[gram].append(idx)
+        self._postings: dict[str, Sequence[int]] = {gram: array("I", ids) for gram, ids in postings.items()}
+
+    def __len__(self) -> int:
+        return len(self.choices)
+
+    def candidates(self, query: str) -> tuple[Sequence[int], bool]:
+        # (choices that may match, whether they all do), query has to be lowercase already
+        if query == "":
+            return range(len(self.choices)), True
+        if len(query) <= GRAM:
+            return self._postings.get(query, ()), True
+        return min((self._postings.get(query[start:start + GRAM], ())
+                    for start in range(len(query) - GRAM + 1)), key=len), False
+
+    def search(self, query: str) -> Sequence[int]:
+        query = query.lower()
+        candidates, exact = self.candidates(query)
+        return candidates if exact else self.refine(query, candidates)
+
+    def refine(self, query: str, candidates: Sequence[int]) -> Sequence[int]:
+        # the matches of query among candidates
+        query = query.lower()
+        lowered = self._lowered
+        return array("I", [idx for idx in candidates if query in lowered[idx]])
+
+
+class IncrementalFilter:
+    """
+    keeps the last query's matches. a query that contains the last one can only match a subset of its
+    matches, so those get checked instead of the index whenever there are fewer of them. recent results
+    are kept too so backspacing doesn't filter again
+    """
+
+    def __init__(self, index: ChoiceIndex):
+        self.index = index
+        self.query = ""
+        self.matches: Sequence[int] = index.search("")
+        self._recent: dict[str, Sequence[int]] = {"": self.matches}
+
+    def update(self, query: str) -> Sequence[int]:
+        lowered = query.lower()
+        if (matches := self._recent.get(lowered)) is None:
+            candidates, exact = self.index.candidates(lowered)
+            if self.query in lowered and len(self.matches) < len(candidates):
+                matches = self.index.refine(lowered, self.matches)
+            else:
+                matches = candidates if exact else self.index.refine(lowered, candidates)
+            if len(self._recent) >= RECENT_QUERIES:
+                del self._recent[next(iter(self._recent))]
+            self._recent[lowered] = matches
+        self.query, self.matches = lowered, matches
+        return matches
@@ -0,0 +1,11 @@
+import click
+
+
+# click's styling is used for the non-interactive commands so rich is only imported by the prompts
+def hex_to_rgb(color: str) -> tuple[int, int, int]:
+    red, green, blue = bytes.fromhex(color.removeprefix("#"))
+    return red, green, blue
+
+
+def get_version():
+    click.secho("speedyJ version: 0.0.1 - 1/8/26", fg=hex_to_rgb("#2AF500"))
@@ -1,5 +1,21 @@
-import goal_collection
+import importlib
+from typing import Callable, Final
 
-ARG_OPTS = {
-    "new-goal": goal_collection.create_new_goal
+# "action-target": "module:function", a module is only imported when one of its actions runs.
+# a bare "action" takes the target as its first argument, e.g. speedyj search <terms>
+ARG_OPTS: Final[dict[str, str]] = {
+    "new-goal": "goal_collection:create_new_goal",
+    "get-version": "cli_output:get_version",
+    "import-goals": "goal_import:import_goals",
+    "rebuild-closure": "node_closure:rebuild_closure_command",
+    "show-due": "habit_schedule:show_due_command",
+    "rollover-habits": "habit_schedule:rollover_habits_command",
+    "search": "goal_search:search_command",
 }
+
+
+def resolve_action(key: str) -> Callable|None:
+    if (target := ARG_OPTS.get(key)) is None:
+        return None
+    module, _, func = target.partition(":")
+    return getattr(importlib.import_module(module), func)
@@ -8,3 +8,13 @@ class ClrPal(StrEnum):
     PRP = "#BE19F5"
     YLW = "#EDDB00"
     PNK = "#FF01AE"
+
+
+class ColorScheme(StrEnum):
+    SUCCESS = "#51E000"
+    ERROR = "#B00928"
+    ERROR_2 = "#FF0800"
+    WARNING = "#E0A607"
+    WARNING_2 = "#FFF911"
+    PRIMARY = "#B61E64"
+    SECONDARY = "#086655"
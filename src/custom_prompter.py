@@ -4,6 +4,9 @@ from numbers import Number
 from types import FunctionType, LambdaType
 from color_palette import ClrPal
 from datetime import datetime, date, time 
+from date_parsing import get_parser
+import prompt_io
+from custom_types import PromptValidator
 from typing import Any, Callable, Final, Literal, NamedTuple, NewType, Optional, TextIO, TypedDict
 from rich.live import Live
 from rich.text import Text
@@ -30,10 +33,25 @@ ISO_DATE_FMT: Final[str] = "%Y/%m/%d"
 ISO_DATETIME_FMT: Final[str] = "%Y/%m/%d %H:%M:%S.%f"
 DATE_FMT: Final[str] = "%m/%d/%y"
 DATETIME_FMT: Final[str] = "%m/%d/%y %I:%M %p"
+RATING_RANGE: Final[tuple[int, int]] = (1, 10) # priority, importance and difficulty
 
 
 _console = Console(color_system="truecolor")
 
+
+def is_rating(answer: Any) -> bool:
+    # a whole number in RATING_RANGE, a float only counts when nothing comes after the point
+    if isinstance(answer, bool) or not isinstance(answer, (int, float)):
+        return False
+    low, high = RATING_RANGE
+    return float(answer).is_integer() and low <= answer <= high
+
+
+RATING_VALIDATOR: Final[PromptValidator] = {
+        "func": is_rating,
+        "error_msg": f"{MINOR_ERR_STYLE}answer must be a whole number {RATING_RANGE[0]}-{RATING_RANGE[1]}",
+        "loop_until_correct": True}
+
 @dataclass(slots=False,frozen=True)
 class ErrorMsgs:
     """
@@ -82,17 +100,12 @@ class QuestionSequence(NamedTuple):
     answers: dict[str,Any|None]
 
 def str_to_date(date_str: str, ret_type: type[date|datetime], as_iso: bool=False) -> datetime|date|None:
-    try:
-
-        if ret_type == date:
-            date_obj = datetime.strptime(date_str, DATE_FMT if not as_iso else ISO_DATE_FMT).date()
-        else:
-            date_obj = datetime.strptime(date_str, DATETIME_FMT if not as_iso else ISO_DATETIME_FMT)
-
-    except Exception:
-        return None 
-    else:
-        return date_obj 
+    if not isinstance(date_str, str):
+        return None
+    if ret_type == date:
+        parsed = get_parser(ISO_DATE_FMT if as_iso else DATE_FMT).parse_datetime(date_str)
+        return None if parsed is None else parsed.date()
+    return get_parser(ISO_DATETIME_FMT if as_iso else DATETIME_FMT).parse_datetime(date_str)
 
 
 
@@ -114,7 +127,7 @@ def prompt_date(prompt: str|Text,
         prompt = Text(prompt, style=style).append_text(prefixed_suggestion)
     else:
         prompt = prompt.append_text(prefixed_suggestion)
-    answer = _console.input(prompt)
+    answer = prompt_io.current(_console).input(prompt)
 
     if answer == "now":
         today = datetime.today().strftime(DATETIME_FMT)
@@ -159,7 +172,7 @@ def prompt_numeric(prompt: str,
     else:
         prompt = prompt + ": "
 
-    answer = _console.input(prompt)
+    answer = prompt_io.current(_console).input(prompt)
     if (empty_answer := answer.strip() == "") and not skippable:
         return PromptResult(False,answer,error_msgs.not_skippable)
     elif empty_answer and skippable:
@@ -207,7 +220,7 @@ def prompt_str(prompt: str,
                skippable: bool=False,
                ) -> str|bool:
 
-    answer = _console.input(Text(prompt + ": ", style=style))
+    answer = prompt_io.current(_console).input(Text(prompt + ": ", style=style))
 
     if (empty_answer:=answer.strip()) == "" and not skippable:
         return False
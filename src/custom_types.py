@@ -1,9 +1,9 @@
 import json
 from types import FunctionType
 from typing import Any, NamedTuple, Literal, NewType, Text, TypeAlias, TypedDict, Callable
-from enum import StrEnum
 from datetime import date, datetime, time 
 from dataclasses import dataclass
+from color_palette import ColorScheme # defined there so the cli can color errors without importing this module
 
 
 type QuestionType = Literal["text", "confirm", "select", "print", "search"]
@@ -37,16 +37,6 @@ class Question(TypedDict, total=False):
     validator: PromptValidator
     callback: Callable
 
-class ColorScheme(StrEnum):
-    SUCCESS = "#51E000"
-    ERROR = "#B00928"
-    ERROR_2 = "#FF0800"
-    WARNING = "#E0A607"
-    WARNING_2 = "#FFF911"
-    PRIMARY = "#B61E64"
-    SECONDARY = "#086655"
-
-
 type GID = str
 type Frequency = Literal["daily", "weekly", "monthly"]
 type GoalCompletionType = Literal["binary", "progressive"]
@@ -129,19 +119,32 @@ class GoalNode():
     days_until_due: int
     description: str
     post_completion_info: dict 
-    siblings: list[int]
-    children: list[int]
     priority: int|float=0
     importance: int|float=0
     difficulty: int|float=0
     days_past_due: int=0
     prerequisite: list[int]|None=None
     postrequisite: list[int]|None=None
+    siblings: list[int]|None=None # None until loaded from the node_edges index, see load_siblings
+    children: list[int]|None=None # None until loaded from the node_edges index, see load_children
 
     
 
-    def calculate_score(self):
-        ...
+    def calculate_score(self, conn=None) -> SuccessScore:
+        from scoring import score_node
+        return score_node(self, conn)
+
+
+    def load_children(self, conn) -> list[int]:
+        from goal_tree import children_of
+        self.children = children_of(self.id, conn)
+        return self.children
+
+
+    def load_siblings(self, conn) -> list[int]:
+        from goal_tree import siblings_of
+        self.siblings = siblings_of(self.id, conn)
+        return self.siblings
 
 
     def is_dependent(self):
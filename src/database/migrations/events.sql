@@ -0,0 +1,56 @@
+-- append-only log of everything that happens to a habit or node, the summary tables are derived from it.
+-- rows are clustered on the month they happened in (year * 12 + month - 1), so a date range query only
+-- reads the pages of the months it covers, the same as a partitioned table would. id is the order rows
+-- were appended in, event_log.append_events hands it out and materializers remember how far they've read
+
+CREATE TABLE events(
+  month INTEGER NOT NULL,
+  id INTEGER NOT NULL,
+  day INTEGER NOT NULL, -- days since the unix epoch
+  subject_type TEXT NOT NULL CHECK(subject_type in ("habit", "node")),
+  subject_id INTEGER NOT NULL, -- habits.id or nodes.id
+  kind TEXT NOT NULL CHECK(kind in ("completion", "miss", "status", "time spent")),
+  value REAL, -- seconds for time spent
+  status TEXT, -- the new status for a status change
+  PRIMARY KEY(month, id)
+) WITHOUT ROWID;
+CREATE UNIQUE INDEX events_id ON events(id);
+CREATE INDEX events_subject ON events(subject_type, subject_id, day);
+
+-- how far the log has been appended and how far each materializer has folded it in
+CREATE TABLE event_cursors(
+  name TEXT PRIMARY KEY,
+  position INTEGER NOT NULL
+);
+INSERT INTO event_cursors(name, position) VALUES('appended', 0), ('streaks', 0);
+
+-- per subject and month counts and time spent, kept current by the trigger below
+CREATE TABLE event_months(
+  month INTEGER NOT NULL,
+  kind TEXT NOT NULL,
+  subject_type TEXT NOT NULL,
+  subject_id INTEGER NOT NULL,
+  event_count INTEGER NOT NULL,
+  total_value REAL NOT NULL,
+  PRIMARY KEY(month, kind, subject_type, subject_id)
+) WITHOUT ROWID;
+
+
+CREATE TRIGGER events_no_update BEFORE UPDATE ON events
+BEGIN
+  SELECT RAISE(ABORT, 'events are append-only');
+END;
+
+CREATE TRIGGER events_no_delete BEFORE DELETE ON events
+BEGIN
+  SELECT RAISE(ABORT, 'events are append-only');
+END;
+
+CREATE TRIGGER events_month_totals AFTER INSERT ON events
+BEGIN
+  INSERT INTO event_months(month, kind, subject_type, subject_id, event_count, total_value)
+    VALUES(NEW.month, NEW.kind, NEW.subject_type, NEW.subject_id, 1, coalesce(NEW.value, 0))
+    ON CONFLICT(month, kind, subject_type, subject_id) DO UPDATE SET
+      event_count = event_count + 1,
+      total_value = total_value + excluded.total_value;
+END;
@@ -0,0 +1,12 @@
+-- when each habit is next due. occurrences are schedule_start plus a whole number of periods, month based
+-- frequencies clamp to the last day of short months without drifting off the start's day of month.
+-- habit_schedule.HabitScheduler keeps a heap of next_due_date in memory, the index answers the same
+-- questions from sql. dates are days since the unix epoch, unscheduled habits have NULL in both
+
+ALTER TABLE habits ADD COLUMN frequency_type TEXT NOT NULL DEFAULT 'daily'
+  CHECK(frequency_type = 'daily' OR frequency_type = 'weekly' OR frequency_type = 'monthly'
+        OR frequency_type = 'quarterly' OR frequency_type = 'yearly'); -- not IN, see simplified_goals.sql
+ALTER TABLE habits ADD COLUMN schedule_start INTEGER;
+ALTER TABLE habits ADD COLUMN next_due_date INTEGER;
+
+CREATE INDEX habits_next_due_date ON habits(next_due_date) WHERE next_due_date IS NOT NULL;
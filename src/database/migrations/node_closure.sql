@@ -0,0 +1,131 @@
+-- transitive closure of prerequisite links, one row per connected (ancestor, descendant) pair where the
+-- ancestor is the prerequisite and the descendant the goal it blocks. depth is the length of the shortest
+-- path, there are no (x, x, 0) rows. parent/child ancestry isn't stored, a chain n levels deep would need
+-- n^2/2 rows, goal_tree's recursive queries walk node_edges instead.
+-- nodes.prerequisite stays the source of truth, prerequisite_edges mirrors it so triggers can see single links.
+-- node_closure.rebuild_closure recomputes everything from scratch
+
+CREATE TABLE prerequisite_edges(
+  prerequisite_id INTEGER NOT NULL, -- nodes.id
+  node_id INTEGER NOT NULL, -- nodes.id of the goal that waits on it
+  PRIMARY KEY(prerequisite_id, node_id)
+) WITHOUT ROWID;
+CREATE INDEX prerequisite_edges_node ON prerequisite_edges(node_id, prerequisite_id);
+
+CREATE TABLE node_closure(
+  ancestor INTEGER NOT NULL,
+  descendant INTEGER NOT NULL,
+  depth INTEGER NOT NULL,
+  PRIMARY KEY(ancestor, descendant)
+) WITHOUT ROWID;
+-- covering, without depth in it the planner falls back to scanning the whole table through the primary key
+CREATE INDEX node_closure_descendant ON node_closure(descendant, ancestor, depth);
+
+
+-- backfill, prerequisites that point at missing nodes or the node itself are skipped
+INSERT OR IGNORE INTO prerequisite_edges(prerequisite_id, node_id)
+  SELECT CAST(prereq.value AS INTEGER), nodes.id
+  FROM nodes, json_each(nodes.prerequisite) AS prereq
+  WHERE nodes.prerequisite IS NOT NULL AND json_valid(nodes.prerequisite)
+    AND CAST(prereq.value AS INTEGER) != nodes.id
+    AND EXISTS (SELECT 1 FROM nodes AS p WHERE p.id = CAST(prereq.value AS INTEGER));
+
+-- UNION drops repeated (pair, depth) rows so diamonds don't multiply, the depth cap stops a stored cycle
+INSERT INTO node_closure(ancestor, descendant, depth)
+  WITH RECURSIVE walk(ancestor, descendant, depth) AS (
+    SELECT prerequisite_id, node_id, 1 FROM prerequisite_edges
+    UNION
+    SELECT walk.ancestor, prerequisite_edges.node_id, walk.depth + 1
+    FROM walk JOIN prerequisite_edges ON prerequisite_edges.prerequisite_id = walk.descendant
+    WHERE walk.depth < (SELECT count(*) FROM prerequisite_edges)
+  )
+  SELECT ancestor, descendant, min(depth) FROM walk WHERE ancestor != descendant GROUP BY ancestor, descendant;
+
+
+-- keep prerequisite_edges in step with the json column
+CREATE TRIGGER nodes_prerequisite_insert AFTER INSERT ON nodes
+WHEN NEW.prerequisite IS NOT NULL AND NEW.prerequisite != '[]' AND NOT EXISTS (SELECT 1 FROM bulk_load)
+BEGIN
+  INSERT OR IGNORE INTO prerequisite_edges(prerequisite_id, node_id)
+    SELECT CAST(prereq.value AS INTEGER), NEW.id FROM json_each(NEW.prerequisite) AS prereq
+    WHERE EXISTS (SELECT 1 FROM nodes WHERE id = CAST(prereq.value AS INTEGER));
+END;
+
+CREATE TRIGGER nodes_prerequisite_update AFTER UPDATE OF prerequisite ON nodes
+WHEN OLD.prerequisite IS NOT NEW.prerequisite
+BEGIN
+  DELETE FROM prerequisite_edges WHERE node_id = NEW.id
+    AND prerequisite_id NOT IN (SELECT CAST(value AS INTEGER) FROM json_each(coalesce(NEW.prerequisite, '[]')));
+  INSERT OR IGNORE INTO prerequisite_edges(prerequisite_id, node_id)
+    SELECT CAST(prereq.value AS INTEGER), NEW.id FROM json_each(coalesce(NEW.prerequisite, '[]')) AS prereq
+    WHERE EXISTS (SELECT 1 FROM nodes WHERE id = CAST(prereq.value AS INTEGER));
+END;
+
+CREATE TRIGGER nodes_prerequisite_delete AFTER DELETE ON nodes
+BEGIN
+  DELETE FROM prerequisite_edges WHERE node_id = OLD.id;
+  DELETE FROM prerequisite_edges WHERE prerequisite_id = OLD.id;
+END;
+
+
+-- dependency_graph rejects cycles before writing, this is the backstop for anything that writes the column directly
+CREATE TRIGGER prerequisite_edges_no_cycle BEFORE INSERT ON prerequisite_edges
+BEGIN
+  SELECT RAISE(ABORT, 'prerequisite cycle')
+    WHERE NEW.prerequisite_id = NEW.node_id
+       OR EXISTS (SELECT 1 FROM node_closure
+                  WHERE ancestor = NEW.node_id AND descendant = NEW.prerequisite_id);
+END;
+
+CREATE TRIGGER prerequisite_edges_closure_insert AFTER INSERT ON prerequisite_edges
+BEGIN
+  INSERT INTO node_closure(ancestor, descendant, depth)
+    SELECT a.ancestor, d.descendant, a.depth + 1 + d.depth
+    FROM (SELECT NEW.prerequisite_id AS ancestor, 0 AS depth
+          UNION ALL
+          SELECT ancestor, depth FROM node_closure WHERE descendant = NEW.prerequisite_id) AS a,
+         (SELECT NEW.node_id AS descendant, 0 AS depth
+          UNION ALL
+          SELECT descendant, depth FROM node_closure WHERE ancestor = NEW.node_id) AS d
+    WHERE true
+    ON CONFLICT(ancestor, descendant) DO UPDATE SET depth = min(depth, excluded.depth);
+END;
+
+-- prerequisites form a dag so another path may survive the removed link. every pair from the link's
+-- ancestor side to its descendant side is dropped, then the ones still connected are re-derived: such a
+-- path leaves the ancestor side through some other link u -> v, and the closure rows on either side of
+-- that link didn't go through the removed one
+CREATE TRIGGER prerequisite_edges_closure_delete AFTER DELETE ON prerequisite_edges
+BEGIN
+  DELETE FROM node_closure
+    WHERE ancestor IN (SELECT OLD.prerequisite_id
+                     UNION ALL
+                     SELECT ancestor FROM node_closure WHERE descendant = OLD.prerequisite_id)
+    AND descendant IN (SELECT OLD.node_id
+                       UNION ALL
+                       SELECT descendant FROM node_closure WHERE ancestor = OLD.node_id);
+
+  INSERT INTO node_closure(ancestor, descendant, depth)
+    SELECT a.ancestor, d.descendant, min(a.depth + 1 + d.depth)
+    FROM (SELECT u.id AS ancestor, u.id AS descendant, 0 AS depth
+          FROM (SELECT OLD.prerequisite_id AS id
+                UNION ALL
+                SELECT ancestor FROM node_closure WHERE descendant = OLD.prerequisite_id) AS u
+          UNION ALL
+          SELECT ancestor, descendant, depth FROM node_closure
+          WHERE descendant IN (SELECT OLD.prerequisite_id
+                               UNION ALL
+                               SELECT ancestor FROM node_closure WHERE descendant = OLD.prerequisite_id)) AS a
+    JOIN prerequisite_edges AS link ON link.prerequisite_id = a.descendant
+    JOIN (SELECT v.id AS ancestor, v.id AS descendant, 0 AS depth
+          FROM (SELECT OLD.node_id AS id
+                UNION ALL
+                SELECT descendant FROM node_closure WHERE ancestor = OLD.node_id) AS v
+          UNION ALL
+          SELECT ancestor, descendant, depth FROM node_closure
+          WHERE descendant IN (SELECT OLD.node_id
+                               UNION ALL
+                               SELECT descendant FROM node_closure WHERE ancestor = OLD.node_id)) AS d
+      ON d.ancestor = link.node_id
+    GROUP BY a.ancestor, d.descendant;
+END;
@@ -0,0 +1,51 @@
+-- parent -> child links live here instead of the siblings/children TEXT columns on nodes.
+-- nodes.parent_id stays the source of truth, the triggers below keep this table in step with it
+
+CREATE TABLE node_edges(
+  parent_id INTEGER NOT NULL, -- nodes.id
+  child_id INTEGER NOT NULL, -- nodes.id
+  tree_id INTEGER NOT NULL,
+  PRIMARY KEY(parent_id, child_id)
+) WITHOUT ROWID;
+
+-- a node has at most one parent, WITHOUT ROWID indexes carry the primary key so both lookups are covered
+CREATE UNIQUE INDEX node_edges_child ON node_edges(child_id);
+CREATE INDEX node_edges_tree ON node_edges(tree_id, parent_id, child_id);
+
+
+-- convert existing rows, parent_id wins over anything still listed in a children blob
+INSERT OR IGNORE INTO node_edges(parent_id, child_id, tree_id)
+  SELECT parent_id, id, tree_id FROM nodes WHERE parent_id != 0;
+
+INSERT OR IGNORE INTO node_edges(parent_id, child_id, tree_id)
+  SELECT nodes.id, CAST(child.value AS INTEGER), nodes.tree_id
+  FROM nodes, json_each(nodes.children) AS child
+  WHERE nodes.children IS NOT NULL AND json_valid(nodes.children)
+    AND EXISTS (SELECT 1 FROM nodes AS c WHERE c.id = CAST(child.value AS INTEGER));
+
+UPDATE nodes SET parent_id = (SELECT parent_id FROM node_edges WHERE child_id = nodes.id)
+  WHERE parent_id = 0 AND EXISTS (SELECT 1 FROM node_edges WHERE child_id = nodes.id);
+
+ALTER TABLE nodes DROP COLUMN siblings;
+ALTER TABLE nodes DROP COLUMN children;
+
+
+CREATE TRIGGER nodes_edge_insert AFTER INSERT ON nodes
+WHEN NEW.parent_id != 0 AND NOT EXISTS (SELECT 1 FROM bulk_load)
+BEGIN
+  INSERT INTO node_edges(parent_id, child_id, tree_id) VALUES(NEW.parent_id, NEW.id, NEW.tree_id);
+END;
+
+CREATE TRIGGER nodes_edge_move AFTER UPDATE OF parent_id, tree_id ON nodes
+WHEN OLD.parent_id IS NOT NEW.parent_id OR OLD.tree_id IS NOT NEW.tree_id
+BEGIN
+  DELETE FROM node_edges WHERE child_id = NEW.id;
+  INSERT INTO node_edges(parent_id, child_id, tree_id)
+    SELECT NEW.parent_id, NEW.id, NEW.tree_id WHERE NEW.parent_id != 0;
+END;
+
+CREATE TRIGGER nodes_edge_delete AFTER DELETE ON nodes
+BEGIN
+  DELETE FROM node_edges WHERE child_id = OLD.id;
+  DELETE FROM node_edges WHERE parent_id = OLD.id;
+END;
@@ -0,0 +1,2 @@
+-- siblings are ordered by node_pos, node_ordering.py reads and rebalances ranges of this index
+CREATE INDEX nodes_sibling_order ON nodes(parent_id, node_pos);
@@ -0,0 +1,50 @@
+-- full text index over node intents/descriptions and habit aliases/goals/descriptions, kept in step by
+-- the triggers below. the rowid says where a row came from: nodes.id * 2 for a node, habits.id * 2 + 1 for
+-- a habit, so a change finds its index row by rowid. title is weighted 10x body in the bm25 rank
+CREATE VIRTUAL TABLE search_index USING fts5(
+  title, body, source_type UNINDEXED,
+  tokenize = 'unicode61 remove_diacritics 2',
+  prefix = '2 3' -- extra index entries so prefix queries (as you type) don't scan the whole term list
+);
+INSERT INTO search_index(search_index, rank) VALUES('rank', 'bm25(10.0, 1.0)');
+
+INSERT INTO search_index(rowid, title, body, source_type)
+  SELECT id * 2, intent, coalesce(description, ''), 'node' FROM nodes;
+INSERT INTO search_index(rowid, title, body, source_type)
+  SELECT id * 2 + 1, coalesce(alias || ' ', '') || goal, coalesce(description, ''), 'habit' FROM habits;
+
+
+CREATE TRIGGER nodes_search_insert AFTER INSERT ON nodes
+WHEN NOT EXISTS (SELECT 1 FROM bulk_load)
+BEGIN
+  INSERT INTO search_index(rowid, title, body, source_type)
+    VALUES(NEW.id * 2, NEW.intent, coalesce(NEW.description, ''), 'node');
+END;
+
+CREATE TRIGGER nodes_search_update AFTER UPDATE OF intent, description ON nodes
+BEGIN
+  UPDATE search_index SET title = NEW.intent, body = coalesce(NEW.description, '') WHERE rowid = NEW.id * 2;
+END;
+
+CREATE TRIGGER nodes_search_delete AFTER DELETE ON nodes
+BEGIN
+  DELETE FROM search_index WHERE rowid = OLD.id * 2;
+END;
+
+CREATE TRIGGER habits_search_insert AFTER INSERT ON habits
+WHEN NOT EXISTS (SELECT 1 FROM bulk_load)
+BEGIN
+  INSERT INTO search_index(rowid, title, body, source_type)
+    VALUES(NEW.id * 2 + 1, coalesce(NEW.alias || ' ', '') || NEW.goal, coalesce(NEW.description, ''), 'habit');
+END;
+
+CREATE TRIGGER habits_search_update AFTER UPDATE OF alias, goal, description ON habits
+BEGIN
+  UPDATE search_index SET title = coalesce(NEW.alias || ' ', '') || NEW.goal, body = coalesce(NEW.description, '')
+    WHERE rowid = NEW.id * 2 + 1;
+END;
+
+CREATE TRIGGER habits_search_delete AFTER DELETE ON habits
+BEGIN
+  DELETE FROM search_index WHERE rowid = OLD.id * 2 + 1;
+END;
@@ -10,18 +10,21 @@ CREATE TABLE trees(
   tree_height INTEGER NOT NULL,
   tree_width INTEGER NOT NULL,
   completion_percentage REAL NOT NULL CHECK(completion_percentage >= 0 and completion_percentage <= 100.0)
-)
+);
 
 
+-- the checks on nodes and habits are OR chains rather than IN lists, sqlite builds a temp table for an IN
+-- list every time an insert runs, which more than doubled the cost of a bulk insert
 CREATE TABLE nodes(
   id INTEGER PRIMARY KEY,
   tree_id INTEGER NOT NULL,
   node_id INTEGER NOT NULL,
-  parent_id INTEGER NOT NULL,
+  parent_id INTEGER NOT NULL, -- nodes.id of the parent node, 0 for the root of a tree
   node_pos REAL NOT NULL,
-  goal_type TEXT NOT NULL CHECK(goal_type in ("goal", "task", "recursive task")),
+  goal_type TEXT NOT NULL CHECK(goal_type = 'goal' OR goal_type = 'task' OR goal_type = 'recursive task'),
   goal_info JSON, -- this is where all other arbitrary but relavent info goes 
-  status TEXT NOT NULL CHECK(status in ("complete", "incomplete", "locked", "in progress")) DEFAULT "incomplete",
+  status TEXT NOT NULL CHECK(status = 'complete' OR status = 'incomplete' OR status = 'locked'
+                             OR status = 'in progress') DEFAULT "incomplete",
   prerequisite TEXT,
   postrequisite TEXT,
   intent TEXT NOT NULL,
@@ -36,21 +39,27 @@ CREATE TABLE nodes(
   post_completion_info INTEGER,
   siblings TEXT,
   children TEXT
-)
+);
 
 
 
 CREATE TABLE habits(
   id INTEGER PRIMARY KEY,
+  tree_id INTEGER,
+  node_id INTEGER,
+  parent_id INTEGER,
+  node_pos REAL,
+  alias TEXT,
   goal TEXT NOT NULL,
   priority NUMERIC,
   importance NUMERIC,
   difficulty NUMERIC,
   description TEXT,
-  FOREIGN KEY(parent_id) REFERENCES goals(node_id)
-  FOREIGN KEY(tree_id) REFERENCES goals(tree_id)
+  complete_today INTEGER NOT NULL CHECK(complete_today = 0 OR complete_today = 1) DEFAULT 0,
+  FOREIGN KEY(parent_id) REFERENCES nodes(id),
+  FOREIGN KEY(tree_id) REFERENCES trees(id),
   UNIQUE(node_id)
-)
+);
 
 
 
@@ -59,6 +68,13 @@ CREATE TABLE connections(
   connection_id INTEGER,
   file_type TEXT NOT NULL CHECK(file_type in ("image", "document", "video", "audio")),
   title TEXT NOT NULL,
-  FOREIGN KEY(connection_id) REFERENCES goals(id)
-)
+  FOREIGN KEY(connection_id) REFERENCES nodes(id)
+);
 
+
+
+-- has a row only inside a bulk write (db._write_many), the per row insert triggers of later migrations
+-- skip themselves while it does and the bulk writer does their work once per chunk instead
+CREATE TABLE bulk_load(
+  id INTEGER PRIMARY KEY CHECK(id = 1)
+);
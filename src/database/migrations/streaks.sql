@@ -0,0 +1,23 @@
+-- one row per habit with its streak aggregates, folded forward one completion/miss event at a time by
+-- streaks.fold_event so nothing is recomputed from history. dates are days since the unix epoch.
+-- a run is a stretch of consecutive events of one kind, the last one is still open: it counts toward the
+-- longest streaks as it grows but only enters the shortest/average once a different event closes it
+
+CREATE TABLE streaks(
+  habit_id INTEGER PRIMARY KEY, -- habits.id
+  started_on INTEGER NOT NULL, -- day of the first event
+  last_event INTEGER NOT NULL,
+  last_complete INTEGER,
+  last_incomplete INTEGER,
+  current_kind INTEGER NOT NULL CHECK(current_kind in (0, 1)), -- 1 completion run, 0 miss run
+  current_run INTEGER NOT NULL,
+  longest_completion_streak INTEGER NOT NULL DEFAULT 0,
+  shortest_completion_streak INTEGER, -- NULL until a completion run has closed
+  completion_runs INTEGER NOT NULL DEFAULT 0, -- closed runs only
+  average_completion_streak REAL NOT NULL DEFAULT 0,
+  longest_incompletion_streak INTEGER NOT NULL DEFAULT 0,
+  shortest_incompletion_streak INTEGER,
+  incompletion_runs INTEGER NOT NULL DEFAULT 0,
+  average_incompletion_streak REAL NOT NULL DEFAULT 0,
+  FOREIGN KEY(habit_id) REFERENCES habits(id) ON DELETE CASCADE
+);
@@ -0,0 +1,137 @@
+-- keeps trees.node_count, tree_height, tree_width and completion_percentage current as nodes change.
+-- nodes.tree_id is trees.id, tree_height counts levels (a lone root is 1) and tree_width is the
+-- node count of the widest level. tree_stats.verify_tree_stats recomputes everything from scratch
+
+ALTER TABLE nodes ADD COLUMN depth INTEGER NOT NULL DEFAULT 0; -- 0 for a root, maintained by the triggers below
+ALTER TABLE trees ADD COLUMN complete_count INTEGER NOT NULL DEFAULT 0;
+
+-- how many nodes sit on each level of a tree, height and width fall out of this
+CREATE TABLE tree_levels(
+  tree_id INTEGER NOT NULL,
+  depth INTEGER NOT NULL,
+  node_count INTEGER NOT NULL,
+  PRIMARY KEY(tree_id, depth)
+) WITHOUT ROWID;
+
+
+-- backfill existing rows
+UPDATE nodes SET depth = (
+  WITH RECURSIVE ancestors(id) AS (
+    SELECT parent_id FROM node_edges WHERE child_id = nodes.id
+    UNION ALL
+    SELECT node_edges.parent_id FROM node_edges JOIN ancestors ON node_edges.child_id = ancestors.id
+  )
+  SELECT count(*) FROM ancestors
+);
+
+INSERT INTO tree_levels(tree_id, depth, node_count)
+  SELECT tree_id, depth, count(*) FROM nodes GROUP BY tree_id, depth;
+
+UPDATE trees SET
+  node_count = (SELECT count(*) FROM nodes WHERE tree_id = trees.id),
+  complete_count = (SELECT count(*) FROM nodes WHERE tree_id = trees.id AND status = 'complete'),
+  tree_height = coalesce((SELECT max(depth) + 1 FROM tree_levels WHERE tree_id = trees.id), 0),
+  tree_width = coalesce((SELECT max(node_count) FROM tree_levels WHERE tree_id = trees.id), 0);
+
+UPDATE trees SET completion_percentage = CASE WHEN node_count = 0 THEN 0
+                                              ELSE 100.0 * complete_count / node_count END;
+
+
+CREATE TRIGGER nodes_stats_insert AFTER INSERT ON nodes
+WHEN NOT EXISTS (SELECT 1 FROM bulk_load)
+BEGIN
+  -- db.INSERT_NODE_QUERY sets depth already, the row is only written again for inserts that didn't
+  UPDATE nodes SET depth = coalesce((SELECT depth + 1 FROM nodes WHERE id = NEW.parent_id), 0)
+    WHERE id = NEW.id AND NEW.depth != coalesce((SELECT depth + 1 FROM nodes WHERE id = NEW.parent_id), 0);
+
+  INSERT INTO tree_levels(tree_id, depth, node_count)
+    VALUES(NEW.tree_id, (SELECT depth FROM nodes WHERE id = NEW.id), 1)
+    ON CONFLICT(tree_id, depth) DO UPDATE SET node_count = node_count + 1;
+
+  UPDATE trees SET
+    node_count = node_count + 1,
+    complete_count = complete_count + (NEW.status = 'complete'),
+    completion_percentage = 100.0 * (complete_count + (NEW.status = 'complete')) / (node_count + 1),
+    tree_height = max(tree_height, (SELECT depth + 1 FROM nodes WHERE id = NEW.id)),
+    tree_width = max(tree_width, (SELECT tree_levels.node_count FROM tree_levels
+                                  WHERE tree_levels.tree_id = NEW.tree_id
+                                    AND tree_levels.depth = (SELECT depth FROM nodes WHERE id = NEW.id)))
+    WHERE id = NEW.tree_id;
+END;
+
+
+-- height and width can only shrink here, they are re-read from tree_levels (one row per level, not per node)
+CREATE TRIGGER nodes_stats_delete AFTER DELETE ON nodes
+BEGIN
+  UPDATE tree_levels SET node_count = node_count - 1 WHERE tree_id = OLD.tree_id AND depth = OLD.depth;
+  DELETE FROM tree_levels WHERE tree_id = OLD.tree_id AND depth = OLD.depth AND node_count <= 0;
+
+  UPDATE trees SET
+    node_count = node_count - 1,
+    complete_count = complete_count - (OLD.status = 'complete'),
+    completion_percentage = CASE WHEN node_count - 1 <= 0 THEN 0
+                                 ELSE 100.0 * (complete_count - (OLD.status = 'complete')) / (node_count - 1) END,
+    tree_height = coalesce((SELECT max(depth) + 1 FROM tree_levels WHERE tree_id = OLD.tree_id), 0),
+    tree_width = coalesce((SELECT max(node_count) FROM tree_levels WHERE tree_id = OLD.tree_id), 0)
+    WHERE id = OLD.tree_id;
+END;
+
+
+CREATE TRIGGER nodes_stats_status AFTER UPDATE OF status ON nodes
+WHEN OLD.status IS NOT NEW.status
+BEGIN
+  UPDATE trees SET
+    complete_count = complete_count + (NEW.status = 'complete') - (OLD.status = 'complete'),
+    completion_percentage = CASE WHEN node_count = 0 THEN 0
+                                 ELSE 100.0 * (complete_count + (NEW.status = 'complete') - (OLD.status = 'complete'))
+                                      / node_count END
+    WHERE id = NEW.tree_id;
+END;
+
+
+-- stats are kept per tree and a node's subtree would be left behind in the old one
+CREATE TRIGGER nodes_stats_tree_move BEFORE UPDATE OF tree_id ON nodes
+WHEN OLD.tree_id IS NOT NEW.tree_id
+BEGIN
+  SELECT RAISE(ABORT, 'nodes can not be moved to another tree');
+END;
+
+-- a move shifts the depth of the whole moved subtree, cost is the size of that subtree plus the level count
+CREATE TRIGGER nodes_stats_move AFTER UPDATE OF parent_id ON nodes
+WHEN OLD.parent_id IS NOT NEW.parent_id
+BEGIN
+  UPDATE tree_levels SET node_count = tree_levels.node_count - moved.node_count
+    FROM (SELECT depth, count(*) AS node_count FROM nodes WHERE id IN (
+            WITH RECURSIVE subtree(id) AS (
+              SELECT NEW.id UNION ALL
+              SELECT node_edges.child_id FROM node_edges JOIN subtree ON node_edges.parent_id = subtree.id)
+            SELECT id FROM subtree)
+          GROUP BY depth) AS moved
+    WHERE tree_levels.tree_id = NEW.tree_id AND tree_levels.depth = moved.depth;
+
+  -- NEW.depth is still the pre-move depth, reading it back from nodes would see rows already shifted
+  UPDATE nodes SET depth = depth
+      + coalesce((SELECT depth + 1 FROM nodes WHERE id = NEW.parent_id), 0)
+      - NEW.depth
+    WHERE id IN (
+      WITH RECURSIVE subtree(id) AS (
+        SELECT NEW.id UNION ALL
+        SELECT node_edges.child_id FROM node_edges JOIN subtree ON node_edges.parent_id = subtree.id)
+      SELECT id FROM subtree);
+
+  INSERT INTO tree_levels(tree_id, depth, node_count)
+    SELECT NEW.tree_id, depth, count(*) FROM nodes WHERE id IN (
+      WITH RECURSIVE subtree(id) AS (
+        SELECT NEW.id UNION ALL
+        SELECT node_edges.child_id FROM node_edges JOIN subtree ON node_edges.parent_id = subtree.id)
+      SELECT id FROM subtree)
+    GROUP BY depth
+    ON CONFLICT(tree_id, depth) DO UPDATE SET node_count = node_count + excluded.node_count;
+
+  DELETE FROM tree_levels WHERE tree_id = NEW.tree_id AND node_count <= 0;
+
+  UPDATE trees SET
+    tree_height = coalesce((SELECT max(depth) + 1 FROM tree_levels WHERE tree_id = NEW.tree_id), 0),
+    tree_width = coalesce((SELECT max(node_count) FROM tree_levels WHERE tree_id = NEW.tree_id), 0)
+    WHERE id = NEW.tree_id;
+END;
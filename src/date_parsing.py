@@ -0,0 +1,139 @@
+import re
+from datetime import datetime
+from functools import lru_cache
+from typing import Final, Iterable, NamedTuple
+
+
+PARSE_CACHE_SIZE: Final[int] = 4096
+SHAPE_CACHE_SIZE: Final[int] = 256 # garbage input has endless shapes, real dates only a handful
+# strptime directive -> (regex, field), only the directives the format enums actually use
+_DIRECTIVES: Final[dict[str, tuple[str, str]]] = {
+    "d": (r"(\d{1,2}| \d)", "day"), # strptime takes a space padded day too
+    "m": (r"(\d{1,2})", "month"),
+    "y": (r"(\d{2})", "short_year"),
+    "Y": (r"(\d{4})", "year"),
+    "H": (r"(\d{1,2})", "hour"),
+    "I": (r"(\d{1,2})", "hour12"),
+    "M": (r"(\d{1,2})", "minute"),
+    "S": (r"(\d{1,2})", "second"),
+    "f": (r"(\d{1,6})", "microsecond"),
+    "p": (r"(am|pm)", "ampm"),
+}
+_DIGITS_TO_NINES: Final[dict[int, str]] = str.maketrans("0123456789", "9999999999")
+
+
+class CompiledFormat(NamedTuple):
+    fmt: str
+    regex: re.Pattern
+    fields: tuple[str, ...]
+
+
+def compile_format(fmt: str) -> CompiledFormat:
+    pattern = []
+    fields = []
+    chars = iter(fmt)
+    for char in chars:
+        if char == "%":
+            directive = next(chars, "")
+            if directive == "%":
+                pattern.append("%")
+                continue
+            if directive not in _DIRECTIVES:
+                raise ValueError(f"unsupported directive %{directive} in {fmt!r}")
+            regex, field = _DIRECTIVES[directive]
+            pattern.append(regex)
+            fields.append(field)
+        elif char.isspace():
+            pattern.append(r"\s+") # same as strptime, any run of whitespace
+        else:
+            pattern.append(re.escape(char))
+    return CompiledFormat(fmt, re.compile("".join(pattern), re.IGNORECASE), tuple(fields))
+
+
+def _build(compiled: CompiledFormat, groups: tuple[str, ...]) -> datetime|None:
+    # defaults match strptime, fields a format doesn't have come out as 1900/1/1 00:00
+    year, month, day, hour, minute, second, microsecond = 1900, 1, 1, 0, 0, 0, 0
+    pm = None
+    for field, value in zip(compiled.fields, groups):
+        match field:
+            case "day":
+                day = int(value)
+            case "month":
+                month = int(value)
+            case "year":
+                year = int(value)
+            case "short_year":
+                year = int(value)
+                year += 1900 if year >= 69 else 2000 # strptime's pivot
+            case "hour":
+                hour = int(value)
+            case "hour12":
+                hour = int(value)
+                if not 1 <= hour <= 12:
+                    return None
+            case "minute":
+                minute = int(value)
+            case "second":
+                second = int(value)
+            case "microsecond":
+                microsecond = int(value.ljust(6, "0"))
+            case "ampm":
+                pm = value.lower() == "pm"
+    if "hour12" in compiled.fields:
+        hour = hour % 12 + (12 if pm else 0) # without %p strptime reads 12 as midnight too
+    try:
+        return datetime(year, month, day, hour, minute, second, microsecond)
+    except ValueError:
+        return None
+
+
+class DateParser:
+    """
+    parses strings against a fixed, ordered set of strptime formats.
+    inputs are dispatched on their shape (digits -> 9, letters lowercased) so only the formats that can
+    match that shape are tried, in the order they were given. recently parsed strings are cached
+    """
+
+    def __init__(self, formats: Iterable[str], cache_size: int=PARSE_CACHE_SIZE):
+        self.formats = tuple(compile_format(str(fmt)) for fmt in formats)
+        self._by_shape = lru_cache(maxsize=SHAPE_CACHE_SIZE)(self._formats_for_shape)
+        self.parse = lru_cache(maxsize=cache_size)(self._parse)
+
+    def _formats_for_shape(self, shape: str) -> tuple[CompiledFormat, ...]:
+        return tuple(compiled for compiled in self.formats if compiled.regex.fullmatch(shape))
+
+    def _candidates(self, value: str) -> tuple[CompiledFormat, ...]:
+        return self._by_shape(value.lower().translate(_DIGITS_TO_NINES))
+
+    def _parse(self, value: str) -> tuple[str, datetime]|None:
+        # returns (format, datetime) for the first format that parses, like a strptime loop would.
+        # not stripped, strptime refuses surrounding whitespace
+        for compiled in self._candidates(value):
+            if (match := compiled.regex.fullmatch(value)) is not None:
+                if (parsed := _build(compiled, match.groups())) is not None:
+                    return compiled.fmt, parsed
+        return None
+
+    def parse_datetime(self, value: str) -> datetime|None:
+        return None if (result := self.parse(value)) is None else result[1]
+
+    def find_format(self, value: str) -> str|None:
+        return None if (result := self.parse(value)) is None else result[0]
+
+
+_parsers: dict[tuple[str, ...], DateParser] = {}
+
+
+def get_parser(*formats: str) -> DateParser:
+    # parsers are compiled once per distinct format set and shared
+    key = tuple(str(fmt) for fmt in formats)
+    if (parser := _parsers.get(key)) is None:
+        parser = _parsers[key] = DateParser(key)
+    return parser
+
+
+def strptime(value: str, fmt: str) -> datetime:
+    # drop in for datetime.strptime on the supported directives
+    if (parsed := get_parser(fmt).parse_datetime(value)) is None:
+        raise ValueError(f"time data {value!r} does not match format {fmt!r}")
+    return parsed
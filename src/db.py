@@ -1,38 +1,533 @@
-from platform import java_ver
-import sqlite3 as sqlite
-from typing import Any, Callable
+import json
+import os
+import queue
+import threading
+from contextlib import contextmanager
+from datetime import date, timedelta
+from itertools import count, islice
+from pathlib import Path
+from time import perf_counter
+from typing import Any, Callable, Final, Iterable, Iterator, NamedTuple
+from sqlcipher3 import dbapi2 as sqlite
+from custom_types import GoalID, GoalNode, Habit
 
 
-def connect_to_db(password: str):
-    conn = sqlite.connect("db")
-    return conn
+DB_DIR: Final[Path] = Path(__file__).parent / "database"
+DATABASES: Final[dict[str, Path|str]] = {"main": DB_DIR / "user_data.db"}
+MIGRATIONS_DIR: Final[Path] = DB_DIR / "migrations"
+# applied in order, PRAGMA user_version is the index of the last one applied
+MIGRATIONS: Final[tuple[str, ...]] = ("simplified_goals.sql", "node_edges.sql", "tree_stats.sql",
+                                      "node_ordering.sql", "node_closure.sql", "streaks.sql",
+                                      "habit_schedule.sql", "events.sql", "search.sql")
+DB_KEY_ENV: Final[str] = "SPEEDYJ_DB_KEY"
+POOL_SIZE: Final[int] = 4
+STATEMENT_CACHE_SIZE: Final[int] = 256
+BULK_CHUNK_SIZE: Final[int] = 5000
+# page cache while a bulk write runs, the default 2MB keeps evicting index pages that sqlcipher then has to
+# decrypt again on the next insert
+BULK_CACHE_KIB: Final[int] = 32 * 1024
+SELECT_BATCH_SIZE: Final[int] = 1000
+# applied once per connection right after the key, order matters for journal_mode
+DEFAULT_PRAGMAS: Final[tuple[tuple[str, str], ...]] = (
+        ("journal_mode", "WAL"),
+        ("synchronous", "NORMAL"),
+        ("foreign_keys", "ON"),
+        ("temp_store", "MEMORY"),
+        )
 
-def db_connection(db: str="main"):
-    ...
 
-def db_select(query: str, return_type: type, data_converter: Callable,
-              conn: sqlite.Connection):
-    ...
+class ConnectionTiming(NamedTuple):
+    open_secs: float
+    key_secs: float # PRAGMA key + the first read, which is where sqlcipher runs PBKDF2 on an existing db
+    pragma_secs: float # on a brand new db the key derivation lands here instead (first write)
 
-def db_insert(query: str, data: Any, conn: sqlite.Connection):
-    ...
 
+def _quote_key(password: str) -> str:
+    # PRAGMA statements can't take bound parameters
+    return "'" + password.replace("'", "''") + "'"
 
-def db_update(query: str, data: Any, conn: sqlite.Connection):
-    ...
 
+def connect_to_db(password: str, path: Path|str=DATABASES["main"]) -> tuple[sqlite.Connection, ConnectionTiming]:
+    start = perf_counter()
+    conn = sqlite.connect(path,
+                          check_same_thread=False,
+                          cached_statements=STATEMENT_CACHE_SIZE,
+                          isolation_level=None) # transactions are managed explicitly, see transaction()
+    opened = perf_counter()
+    conn.execute(f"PRAGMA key = {_quote_key(password)}")
+    conn.execute("SELECT count(*) FROM sqlite_master").fetchone()
+    keyed = perf_counter()
+    for pragma, value in DEFAULT_PRAGMAS:
+        conn.execute(f"PRAGMA {pragma} = {value}")
+    done = perf_counter()
+    return conn, ConnectionTiming(opened - start, keyed - opened, done - keyed)
 
 
-def db_delete(query: str, data: Any, conn: sqlite.Connection):
-    ...
+class ConnectionPool:
+    """
+    keeps up to `size` keyed connections to one database open for the life of the process,
+    connections are only opened (and pay for key derivation) the first time they're needed
+    """
+
+    def __init__(self, path: Path|str, password: str, size: int=POOL_SIZE):
+        if size < 1:
+            raise ValueError("pool size must be at least 1")
+        if str(path) == ":memory:":
+            size = 1 # every :memory: connection is its own database
+        self.path = path
+        self.size = size
+        self.timings: list[ConnectionTiming] = []
+        self._password = password
+        self._idle: queue.LifoQueue[sqlite.Connection] = queue.LifoQueue()
+        self._opened: list[sqlite.Connection] = []
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def _open(self) -> sqlite.Connection:
+        conn, timing = connect_to_db(self._password, self.path)
+        self.timings.append(timing)
+        self._opened.append(conn)
+        return conn
+
+    def acquire(self, timeout: float|None=None) -> sqlite.Connection:
+        if self._closed:
+            raise RuntimeError(f"connection pool for {self.path} is closed")
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if len(self._opened) < self.size:
+                return self._open()
+        return self._idle.get(timeout=timeout)
+
+    def release(self, conn: sqlite.Connection):
+        if conn.in_transaction:
+            conn.rollback()
+        self._idle.put(conn)
+
+    @contextmanager
+    def connection(self, timeout: float|None=None) -> Iterator[sqlite.Connection]:
+        conn = self.acquire(timeout)
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            for conn in self._opened:
+                conn.close()
+            self._opened.clear()
+
+
+_pools: dict[str, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db: str="main", password: str|None=None, size: int=POOL_SIZE) -> ConnectionPool:
+    with _pools_lock:
+        if (pool := _pools.get(db)) is not None:
+            return pool
+        if db not in DATABASES:
+            raise KeyError(f"unknown database '{db}' valid options are {list(DATABASES)}")
+        if password is None and (password := os.environ.get(DB_KEY_ENV)) is None:
+            raise RuntimeError(f"no password given for '{db}' and {DB_KEY_ENV} is not set")
+        pool = ConnectionPool(DATABASES[db], password, size)
+        # the schema is brought up to date once per database, in the same open every later connection reuses
+        try:
+            with pool.connection() as conn:
+                run_migrations(conn)
+        except BaseException:
+            pool.close()
+            raise
+        _pools[db] = pool
+        return pool
+
+
+def db_connection(db: str="main", password: str|None=None):
+    # usage: with db_connection() as conn: ...
+    return get_pool(db, password).connection()
+
+
+def connection_stats(db: str="main") -> list[ConnectionTiming]:
+    if (pool := _pools.get(db)) is None:
+        return []
+    return list(pool.timings)
+
+
+def close_pools():
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.close()
+        _pools.clear()
+
+
+_savepoint_ids = count()
+
+
+@contextmanager
+def transaction(conn: sqlite.Connection, mode: str="DEFERRED") -> Iterator[sqlite.Connection]:
+    # nested calls become savepoints so a failing inner block only undoes its own work
+    if conn.in_transaction:
+        savepoint = f"sp_{next(_savepoint_ids)}"
+        conn.execute(f"SAVEPOINT {savepoint}")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute(f"ROLLBACK TO {savepoint}")
+            conn.execute(f"RELEASE {savepoint}")
+            raise
+        else:
+            conn.execute(f"RELEASE {savepoint}")
+        return
+    conn.execute(f"BEGIN {mode}")
+    try:
+        yield conn
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    else:
+        conn.execute("COMMIT")
+
+
+def run_migrations(conn: sqlite.Connection) -> int:
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    for idx, name in enumerate(MIGRATIONS[version:], version + 1):
+        script = (MIGRATIONS_DIR / name).read_text()
+        try:
+            conn.executescript(f"BEGIN;\n{script}\nPRAGMA user_version = {idx};\nCOMMIT;")
+        except sqlite.Error:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+    return len(MIGRATIONS)
+
+
+NODE_COLUMNS: Final[tuple[str, ...]] = (
+        "tree_id", "node_id", "parent_id", "node_pos", "goal_type", "goal_info", "status",
+        "prerequisite", "postrequisite", "intent", "priority", "importance", "difficulty",
+        "start_date", "due_date", "days_past_due", "days_until_due", "description",
+        "post_completion_info")
+HABIT_COLUMNS: Final[tuple[str, ...]] = (
+        "tree_id", "node_id", "node_pos", "alias", "goal", "priority", "difficulty",
+        "description", "complete_today")
+
+# depth (migrations/tree_stats.sql) is filled in from the parent here, so the stats trigger doesn't have to
+# write the row a second time. ?N re-binds the parent_id parameter
+INSERT_NODE_QUERY: Final[str] = (f"INSERT INTO nodes({', '.join(NODE_COLUMNS)}, depth) "
+                                 f"VALUES({', '.join('?' * len(NODE_COLUMNS))}, "
+                                 f"coalesce((SELECT depth + 1 FROM nodes "
+                                 f"WHERE id = ?{NODE_COLUMNS.index('parent_id') + 1}), 0))")
+UPDATE_NODE_QUERY: Final[str] = (f"UPDATE nodes SET {', '.join(f'{col} = ?' for col in NODE_COLUMNS)} "
+                                 "WHERE id = ?")
+INSERT_HABIT_QUERY: Final[str] = (f"INSERT INTO habits({', '.join(HABIT_COLUMNS)}) "
+                                  f"VALUES({', '.join('?' * len(HABIT_COLUMNS))})")
+# row_to_node/row_to_habit expect rows in exactly this column order
+SELECT_NODES_QUERY: Final[str] = f"SELECT id, {', '.join(NODE_COLUMNS)} FROM nodes"
+SELECT_HABITS_QUERY: Final[str] = f"SELECT id, {', '.join(HABIT_COLUMNS)} FROM habits"
+
+
+EPOCH: Final[date] = date(1970, 1, 1)
+
+
+# date columns (start_date, due_date, next_due_date...) hold days since the unix epoch
+def date_to_db(value: date|None) -> int|None:
+    return None if value is None else (value - EPOCH).days
+
+
+def date_from_db(value: int|None) -> date|None:
+    return None if value is None else EPOCH + timedelta(days=value)
+
+
+_json_encode = json.JSONEncoder(separators=(",", ":")).encode
+
+
+def _to_json(value: Any) -> str|None:
+    if value is None:
+        return None
+    if not value: # most nodes have no siblings, prerequisites etc.
+        return "[]" if isinstance(value, list) else "{}"
+    return _json_encode(value)
+
+
+def node_to_row(node: GoalNode) -> tuple:
+    return (node.tree_id, node.node_id, node.parent_id, node.node_pos, node.goal_type,
+            _to_json(node.goal_info), node.status, _to_json(node.prerequisite),
+            _to_json(node.postrequisite), node.intent, node.priority, node.importance,
+            node.difficulty, node.start_date, node.due_date, node.days_past_due,
+            node.days_until_due, node.description, _to_json(node.post_completion_info))
+
+
+def _from_json(text: str|None, default: Any=None) -> Any:
+    if text is None:
+        return default
+    return json.loads(text)
+
+
+def row_to_node(row: tuple) -> GoalNode:
+    (id, tree_id, node_id, parent_id, node_pos, goal_type, goal_info, status, prerequisite,
+     postrequisite, intent, priority, importance, difficulty, start_date, due_date,
+     days_past_due, days_until_due, description, post_completion_info) = row
+    return GoalNode(id, tree_id, node_id, parent_id, node_pos, goal_type,
+                    _from_json(goal_info, {}), status, intent, start_date, due_date,
+                    days_until_due, description, _from_json(post_completion_info, {}),
+                    priority, importance, difficulty, days_past_due, _from_json(prerequisite),
+                    _from_json(postrequisite))
+
+
+def row_to_habit(row: tuple) -> Habit:
+    id, tree_id, node_id, node_pos, alias, goal, priority, difficulty, description, complete_today = row
+    # streak records and requisites aren't stored on the habits row
+    return Habit(GoalID(tree_id, node_id, node_pos, 0.0), alias, goal, description,
+                 None, priority, difficulty, [], [], bool(complete_today)) # pyright: ignore[]
+
+
+def node_to_update_row(node: GoalNode) -> tuple:
+    return node_to_row(node) + (node.id,)
+
+
+def habit_to_row(habit: Habit) -> tuple:
+    return (habit.id.tree_id, habit.id.node_id, habit.id.node_pos, habit.alias, habit.goal,
+            habit.priority, habit.difficulty, habit.description, int(habit.complete_today))
+
+
+# the per row insert triggers on nodes and habits skip themselves while bulk_load has a row, the bulk
+# inserts set it for their transaction and do the same work with these once per chunk. :after is the
+# largest id from before the chunk, so only the chunk's rows are touched
+NODE_BULK_REBUILDS: Final[tuple[str, ...]] = (
+    # nodes_edge_insert
+    """INSERT INTO node_edges(parent_id, child_id, tree_id)
+    SELECT parent_id, id, tree_id FROM nodes WHERE id > :after AND parent_id != 0""",
+    # nodes_stats_insert, INSERT_NODE_QUERY has set depth already
+    """INSERT INTO tree_levels(tree_id, depth, node_count)
+    SELECT tree_id, depth, count(*) FROM nodes WHERE id > :after GROUP BY tree_id, depth
+    ON CONFLICT(tree_id, depth) DO UPDATE SET node_count = node_count + excluded.node_count""",
+    """UPDATE trees SET
+      node_count = trees.node_count + added.node_count,
+      complete_count = trees.complete_count + added.complete_count,
+      completion_percentage = 100.0 * (trees.complete_count + added.complete_count)
+                              / (trees.node_count + added.node_count),
+      tree_height = (SELECT max(depth) + 1 FROM tree_levels WHERE tree_id = trees.id),
+      tree_width = (SELECT max(node_count) FROM tree_levels WHERE tree_id = trees.id)
+    FROM (SELECT tree_id, count(*) AS node_count, sum(status = 'complete') AS complete_count
+          FROM nodes WHERE id > :after GROUP BY tree_id) AS added
+    WHERE trees.id = added.tree_id""",
+    # nodes_prerequisite_insert
+    """INSERT OR IGNORE INTO prerequisite_edges(prerequisite_id, node_id)
+    SELECT CAST(prereq.value AS INTEGER), nodes.id FROM nodes, json_each(nodes.prerequisite) AS prereq
+    WHERE nodes.id > :after AND nodes.prerequisite IS NOT NULL AND nodes.prerequisite != '[]'
+      AND EXISTS (SELECT 1 FROM nodes AS p WHERE p.id = CAST(prereq.value AS INTEGER))""",
+    # nodes_search_insert
+    """INSERT INTO search_index(rowid, title, body, source_type)
+    SELECT id * 2, intent, coalesce(description, ''), 'node' FROM nodes WHERE id > :after""",
+)
+HABIT_BULK_REBUILDS: Final[tuple[str, ...]] = (
+    # habits_search_insert
+    """INSERT INTO search_index(rowid, title, body, source_type)
+    SELECT id * 2 + 1, coalesce(alias || ' ', '') || goal, coalesce(description, ''), 'habit'
+    FROM habits WHERE id > :after""",
+)
+
+
+class BulkRebuild(NamedTuple):
+    table: str # new rows get ids above the largest one, which is how a chunk's rows are found
+    statements: tuple[str, ...]
+
+
+# called with a skipped chunk's records (before row_converter) and the error that failed it
+type FailedChunkHandler = Callable[[list, sqlite.Error], None]
+
+
+class BulkResult(NamedTuple):
+    rows: int
+    chunks: int
+    failed_chunks: int
+    secs: float
+
+
+def _chunked(records: Iterable, size: int) -> Iterator[list]:
+    records = iter(records)
+    while chunk := list(islice(records, size)):
+        yield chunk
+
+
+@contextmanager
+def _bulk_cache(conn: sqlite.Connection) -> Iterator[None]:
+    cache_size = conn.execute("PRAGMA cache_size").fetchone()[0]
+    conn.execute(f"PRAGMA cache_size = -{BULK_CACHE_KIB}")
+    try:
+        yield
+    finally:
+        conn.execute(f"PRAGMA cache_size = {cache_size}")
+
+
+def _write_chunk(query: str, chunk: list, conn: sqlite.Connection, rebuild: BulkRebuild|None) -> int:
+    if rebuild is None:
+        return conn.executemany(query, chunk).rowcount
+    after = conn.execute(f"SELECT coalesce(max(id), 0) FROM {rebuild.table}").fetchone()[0]
+    rows = conn.executemany(query, chunk).rowcount
+    for statement in rebuild.statements:
+        conn.execute(statement, {"after": after})
+    return rows
+
+
+def _write_many(query: str, records: Iterable, conn: sqlite.Connection,
+                row_converter: Callable[[Any], tuple]|None, chunk_size: int,
+                skip_failed_chunks: bool, rebuild: BulkRebuild|None=None,
+                on_failed_chunk: FailedChunkHandler|None=None) -> BulkResult:
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be at least 1")
+    start = perf_counter()
+    rows = chunks = failed_chunks = 0
+    # one transaction for the whole write so there is a single commit (and fsync). chunks only get their own
+    # savepoint when a failed one is skipped, otherwise the whole write rolls back anyway and an open savepoint
+    # makes every statement the triggers run keep its own sub-journal
+    with _bulk_cache(conn), transaction(conn, "IMMEDIATE"):
+        if rebuild is not None:
+            conn.execute("INSERT OR IGNORE INTO bulk_load(id) VALUES(1)")
+        for chunk in _chunked(records, chunk_size):
+            rows_in = chunk if row_converter is None else [row_converter(record) for record in chunk]
+            try:
+                if skip_failed_chunks:
+                    with transaction(conn):
+                        written = _write_chunk(query, rows_in, conn, rebuild)
+                else:
+                    written = _write_chunk(query, rows_in, conn, rebuild)
+            except sqlite.Error as err:
+                if not skip_failed_chunks:
+                    raise
+                failed_chunks += 1
+                if on_failed_chunk is not None:
+                    on_failed_chunk(chunk, err)
+                continue
+            rows += written
+            chunks += 1
+        if rebuild is not None:
+            conn.execute("DELETE FROM bulk_load")
+    return BulkResult(rows, chunks, failed_chunks, perf_counter() - start)
+
+
+_ROW_CONVERTERS: Final[dict[type, Callable[[tuple], Any]|None]] = {
+        GoalNode: row_to_node,
+        Habit: row_to_habit,
+        tuple: None,
+        }
+
+
+def _fetch_batches(query: str, data: Any, conn: sqlite.Connection, batch_size: int) -> Iterator[tuple[list, tuple]]:
+    if batch_size < 1:
+        raise ValueError("batch_size must be at least 1")
+    cursor = conn.execute(query, data)
+    try:
+        while rows := cursor.fetchmany(batch_size):
+            yield rows, cursor.description
+    finally:
+        cursor.close()
+
+
+# lazy, rows are fetched batch_size at a time and only converted as they are consumed.
+# without a conn one is borrowed from the pool until the generator is exhausted or closed
+def db_select(query: str, return_type: type=tuple, data_converter: Callable|None=None,
+              conn: sqlite.Connection|None=None, data: Any=(),
+              batch_size: int=SELECT_BATCH_SIZE) -> Iterator:
+    # not a generator itself so a bad return_type or batch_size raises here instead of on first iteration
+    if data_converter is None:
+        if return_type not in _ROW_CONVERTERS:
+            raise TypeError(f"no row converter for {return_type}, pass a data_converter")
+        data_converter = _ROW_CONVERTERS[return_type]
+    if batch_size < 1:
+        raise ValueError("batch_size must be at least 1")
+    return _select(query, data_converter, conn, data, batch_size)
+
+
+def _select(query: str, data_converter: Callable|None, conn: sqlite.Connection|None, data: Any,
+            batch_size: int) -> Iterator:
+    if conn is None:
+        with db_connection() as conn:
+            yield from _select(query, data_converter, conn, data, batch_size)
+        return
+    for rows, _ in _fetch_batches(query, data, conn, batch_size):
+        if data_converter is None:
+            yield from rows
+        else:
+            yield from map(data_converter, rows)
+
+
+# yields one {column: values} dict per batch for when per row objects aren't needed
+def db_select_columns(query: str, conn: sqlite.Connection|None=None, data: Any=(),
+                      batch_size: int=SELECT_BATCH_SIZE) -> Iterator[dict[str, tuple]]:
+    if conn is None:
+        with db_connection() as conn:
+            yield from db_select_columns(query, conn, data, batch_size)
+        return
+    for rows, description in _fetch_batches(query, data, conn, batch_size):
+        yield dict(zip((column[0] for column in description), zip(*rows)))
+
+def db_insert(query: str, data: Any, conn: sqlite.Connection) -> int|None:
+    with transaction(conn):
+        cursor = conn.execute(query, data)
+    return cursor.lastrowid
+
+
+def db_update(query: str, data: Any, conn: sqlite.Connection) -> int:
+    with transaction(conn):
+        cursor = conn.execute(query, data)
+    return cursor.rowcount
+
+
+
+def db_delete(query: str, data: Any, conn: sqlite.Connection) -> int:
+    with transaction(conn):
+        cursor = conn.execute(query, data)
+    return cursor.rowcount
+
+
+# records can be any iterable or generator, only one chunk is held in memory at a time
+# rebuild switches the per row insert triggers off for the write, its statements have to do their work instead
+def db_insert_many(query: str, records: Iterable, conn: sqlite.Connection,
+                   row_converter: Callable[[Any], tuple]|None=None,
+                   chunk_size: int=BULK_CHUNK_SIZE,
+                   skip_failed_chunks: bool=False,
+                   rebuild: BulkRebuild|None=None,
+                   on_failed_chunk: FailedChunkHandler|None=None) -> BulkResult:
+    return _write_many(query, records, conn, row_converter, chunk_size, skip_failed_chunks, rebuild, on_failed_chunk)
+
+
+def db_update_many(query: str, records: Iterable, conn: sqlite.Connection,
+                   row_converter: Callable[[Any], tuple]|None=None,
+                   chunk_size: int=BULK_CHUNK_SIZE,
+                   skip_failed_chunks: bool=False,
+                   on_failed_chunk: FailedChunkHandler|None=None) -> BulkResult:
+    return _write_many(query, records, conn, row_converter, chunk_size, skip_failed_chunks,
+                       on_failed_chunk=on_failed_chunk)
+
+
+def insert_nodes(nodes: Iterable[GoalNode], conn: sqlite.Connection, chunk_size: int=BULK_CHUNK_SIZE,
+                 skip_failed_chunks: bool=False, on_failed_chunk: FailedChunkHandler|None=None) -> BulkResult:
+    return db_insert_many(INSERT_NODE_QUERY, nodes, conn, node_to_row, chunk_size, skip_failed_chunks,
+                          BulkRebuild("nodes", NODE_BULK_REBUILDS), on_failed_chunk)
+
+
+def update_nodes(nodes: Iterable[GoalNode], conn: sqlite.Connection, chunk_size: int=BULK_CHUNK_SIZE) -> BulkResult:
+    return db_update_many(UPDATE_NODE_QUERY, nodes, conn, node_to_update_row, chunk_size)
+
+
+def insert_habits(habits: Iterable[Habit], conn: sqlite.Connection, chunk_size: int=BULK_CHUNK_SIZE) -> BulkResult:
+    return db_insert_many(INSERT_HABIT_QUERY, habits, conn, habit_to_row, chunk_size,
+                          rebuild=BulkRebuild("habits", HABIT_BULK_REBUILDS))
 
 def main():
-    ...
+    with db_connection() as conn:
+        print(conn.execute("PRAGMA cipher_version").fetchone())
+    for timing in connection_stats():
+        print(f"open: {timing.open_secs * 1000:.2f}ms "
+              f"key derivation: {timing.key_secs * 1000:.2f}ms "
+              f"pragmas: {timing.pragma_secs * 1000:.2f}ms")
 
 
 
 
 if __name__ == "__main__":
     main()
-
-
@@ -0,0 +1,312 @@
+import json
+from collections import defaultdict
+from typing import Callable, Final, Iterable, Iterator, NamedTuple
+from sqlcipher3 import dbapi2 as sqlite
+from db import db_select, transaction
+
+
+DEPENDENCIES_QUERY: Final[str] = "SELECT id, status, prerequisite FROM nodes"
+STATUS_QUERY: Final[str] = "SELECT id, status FROM nodes WHERE id = ?"
+# links are merged into and taken out of the stored json lists, so links the graph hasn't loaded are kept.
+# the ids to add or remove are bound as a json list
+_ADD_IDS: Final[str] = """(SELECT json_group_array(value) FROM (
+  SELECT value FROM json_each(CASE WHEN json_valid(nodes.{0}) THEN nodes.{0} END)
+  UNION SELECT value FROM json_each(?) ORDER BY value))"""
+_REMOVE_IDS: Final[str] = """(SELECT json_group_array(value)
+  FROM json_each(CASE WHEN json_valid(nodes.{0}) THEN nodes.{0} END)
+  WHERE value NOT IN (SELECT value FROM json_each(?)))"""
+ADD_PREREQUISITES_QUERY: Final[str] = (f"UPDATE nodes SET prerequisite = {_ADD_IDS.format('prerequisite')} "
+                                       "WHERE id = ?")
+ADD_POSTREQUISITES_QUERY: Final[str] = (f"UPDATE nodes SET postrequisite = {_ADD_IDS.format('postrequisite')} "
+                                        "WHERE id = ?")
+REMOVE_PREREQUISITES_QUERY: Final[str] = (f"UPDATE nodes SET prerequisite = {_REMOVE_IDS.format('prerequisite')} "
+                                          "WHERE id = ?")
+REMOVE_POSTREQUISITES_QUERY: Final[str] = (f"UPDATE nodes SET postrequisite = {_REMOVE_IDS.format('postrequisite')} "
+                                           "WHERE id = ?")
+SET_STATUS_QUERY: Final[str] = "UPDATE nodes SET status = ? WHERE id = ?"
+# only goals that haven't been started get locked, in progress work is left alone
+LOCK_QUERY: Final[str] = "UPDATE nodes SET status = 'locked' WHERE id = ? AND status = 'incomplete'"
+UNLOCK_QUERY: Final[str] = "UPDATE nodes SET status = 'incomplete' WHERE id = ? AND status = 'locked'"
+
+
+class LockChanges(NamedTuple):
+    locked: list[int]
+    unlocked: list[int]
+
+
+def strongly_connected(starts: Iterable[int], successors: Callable[[int], set[int]]) -> list[list[int]]:
+    """
+    tarjan's algorithm, iterative, over only what's reachable from starts.
+    returns the components that contain a cycle
+    """
+    index: dict[int, int] = {}
+    low: dict[int, int] = {}
+    stack: list[int] = []
+    on_stack: set[int] = set()
+    cycles = []
+    for start in starts:
+        if start in index:
+            continue
+        index[start] = low[start] = len(index)
+        stack.append(start)
+        on_stack.add(start)
+        work = [(start, iter(successors(start)))]
+        while work:
+            node, children = work[-1]
+            for child in children:
+                if child not in index:
+                    index[child] = low[child] = len(index)
+                    stack.append(child)
+                    on_stack.add(child)
+                    work.append((child, iter(successors(child))))
+                    break
+                if child in on_stack:
+                    low[node] = min(low[node], index[child])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    low[parent] = min(low[parent], low[node])
+                if low[node] == index[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.append(member)
+                        if member == node:
+                            break
+                    if len(component) > 1 or node in successors(node):
+                        cycles.append(component)
+    return cycles
+
+
+class DependencyGraph:
+    """
+    prerequisite edges across every tree. a node is blocked while any of its prerequisites isn't complete,
+    blocked counts are kept per node so completing or reopening a goal only touches its direct dependents
+    """
+
+    def __init__(self):
+        self.prerequisites: defaultdict[int, set[int]] = defaultdict(set)
+        self.dependents: defaultdict[int, set[int]] = defaultdict(set)
+        self.incomplete: set[int] = set()
+        self.known: set[int] = set()
+        self.blocked: dict[int, int] = {} # node -> how many of its prerequisites are incomplete
+
+    def add_node(self, node_id: int, complete: bool=False):
+        if node_id in self.known:
+            return
+        self.known.add(node_id)
+        if not complete:
+            self.incomplete.add(node_id)
+
+    def is_complete(self, node_id: int) -> bool:
+        return node_id in self.known and node_id not in self.incomplete
+
+    def is_locked(self, node_id: int) -> bool:
+        return node_id in self.blocked and node_id in self.incomplete
+
+    def actionable(self) -> set[int]:
+        return {node_id for node_id in self.incomplete if node_id not in self.blocked}
+
+    def unlocks(self, node_id: int) -> list[int]:
+        # what completing node_id would unlock, without completing it
+        if node_id not in self.incomplete:
+            return []
+        return [dependent for dependent in self.dependents.get(node_id, ()) if self.blocked.get(dependent) == 1]
+
+    def find_cycles(self, node_id: int, new_prerequisites: Iterable[int]) -> list[list[int]]:
+        # a new cycle has to run through node_id, so only what depends on node_id gets searched
+        new = set(new_prerequisites)
+        def successors(node: int) -> set[int]:
+            dependents = self.dependents.get(node, set())
+            return dependents | {node_id} if node in new else dependents
+        return strongly_connected([node_id], successors)
+
+    def _block(self, node_id: int, count: int) -> LockChanges:
+        before = self.is_locked(node_id)
+        total = self.blocked.get(node_id, 0) + count
+        if total > 0:
+            self.blocked[node_id] = total
+        else:
+            self.blocked.pop(node_id, None)
+        after = self.is_locked(node_id)
+        if before == after:
+            return LockChanges([], [])
+        return LockChanges([node_id], []) if after else LockChanges([], [node_id])
+
+    def add_prerequisites(self, node_id: int, prerequisite_ids: Iterable[int]) -> LockChanges:
+        new = [prereq for prereq in set(prerequisite_ids) if prereq not in self.prerequisites.get(node_id, ())]
+        if cycles := self.find_cycles(node_id, new):
+            raise ValueError(f"prerequisites of {node_id} would create a cycle through {sorted(cycles[0])}")
+        for prereq in new:
+            self.add_node(prereq)
+            self.prerequisites[node_id].add(prereq)
+            self.dependents[prereq].add(node_id)
+        self.add_node(node_id)
+        return self._block(node_id, sum(prereq in self.incomplete for prereq in new))
+
+    def remove_prerequisites(self, node_id: int, prerequisite_ids: Iterable[int]) -> LockChanges:
+        removed = [prereq for prereq in set(prerequisite_ids) if prereq in self.prerequisites.get(node_id, ())]
+        for prereq in removed:
+            self.prerequisites[node_id].discard(prereq)
+            self.dependents[prereq].discard(node_id)
+        return self._block(node_id, -sum(prereq in self.incomplete for prereq in removed))
+
+    def set_complete(self, node_id: int, complete: bool) -> LockChanges:
+        # completing unblocks direct dependents, reopening blocks them again
+        self.add_node(node_id, complete)
+        if complete == self.is_complete(node_id):
+            return LockChanges([], [])
+        locked, unlocked = [], []
+        was_locked = self.is_locked(node_id)
+        if complete:
+            self.incomplete.discard(node_id)
+        else:
+            self.incomplete.add(node_id)
+        if was_locked != self.is_locked(node_id):
+            (unlocked if was_locked else locked).append(node_id)
+        for dependent in self.dependents.get(node_id, ()):
+            changes = self._block(dependent, -1 if complete else 1)
+            locked.extend(changes.locked)
+            unlocked.extend(changes.unlocked)
+        return LockChanges(locked, unlocked)
+
+    def remove_node(self, node_id: int) -> LockChanges:
+        # a deleted node stops blocking anything
+        changes = self.set_complete(node_id, True)
+        self.remove_prerequisites(node_id, list(self.prerequisites.get(node_id, ())))
+        for dependent in self.dependents.pop(node_id, set()):
+            self.prerequisites[dependent].discard(node_id)
+        self.prerequisites.pop(node_id, None)
+        self.blocked.pop(node_id, None)
+        self.known.discard(node_id)
+        return LockChanges([node for node in changes.locked if node != node_id],
+                           [node for node in changes.unlocked if node != node_id])
+
+
+def _requisites(text: str|None) -> list[int]:
+    return json.loads(text) if text else []
+
+
+def load_dependencies(conn: sqlite.Connection) -> DependencyGraph:
+    """
+    one pass over nodes, prerequisites that point at deleted nodes are dropped. raises ValueError if the
+    stored prerequisites already contain a cycle
+    """
+    graph = DependencyGraph()
+    edges: list[tuple[int, list[int]]] = []
+    for node_id, status, prerequisite in db_select(DEPENDENCIES_QUERY, conn=conn):
+        graph.add_node(node_id, status == "complete")
+        if prereqs := _requisites(prerequisite):
+            edges.append((node_id, prereqs))
+    for node_id, prereqs in edges:
+        for prereq in prereqs:
+            if prereq in graph.known:
+                graph.prerequisites[node_id].add(prereq)
+                graph.dependents[prereq].add(node_id)
+        if count := sum(prereq in graph.incomplete for prereq in graph.prerequisites[node_id]):
+            graph.blocked[node_id] = count
+    if cycles := strongly_connected(list(graph.prerequisites), lambda node: graph.dependents.get(node, set())):
+        raise ValueError(f"stored prerequisites contain a cycle through {sorted(cycles[0])}")
+    return graph
+
+
+def _write_locks(changes: LockChanges, conn: sqlite.Connection):
+    conn.executemany(LOCK_QUERY, ((node_id,) for node_id in changes.locked))
+    conn.executemany(UNLOCK_QUERY, ((node_id,) for node_id in changes.unlocked))
+
+
+def _write_requisites(node_id: int, prerequisite_ids: list[int], conn: sqlite.Connection, add: bool):
+    prerequisites, postrequisites = ((ADD_PREREQUISITES_QUERY, ADD_POSTREQUISITES_QUERY) if add else
+                                     (REMOVE_PREREQUISITES_QUERY, REMOVE_POSTREQUISITES_QUERY))
+    conn.execute(prerequisites, (json.dumps(prerequisite_ids), node_id))
+    conn.executemany(postrequisites, ((json.dumps([node_id]), prereq) for prereq in prerequisite_ids))
+
+
+def _ensure_known(graph: DependencyGraph, node_ids: Iterable[int], conn: sqlite.Connection):
+    for node_id in node_ids:
+        if node_id not in graph.known:
+            if (row := conn.execute(STATUS_QUERY, (node_id,)).fetchone()) is None:
+                raise KeyError(f"no node with id {node_id}")
+            graph.add_node(node_id, row[1] == "complete")
+
+
+def reconcile_locks(graph: DependencyGraph, conn: sqlite.Connection) -> int:
+    # brings every status in line with the graph, for rows written before the graph existed
+    with transaction(conn, "IMMEDIATE"):
+        locked = conn.executemany(LOCK_QUERY, ((node_id,) for node_id in graph.blocked
+                                               if node_id in graph.incomplete)).rowcount
+        stale = [row[0] for row in conn.execute("SELECT id FROM nodes WHERE status = 'locked'")
+                 if not graph.is_locked(row[0])]
+        conn.executemany(UNLOCK_QUERY, ((node_id,) for node_id in stale))
+    return locked + len(stale)
+
+
+def add_prerequisites(graph: DependencyGraph, node_id: int, prerequisite_ids: Iterable[int],
+                      conn: sqlite.Connection) -> LockChanges:
+    # only the new links are rolled back if the write fails
+    new = [prereq for prereq in set(prerequisite_ids) if prereq not in graph.prerequisites.get(node_id, ())]
+    with transaction(conn, "IMMEDIATE"):
+        _ensure_known(graph, [node_id, *new], conn)
+        changes = graph.add_prerequisites(node_id, new)
+        try:
+            _write_requisites(node_id, new, conn, add=True)
+            _write_locks(changes, conn)
+        except BaseException:
+            graph.remove_prerequisites(node_id, new)
+            raise
+    return changes
+
+
+def remove_prerequisites(graph: DependencyGraph, node_id: int, prerequisite_ids: Iterable[int],
+                         conn: sqlite.Connection) -> LockChanges:
+    prerequisite_ids = [prereq for prereq in prerequisite_ids if prereq in graph.prerequisites.get(node_id, ())]
+    with transaction(conn, "IMMEDIATE"):
+        changes = graph.remove_prerequisites(node_id, prerequisite_ids)
+        try:
+            _write_requisites(node_id, prerequisite_ids, conn, add=False)
+            _write_locks(changes, conn)
+        except BaseException:
+            graph.add_prerequisites(node_id, prerequisite_ids)
+            raise
+    return changes
+
+
+def set_status(graph: DependencyGraph, node_id: int, status: str, conn: sqlite.Connection) -> LockChanges:
+    """
+    changes a node's status and locks/unlocks its direct dependents to match. a locked node can only be
+    set back to incomplete (it stays locked), starting or completing it waits on its prerequisites
+    """
+    if status == "locked":
+        raise ValueError("locked is set by the dependency graph, not directly")
+    with transaction(conn, "IMMEDIATE"):
+        _ensure_known(graph, [node_id], conn)
+        if graph.is_locked(node_id) and status != "incomplete":
+            raise ValueError(f"node {node_id} is locked until its prerequisites are complete")
+        was_complete = graph.is_complete(node_id)
+        changes = graph.set_complete(node_id, status == "complete")
+        try:
+            conn.execute(SET_STATUS_QUERY, ("locked" if graph.is_locked(node_id) and status == "incomplete"
+                                            else status, node_id))
+            _write_locks(LockChanges([node for node in changes.locked if node != node_id],
+                                     [node for node in changes.unlocked if node != node_id]), conn)
+        except BaseException:
+            graph.set_complete(node_id, was_complete)
+            raise
+    return changes
+
+
+def complete_goal(graph: DependencyGraph, node_id: int, conn: sqlite.Connection) -> list[int]:
+    # returns the goals this unlocked
+    return set_status(graph, node_id, "complete", conn).unlocked
+
+
+def actionable_nodes(graph: DependencyGraph, conn: sqlite.Connection, tree_id: int|None=None) -> Iterator[int]:
+    if tree_id is None:
+        yield from graph.actionable()
+        return
+    for (node_id,) in db_select("SELECT id FROM nodes WHERE tree_id = ? AND status != 'complete'",
+                                conn=conn, data=(tree_id,)):
+        if node_id in graph.known and not graph.is_locked(node_id):
+            yield node_id
@@ -0,0 +1,162 @@
+from dataclasses import astuple
+from itertools import count
+from typing import Final, Iterable, Iterator, NamedTuple
+from sqlcipher3 import dbapi2 as sqlite
+from db import date_from_db, db_insert_many, transaction
+from streaks import UPSERT_STREAK_QUERY, StreakState, compute_streaks, fold_event, load_streak
+
+
+EVENT_KINDS: Final[tuple[str, ...]] = ("completion", "miss", "status", "time spent")
+SUBJECT_TYPES: Final[tuple[str, ...]] = ("habit", "node")
+EVENT_COLUMNS: Final[tuple[str, ...]] = ("month", "id", "day", "subject_type", "subject_id", "kind",
+                                         "value", "status")
+INSERT_EVENT_QUERY: Final[str] = (f"INSERT INTO events({', '.join(EVENT_COLUMNS)}) "
+                                  f"VALUES({', '.join('?' * len(EVENT_COLUMNS))})")
+CURSOR_QUERY: Final[str] = "SELECT position FROM event_cursors WHERE name = ?"
+SET_CURSOR_QUERY: Final[str] = "UPDATE event_cursors SET position = ? WHERE name = ?"
+# the month bounds let sqlite seek straight to the first matching month and stop after the last one,
+# the day bounds trim the partial months at either end
+RANGE_QUERY: Final[str] = """
+SELECT id, day, subject_type, subject_id, kind, value, status FROM events
+WHERE month BETWEEN :first_month AND :last_month AND day BETWEEN :first_day AND :last_day
+"""
+RANGE_COUNT_QUERY: Final[str] = """
+SELECT count(*) FROM events
+WHERE month BETWEEN :first_month AND :last_month AND day BETWEEN :first_day AND :last_day AND kind = :kind
+"""
+MONTH_TOTALS_QUERY: Final[str] = """
+SELECT month, sum(event_count), sum(total_value) FROM event_months
+WHERE month BETWEEN ? AND ? AND kind = ? GROUP BY month ORDER BY month
+"""
+NEW_STREAK_EVENTS_QUERY: Final[str] = """
+SELECT subject_id, day, kind = 'completion' FROM events
+WHERE id > ? AND +subject_type = 'habit' AND kind IN ('completion', 'miss')
+ORDER BY subject_id, day, id
+"""
+HABIT_STREAK_EVENTS_QUERY: Final[str] = """
+SELECT day, kind = 'completion' FROM events
+WHERE subject_type = 'habit' AND subject_id = ? AND kind IN ('completion', 'miss')
+ORDER BY day, id
+"""
+ALL_STREAK_EVENTS_QUERY: Final[str] = """
+SELECT subject_id, day, kind = 'completion' FROM events
+WHERE subject_type = 'habit' AND kind IN ('completion', 'miss')
+ORDER BY subject_id, day, id
+"""
+
+
+class Event(NamedTuple):
+    subject_type: str
+    subject_id: int
+    kind: str
+    day: int # days since the unix epoch
+    value: float|None=None
+    status: str|None=None
+
+
+class LoggedEvent(NamedTuple):
+    id: int
+    day: int
+    subject_type: str
+    subject_id: int
+    kind: str
+    value: float|None
+    status: str|None
+
+
+def month_of(day: int) -> int:
+    # the partition an event day falls in
+    as_date = date_from_db(day)
+    return as_date.year * 12 + as_date.month - 1 # pyright: ignore[]
+
+
+def _month_bounds(first_day: int, last_day: int) -> dict[str, int]:
+    return {"first_month": month_of(first_day), "last_month": month_of(last_day),
+            "first_day": first_day, "last_day": last_day}
+
+
+def _read_cursor(name: str, conn: sqlite.Connection) -> int:
+    return conn.execute(CURSOR_QUERY, (name,)).fetchone()[0]
+
+
+def append_events(events: Iterable[Event], conn: sqlite.Connection) -> int:
+    """
+    appends the events in one transaction, returns how many were written. ids continue from the last
+    append so materializers can pick up everything after the position they stopped at
+    """
+    with transaction(conn, "IMMEDIATE"):
+        ids = count(_read_cursor("appended", conn) + 1)
+
+        def to_row(event: Event) -> tuple:
+            if event.kind not in EVENT_KINDS:
+                raise ValueError(f"event kind must be one of {', '.join(EVENT_KINDS)}, got {event.kind!r}")
+            if event.subject_type not in SUBJECT_TYPES:
+                raise ValueError(f"subject type must be habit or node, got {event.subject_type!r}")
+            return (month_of(event.day), next(ids), event.day, event.subject_type, event.subject_id,
+                    event.kind, event.value, event.status)
+
+        written = db_insert_many(INSERT_EVENT_QUERY, events, conn, to_row).rows
+        conn.execute(SET_CURSOR_QUERY, (next(ids) - 1, "appended"))
+    return written
+
+
+def events_between(first_day: int, last_day: int, conn: sqlite.Connection) -> Iterator[LoggedEvent]:
+    for row in conn.execute(RANGE_QUERY, _month_bounds(first_day, last_day)):
+        yield LoggedEvent(*row)
+
+
+def count_between(first_day: int, last_day: int, kind: str, conn: sqlite.Connection) -> int:
+    # e.g. completions in Q3, only the months in range are read
+    return conn.execute(RANGE_COUNT_QUERY, _month_bounds(first_day, last_day) | {"kind": kind}).fetchone()[0]
+
+
+def month_totals(first_day: int, last_day: int, kind: str, conn: sqlite.Connection) -> list[tuple[int, int, float]]:
+    # (month, event count, total value) per whole month from event_months, no events are read at all
+    return conn.execute(MONTH_TOTALS_QUERY, (month_of(first_day), month_of(last_day), kind)).fetchall()
+
+
+def _habit_history(habit_id: int, conn: sqlite.Connection) -> StreakState:
+    # a late event landed before the stored last_event, redo the habit from its full history.
+    # when a day has more than one event the last one appended wins
+    days = dict(conn.execute(HABIT_STREAK_EVENTS_QUERY, (habit_id,)).fetchall())
+    return compute_streaks([habit_id] * len(days), list(days), list(days.values()))[0]
+
+
+def materialize_streaks(conn: sqlite.Connection) -> int:
+    """
+    folds completions and misses appended since the last call into the streaks table, returns how many
+    habits changed. habits with an event older than their stored state are recomputed from the log
+    """
+    with transaction(conn, "IMMEDIATE"):
+        position = _read_cursor("streaks", conn)
+        appended = _read_cursor("appended", conn)
+        if position == appended:
+            return 0
+        states: dict[int, StreakState|None] = {}
+        stale: set[int] = set()
+        for habit_id, day, completed in conn.execute(NEW_STREAK_EVENTS_QUERY, (position,)).fetchall():
+            if habit_id in stale:
+                continue
+            state = states[habit_id] if habit_id in states else load_streak(habit_id, conn)
+            if state is not None and day <= state.last_event:
+                stale.add(habit_id)
+                continue
+            states[habit_id] = fold_event(state, habit_id, day, bool(completed))
+        for habit_id in stale:
+            states[habit_id] = _habit_history(habit_id, conn)
+        conn.executemany(UPSERT_STREAK_QUERY, (astuple(state) for state in states.values() if state is not None))
+        conn.execute(SET_CURSOR_QUERY, (appended, "streaks"))
+    return len(states)
+
+
+def rebuild_streaks(conn: sqlite.Connection) -> int:
+    # recomputes every habit's streaks from the whole log, the same duplicate day rule as _habit_history
+    with transaction(conn, "IMMEDIATE"):
+        latest = {(habit_id, day): completed
+                  for habit_id, day, completed in conn.execute(ALL_STREAK_EVENTS_QUERY)}
+        states = compute_streaks([habit_id for habit_id, _ in latest], [day for _, day in latest],
+                                 list(latest.values()))
+        conn.execute("DELETE FROM streaks")
+        conn.executemany(UPSERT_STREAK_QUERY, map(astuple, states))
+        conn.execute(SET_CURSOR_QUERY, (_read_cursor("appended", conn), "streaks"))
+    return len(states)
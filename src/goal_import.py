@@ -0,0 +1,240 @@
+import csv
+import json
+import sys
+from datetime import date, datetime
+from itertools import chain
+from pathlib import Path
+from time import perf_counter
+from typing import Any, Callable, Final, Iterable, Iterator, NamedTuple, TextIO
+import click
+from custom_prompter import RATING_RANGE, RATING_VALIDATOR, str_to_date
+from custom_types import ConfidenceLevel, GoalNode
+from db import BULK_CHUNK_SIZE, date_to_db, db_connection, insert_nodes
+from node_ordering import POSITION_STEP
+
+
+GOAL_TYPES: Final[set[str]] = {"goal", "task", "recursive task"}
+STATUSES: Final[set[str]] = {"complete", "incomplete", "locked", "in progress"}
+# anything else in a record that isn't a nodes column is kept in goal_info
+GOAL_INFO_FIELDS: Final[tuple[str, ...]] = ("alias", "deadline_confidence")
+
+
+class ImportResult(NamedTuple):
+    imported: int
+    rejected: int
+    secs: float
+    reject_file: Path|None
+
+
+class ImportRecord(NamedTuple):
+    line: int
+    data: dict[str, Any]
+
+
+# the same checks the new_goal questions run: the answer type each question expects, the ratings'
+# RATING_VALIDATOR and custom_prompter's str_to_date (MM/DD/YY or ISO YYYY/MM/DD)
+def _text(value: Any) -> str:
+    if not isinstance(value, str) or value.strip() == "":
+        raise ValueError("must be non empty text")
+    return value.strip()
+
+
+def _number(value: Any) -> Any:
+    # csv cells are always text, json numbers are already parsed
+    if not isinstance(value, str):
+        return value
+    try:
+        return int(value)
+    except ValueError:
+        try:
+            return float(value)
+        except ValueError:
+            raise ValueError(f"{value!r} is not a valid datatype, expected a whole number")
+
+
+def _rating(value: Any) -> int:
+    if not RATING_VALIDATOR["func"](number := _number(value)):
+        low, high = RATING_RANGE
+        raise ValueError(f"{value!r} is invalid, answer must be a whole number {low}-{high}")
+    return int(number)
+
+
+def _date(value: Any) -> date:
+    if isinstance(value, date):
+        return value.date() if isinstance(value, datetime) else value
+    if not isinstance(value, str):
+        raise ValueError(f"{value!r} is not a valid date")
+    if (parsed := str_to_date(value, date) or str_to_date(value, date, as_iso=True)) is None:
+        raise ValueError(f"{value!r} is not a valid format, format must be MM/DD/YY or YYYY/MM/DD")
+    return parsed
+
+
+def _choice(choices: set[str]) -> Callable[[Any], str]:
+    def validate(value: Any) -> str:
+        if value not in choices:
+            raise ValueError(f"{value!r} is an invalid choice, options are {sorted(choices)}")
+        return value
+    return validate
+
+
+def _integer(value: Any) -> int:
+    number = _number(value)
+    if isinstance(number, bool) or not isinstance(number, (int, float)) or not float(number).is_integer():
+        raise ValueError(f"{value!r} is not a whole number")
+    return int(number)
+
+
+FIELD_RULES: Final[dict[str, Callable[[Any], Any]]] = {
+    "goal": _text,
+    "alias": _text,
+    "description": str,
+    "priority": _rating,
+    "importance": _rating,
+    "difficulty": _rating,
+    "start_date": _date,
+    "due_date": _date,
+    "deadline_confidence": _choice(ConfidenceLevel),
+    "goal_type": _choice(GOAL_TYPES),
+    "status": _choice(STATUSES),
+    "tree_id": _integer,
+    "parent_id": _integer,
+    "node_id": _integer,
+}
+REQUIRED_FIELDS: Final[tuple[str, ...]] = ("goal", "tree_id")
+
+
+def validate_record(record: dict[str, Any], default_tree_id: int|None=None,
+                    today: date|None=None) -> tuple[GoalNode|None, list[str]]:
+    errors = []
+    clean: dict[str, Any] = {}
+    if default_tree_id is not None:
+        clean["tree_id"] = default_tree_id
+    for field, value in record.items():
+        if (rule := FIELD_RULES.get(field)) is None or value is None or value == "":
+            continue # blank csv cells count as skipped answers
+        try:
+            clean[field] = rule(value)
+        except ValueError as err:
+            errors.append(f"{field}: {err}")
+    errors.extend(f"{field}: is required" for field in REQUIRED_FIELDS if field not in clean and
+                  not any(error.startswith(f"{field}:") for error in errors))
+    if errors:
+        return None, errors
+
+    today = today or date.today()
+    start_date, due_date = clean.get("start_date"), clean.get("due_date")
+    if start_date is not None and due_date is not None and due_date < start_date:
+        return None, ["due_date: is before start_date"]
+    days_until_due = (due_date - today).days if due_date is not None else 0
+    node = GoalNode(id=0, tree_id=clean["tree_id"], node_id=clean.get("node_id", 0),
+                    parent_id=clean.get("parent_id", 0), node_pos=0.0,
+                    goal_type=clean.get("goal_type", "goal"),
+                    goal_info={field: clean[field] for field in GOAL_INFO_FIELDS if field in clean},
+                    status=clean.get("status", "incomplete"), intent=clean["goal"],
+                    start_date=date_to_db(start_date), due_date=date_to_db(due_date), # pyright: ignore[]
+                    days_until_due=max(days_until_due, 0), description=clean.get("description", ""),
+                    post_completion_info={}, priority=clean.get("priority", 0),
+                    importance=clean.get("importance", 0), difficulty=clean.get("difficulty", 0),
+                    days_past_due=max(-days_until_due, 0))
+    return node, []
+
+
+def _sniff_format(lines: Iterator[str], name: str) -> tuple[str, Iterator[str]]:
+    suffix = Path(name).suffix.lower()
+    if suffix in (".ndjson", ".jsonl"):
+        return "ndjson", lines
+    if suffix in (".json", ".csv"):
+        return suffix[1:], lines
+    # stdin or an unknown extension, peek at the first non blank line without losing it
+    peeked = []
+    for line in lines:
+        peeked.append(line)
+        if line.strip():
+            break
+    head = "".join(peeked).lstrip()[:1]
+    return {"[": "json", "{": "ndjson"}.get(head, "csv"), chain(peeked, lines)
+
+
+def read_records(lines: Iterable[str], fmt: str) -> Iterator[ImportRecord]:
+    if fmt == "ndjson":
+        for line_no, line in enumerate(lines, 1):
+            if line.strip():
+                try:
+                    yield ImportRecord(line_no, json.loads(line))
+                except json.JSONDecodeError as err:
+                    yield ImportRecord(line_no, {"__error__": f"invalid json: {err.msg}", "__raw__": line})
+    elif fmt == "json":
+        # a json document has to be parsed whole, use ndjson for very large exports
+        try:
+            document = json.loads("".join(lines))
+        except json.JSONDecodeError as err:
+            yield ImportRecord(err.lineno, {"__error__": f"invalid json: {err.msg} (column {err.colno})"})
+            return
+        records = document.get("goals", []) if isinstance(document, dict) else document
+        if not isinstance(records, list):
+            yield ImportRecord(1, {"__error__": "expected a list of goals or an object with a goals list"})
+            return
+        for idx, record in enumerate(records, 1):
+            yield ImportRecord(idx, record if isinstance(record, dict) else {"__error__": "not an object"})
+    elif fmt == "csv":
+        for row in (reader := csv.DictReader(lines)):
+            yield ImportRecord(reader.line_num, row)
+    else:
+        raise ValueError(f"unknown import format {fmt}, use ndjson, json or csv")
+
+
+def import_goal_records(records: Iterator[ImportRecord], conn, rejects: TextIO,
+                        default_tree_id: int|None=None, chunk_size: int=BULK_CHUNK_SIZE) -> tuple[int, int]:
+    rejected = 0
+    today = date.today()
+    # the record each node came from by its node_pos (unique per line). insert_nodes writes every chunk_size
+    # nodes, so a failed chunk's nodes are always among the last chunk_size kept here
+    sources: dict[float, ImportRecord] = {}
+
+    def reject(record: ImportRecord, errors: list[str]):
+        nonlocal rejected
+        rejected += 1
+        rejects.write(json.dumps({"line": record.line, "record": record.data, "errors": errors}, default=str) + "\n")
+
+    def valid_nodes() -> Iterator[GoalNode]:
+        for record in records:
+            if "__error__" in record.data:
+                node, errors = None, [record.data["__error__"]]
+            else:
+                node, errors = validate_record(record.data, default_tree_id, today)
+            if node is None:
+                reject(record, errors)
+                continue
+            node.node_pos = record.line * POSITION_STEP # keeps the file's order among siblings
+            sources[node.node_pos] = record
+            if len(sources) > chunk_size:
+                del sources[next(iter(sources))]
+            yield node
+
+    def failed_chunk(chunk: list[GoalNode], err: Exception):
+        for node in chunk:
+            reject(sources[node.node_pos], [f"database: {err}"])
+
+    result = insert_nodes(valid_nodes(), conn, chunk_size, skip_failed_chunks=True, on_failed_chunk=failed_chunk)
+    return result.rows, rejected
+
+
+def import_goals(source: str="-", tree_id: str|None=None) -> ImportResult:
+    start = perf_counter()
+    default_tree_id = int(tree_id) if tree_id is not None else None
+    reject_path = Path("goal_import_rejects.ndjson" if source == "-" else f"{source}.rejects.ndjson")
+    stream = sys.stdin if source == "-" else open(source, newline="", encoding="utf-8")
+    try:
+        fmt, lines = _sniff_format(iter(stream), source)
+        with open(reject_path, "w", encoding="utf-8") as rejects, db_connection() as conn:
+            imported, rejected = import_goal_records(read_records(lines, fmt), conn, rejects, default_tree_id)
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+    if rejected == 0:
+        reject_path.unlink()
+    result = ImportResult(imported, rejected, perf_counter() - start, reject_path if rejected else None)
+    click.echo(f"imported {result.imported:,} goals in {result.secs:.2f}s")
+    if result.reject_file is not None:
+        click.secho(f"{result.rejected:,} records rejected, see {result.reject_file}", fg="yellow")
+    return result
@@ -0,0 +1,81 @@
+import re
+from typing import Final, NamedTuple
+import click
+from sqlcipher3 import dbapi2 as sqlite
+from db import db_connection
+
+
+SEARCH_LIMIT: Final[int] = 20
+# a one letter prefix expands to a good part of the vocabulary and isn't in the prefix index
+MIN_PREFIX_LENGTH: Final[int] = 2
+# prefixes up to this long (the lengths migrations/search.sql keeps a prefix index for) can match most of the
+# index, and bm25 has to score every match before the best LIMIT are known. past CANDIDATE_LIMIT matches a
+# short prefix isn't ranked, it gets LIMIT matches with title matches first. everything else ranks every match
+SHORT_PREFIX_LENGTH: Final[int] = 3
+CANDIDATE_LIMIT: Final[int] = 1000
+# walking matches in rowid order doesn't score them, so finding out whether there are more than the limit is cheap
+OVER_LIMIT_QUERY: Final[str] = """
+SELECT EXISTS (SELECT 1 FROM search_index WHERE search_index MATCH ? LIMIT 1 OFFSET ?)
+"""
+# rank is bm25 with the column weights set in migrations/search.sql
+SEARCH_QUERY: Final[str] = """
+SELECT source_type, rowid >> 1, title, snippet(search_index, 1, '[', ']', '...', 12), rank
+FROM search_index WHERE search_index MATCH ? ORDER BY rank LIMIT ?
+"""
+# newest first without ranking, rank is only worked out for the rows that come back
+UNRANKED_QUERY: Final[str] = """
+SELECT source_type, rowid >> 1, title, snippet(search_index, 1, '[', ']', '...', 12), rank
+FROM search_index WHERE search_index MATCH ? ORDER BY rowid DESC LIMIT ?
+"""
+_TERM: Final[re.Pattern] = re.compile(r"\w+")
+
+
+class SearchResult(NamedTuple):
+    source_type: str # "node" or "habit"
+    id: int # nodes.id or habits.id
+    title: str
+    snippet: str
+    rank: float # bm25, lower is a better match
+
+
+def to_match_query(text: str, prefix_last: bool=True) -> str|None:
+    """
+    user text to an fts5 query, every word has to match and the last one matches as a prefix so partly
+    typed words already find something. quoting keeps fts5 syntax (AND, NEAR, column:) in the input literal
+    """
+    terms = _TERM.findall(text)
+    if not terms:
+        return None
+    query = " ".join(f'"{term}"' for term in terms)
+    return query + "*" if prefix_last and len(terms[-1]) >= MIN_PREFIX_LENGTH else query
+
+
+def search(text: str, conn: sqlite.Connection, limit: int=SEARCH_LIMIT, prefix_last: bool=True,
+           candidate_limit: int|None=CANDIDATE_LIMIT) -> list[SearchResult]:
+    """
+    best bm25 matches first. a short prefix with more than candidate_limit matches comes back unranked
+    instead, title matches first then the newest. candidate_limit=None ranks every match however many there are
+    """
+    if (query := to_match_query(text, prefix_last)) is None:
+        return []
+    short_prefix = prefix_last and MIN_PREFIX_LENGTH <= len(_TERM.findall(text)[-1]) <= SHORT_PREFIX_LENGTH
+    if candidate_limit is None or not short_prefix or \
+       not conn.execute(OVER_LIMIT_QUERY, (query, candidate_limit)).fetchone()[0]:
+        return [SearchResult(*row) for row in conn.execute(SEARCH_QUERY, (query, limit))]
+    results = [SearchResult(*row) for row in conn.execute(UNRANKED_QUERY, (f"{{title}} : ({query})", limit))]
+    if len(results) < limit:
+        seen = {(result.source_type, result.id) for result in results}
+        results += [result for row in conn.execute(UNRANKED_QUERY, (query, limit + len(results)))
+                    if ((result := SearchResult(*row)).source_type, result.id) not in seen][:limit - len(results)]
+    return results
+
+
+def search_command(*terms: str):
+    with db_connection() as conn:
+        results = search(" ".join(terms), conn)
+    if not results:
+        click.echo("no matches")
+    for result in results:
+        click.echo(f"{result.source_type} {result.id}: {result.title}")
+        if result.snippet:
+            click.echo(f"    {result.snippet}")
@@ -0,0 +1,225 @@
+from array import array
+from typing import Final, Iterable, Iterator
+import numpy as np
+from sqlcipher3 import dbapi2 as sqlite
+from custom_types import GoalNode
+from db import SELECT_NODES_QUERY, _from_json, _to_json, db_select
+
+
+# (column, array typecode) for every numeric GoalNode field, ratings are float64 so they read back exactly
+NUMERIC_COLUMNS: Final[tuple[tuple[str, str], ...]] = (
+    ("id", "q"), ("tree_id", "q"), ("node_id", "q"), ("parent_id", "q"), ("node_pos", "d"),
+    ("priority", "d"), ("importance", "d"), ("difficulty", "d"),
+    ("start_date", "i"), ("due_date", "i"), ("days_until_due", "i"), ("days_past_due", "i"),
+)
+# text and json fields are stored as an index into the store's string pool
+STRING_COLUMNS: Final[tuple[str, ...]] = ("goal_type", "status", "intent", "description",
+                                          "goal_info", "post_completion_info")
+MISSING_DATE: Final[int] = -2**31 # start/due dates are nullable, numpy columns aren't
+# flags column bits, None and [] requisites are kept apart, as are a None and "" description
+NO_PREREQUISITE: Final[int] = 1
+NO_POSTREQUISITE: Final[int] = 2
+NO_DESCRIPTION: Final[int] = 4
+
+
+class StringPool:
+    """
+    every distinct string is stored once, columns hold its index. pack() once nothing else will be interned
+    """
+
+    def __init__(self):
+        self.strings: list[str] = [""]
+        self._index: dict[str, int] = {"": 0}
+
+    def intern(self, value: str) -> int:
+        if (idx := self._index.get(value)) is None:
+            idx = self._index[value] = len(self.strings)
+            self.strings.append(value)
+        return idx
+
+    def pack(self) -> "PackedStrings":
+        encoded = [text.encode() for text in self.strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(text) for text in encoded], out=offsets[1:])
+        return PackedStrings(b"".join(encoded), offsets)
+
+
+class PackedStrings:
+    """
+    the pool's strings as one utf-8 buffer + offsets, a str object is only made when one is read
+    """
+
+    def __init__(self, data: bytes, offsets: np.ndarray):
+        self.data = data
+        self.offsets = offsets
+
+    def __getitem__(self, idx: int) -> str:
+        return self.data[self.offsets.item(idx):self.offsets.item(idx + 1)].decode()
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    @property
+    def nbytes(self) -> int:
+        return len(self.data) + self.offsets.nbytes
+
+
+def _csr(lists: Iterable[list[int]|None]) -> tuple[np.ndarray, np.ndarray]:
+    # list of lists -> (offsets, values), row i is values[offsets[i]:offsets[i + 1]]
+    offsets = array("q", [0])
+    values = array("q")
+    for items in lists:
+        if items:
+            values.extend(items)
+        offsets.append(len(values))
+    return np.frombuffer(offsets, dtype=np.int64), np.frombuffer(values, dtype=np.int64)
+
+
+class GoalTreeStore:
+    """
+    nodes kept column wise: numeric fields in numpy columns, strings interned, requisites and children in
+    csr offset arrays. rows are sorted by id. GoalNode objects are only built when a node is accessed.
+    children/siblings only cover nodes in the store, a node whose parent wasn't loaded has no siblings
+    """
+
+    def __init__(self, nodes: Iterable[GoalNode]):
+        columns = {name: array(typecode) for name, typecode in NUMERIC_COLUMNS}
+        strings = {name: array("I") for name in STRING_COLUMNS}
+        flags = array("B")
+        prerequisites: list[list[int]|None] = []
+        postrequisites: list[list[int]|None] = []
+        pool = StringPool()
+        intern = pool.intern
+        for node in nodes:
+            for name, _ in NUMERIC_COLUMNS:
+                value = getattr(node, name)
+                columns[name].append(MISSING_DATE if value is None else value)
+            for name in ("goal_type", "status", "intent", "description"):
+                strings[name].append(intern(getattr(node, name) or ""))
+            # json text interns well, most nodes share "{}"
+            strings["goal_info"].append(intern(_to_json(node.goal_info) or "{}"))
+            strings["post_completion_info"].append(intern(_to_json(node.post_completion_info) or "{}"))
+            flags.append((node.prerequisite is None) * NO_PREREQUISITE
+                         + (node.postrequisite is None) * NO_POSTREQUISITE
+                         + (node.description is None) * NO_DESCRIPTION)
+            prerequisites.append(node.prerequisite)
+            postrequisites.append(node.postrequisite)
+
+        ids = np.frombuffer(columns["id"], dtype=np.int64)
+        order = np.argsort(ids, kind="stable")
+        self.columns: dict[str, np.ndarray] = {
+            name: np.frombuffer(values, dtype=np.dtype(values.typecode))[order] for name, values in columns.items()}
+        self.string_columns: dict[str, np.ndarray] = {
+            name: np.frombuffer(values, dtype=np.uint32)[order] for name, values in strings.items()}
+        self.flags = np.frombuffer(flags, dtype=np.uint8)[order]
+        self._empty_json = pool.intern("{}")
+        self.strings = pool.pack()
+        self.prerequisite_offsets, self.prerequisites = self._reorder(*_csr(prerequisites), order)
+        self.postrequisite_offsets, self.postrequisites = self._reorder(*_csr(postrequisites), order)
+        self._build_children()
+
+    @staticmethod
+    def _reorder(offsets: np.ndarray, values: np.ndarray, order: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        counts = np.diff(offsets)[order]
+        new_offsets = np.zeros(len(order) + 1, dtype=np.int64)
+        np.cumsum(counts, out=new_offsets[1:])
+        if len(values) == 0:
+            return new_offsets, values
+        # gather each row's slice in the new row order
+        starts = np.repeat(offsets[:-1][order] - new_offsets[:-1], counts)
+        return new_offsets, values[np.arange(len(starts)) + starts]
+
+    def _build_children(self):
+        ids, parent_ids = self.columns["id"], self.columns["parent_id"]
+        # children grouped by parent id, siblings in node_pos order
+        order = np.lexsort((self.columns["node_pos"], parent_ids))
+        sorted_parents = parent_ids[order]
+        starts = np.searchsorted(sorted_parents, ids, "left")
+        ends = np.searchsorted(sorted_parents, ids, "right")
+        self.child_offsets = np.zeros(len(ids) + 1, dtype=np.int64)
+        np.cumsum(ends - starts, out=self.child_offsets[1:])
+        # ids are sorted so the parent groups come out in row order
+        in_store = np.isin(sorted_parents, ids)
+        self.children = ids[order[in_store]]
+        self.parent_idx = np.where(np.isin(parent_ids, ids), np.searchsorted(ids, parent_ids), -1).astype(np.int32)
+
+    @classmethod
+    def load(cls, tree_id: int, conn: sqlite.Connection) -> "GoalTreeStore":
+        return cls(db_select(f"{SELECT_NODES_QUERY} WHERE tree_id = ?", GoalNode, conn=conn, data=(tree_id,)))
+
+    def __len__(self) -> int:
+        return len(self.columns["id"])
+
+    def __contains__(self, node_id: int) -> bool:
+        return self._find(node_id) is not None
+
+    def _find(self, node_id: int) -> int|None:
+        ids = self.columns["id"]
+        idx = int(ids.searchsorted(node_id))
+        return idx if idx < len(ids) and ids.item(idx) == node_id else None
+
+    def index(self, node_id: int) -> int:
+        if (idx := self._find(node_id)) is None:
+            raise KeyError(f"no node with id {node_id} in the store")
+        return idx
+
+    def column(self, name: str) -> np.ndarray:
+        return self.columns[name]
+
+    def _children(self, idx: int) -> list[int]:
+        return self.children[self.child_offsets.item(idx):self.child_offsets.item(idx + 1)].tolist()
+
+    def _siblings(self, idx: int) -> list[int]:
+        if (parent := self.parent_idx.item(idx)) < 0:
+            return []
+        node_id = self.columns["id"].item(idx)
+        return [sibling for sibling in self._children(parent) if sibling != node_id]
+
+    def children_of(self, node_id: int) -> list[int]:
+        return self._children(self.index(node_id))
+
+    def siblings_of(self, node_id: int) -> list[int]:
+        return self._siblings(self.index(node_id))
+
+    def _requisites(self, offsets: np.ndarray, values: np.ndarray, idx: int, flag: int) -> list[int]|None:
+        if self.flags.item(idx) & flag:
+            return None
+        return values[offsets.item(idx):offsets.item(idx + 1)].tolist()
+
+    def _json(self, column: str, idx: int) -> dict:
+        text_idx = self.string_columns[column].item(idx)
+        return {} if text_idx == self._empty_json else _from_json(self.strings[text_idx], {})
+
+    def node(self, idx: int) -> GoalNode:
+        # view of row idx, a fresh GoalNode every call so edits don't write back to the store
+        col = self.columns
+        def text(name: str) -> str:
+            return self.strings[self.string_columns[name].item(idx)]
+        def date_value(name: str) -> int|None:
+            value = col[name].item(idx)
+            return None if value == MISSING_DATE else value
+        return GoalNode(col["id"].item(idx), col["tree_id"].item(idx), col["node_id"].item(idx),
+                        col["parent_id"].item(idx), col["node_pos"].item(idx), text("goal_type"),
+                        self._json("goal_info", idx), text("status"), text("intent"),
+                        date_value("start_date"), date_value("due_date"), # pyright: ignore[]
+                        col["days_until_due"].item(idx),
+                        None if self.flags.item(idx) & NO_DESCRIPTION else text("description"), # pyright: ignore[]
+                        self._json("post_completion_info", idx), col["priority"].item(idx),
+                        col["importance"].item(idx), col["difficulty"].item(idx),
+                        col["days_past_due"].item(idx),
+                        self._requisites(self.prerequisite_offsets, self.prerequisites, idx, NO_PREREQUISITE),
+                        self._requisites(self.postrequisite_offsets, self.postrequisites, idx, NO_POSTREQUISITE),
+                        self._siblings(idx), self._children(idx))
+
+    def get(self, node_id: int) -> GoalNode:
+        return self.node(self.index(node_id))
+
+    def __iter__(self) -> Iterator[GoalNode]:
+        return (self.node(idx) for idx in range(len(self)))
+
+    def nbytes(self) -> int:
+        # memory held by the columns and the packed strings
+        arrays = [*self.columns.values(), *self.string_columns.values(), self.flags, self.prerequisite_offsets,
+                  self.prerequisites, self.postrequisite_offsets, self.postrequisites, self.child_offsets,
+                  self.children, self.parent_idx]
+        return sum(arr.nbytes for arr in arrays) + self.strings.nbytes
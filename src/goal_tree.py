@@ -0,0 +1,114 @@
+from collections import defaultdict
+from typing import Final, Iterator
+from sqlcipher3 import dbapi2 as sqlite
+from custom_types import GoalNode
+from db import INSERT_NODE_QUERY, NODE_COLUMNS, db_insert, db_select, db_update, node_to_row, row_to_node
+
+
+MAX_TREE_DEPTH: Final[int] = 1_000_000 # stops the recursive queries if a bad edit ever creates a cycle
+
+
+# every query here is answered from the node_edges indexes (see migrations/node_edges.sql)
+CHILDREN_QUERY: Final[str] = "SELECT child_id FROM node_edges WHERE parent_id = ?"
+PARENT_QUERY: Final[str] = "SELECT parent_id FROM node_edges WHERE child_id = ?"
+TREE_IDS_QUERY: Final[str] = "SELECT id, tree_id FROM nodes WHERE id IN (?, ?)"
+SIBLINGS_QUERY: Final[str] = """
+SELECT sibling.child_id FROM node_edges AS node
+JOIN node_edges AS sibling ON sibling.parent_id = node.parent_id
+WHERE node.child_id = ? AND sibling.child_id != node.child_id
+"""
+TREE_EDGES_QUERY: Final[str] = "SELECT parent_id, child_id FROM node_edges WHERE tree_id = ?"
+
+_NODE_FIELDS: Final[str] = ", ".join(f"nodes.{column}" for column in ("id",) + NODE_COLUMNS)
+# breadth first, each level is one step of the recursion over the node_edges primary key
+SUBTREE_QUERY: Final[str] = f"""
+WITH RECURSIVE subtree(id, depth) AS (
+  SELECT :root, 0
+  UNION ALL
+  SELECT node_edges.child_id, subtree.depth + 1 FROM node_edges
+  JOIN subtree ON node_edges.parent_id = subtree.id
+  WHERE subtree.depth < :max_depth
+)
+SELECT {_NODE_FIELDS} FROM subtree JOIN nodes ON nodes.id = subtree.id
+WHERE subtree.depth >= :min_depth
+"""
+_ANCESTORS_CTE: Final[str] = """
+WITH RECURSIVE ancestors(id, depth) AS (
+  SELECT parent_id, 1 FROM node_edges WHERE child_id = :node
+  UNION ALL
+  SELECT node_edges.parent_id, ancestors.depth + 1 FROM node_edges
+  JOIN ancestors ON node_edges.child_id = ancestors.id
+  WHERE ancestors.depth < :max_depth
+)
+"""
+# nearest ancestor first, ends at the root
+ANCESTORS_QUERY: Final[str] = (_ANCESTORS_CTE +
+        f"SELECT {_NODE_FIELDS} FROM ancestors JOIN nodes ON nodes.id = ancestors.id ORDER BY ancestors.depth")
+ANCESTOR_IDS_QUERY: Final[str] = _ANCESTORS_CTE + "SELECT id FROM ancestors ORDER BY depth"
+DEPTH_QUERY: Final[str] = _ANCESTORS_CTE + "SELECT count(*) FROM ancestors"
+
+
+def children_of(node_id: int, conn: sqlite.Connection) -> list[int]:
+    return [row[0] for row in conn.execute(CHILDREN_QUERY, (node_id,))]
+
+
+def siblings_of(node_id: int, conn: sqlite.Connection) -> list[int]:
+    return [row[0] for row in conn.execute(SIBLINGS_QUERY, (node_id,))]
+
+
+def parent_of(node_id: int, conn: sqlite.Connection) -> int|None:
+    row = conn.execute(PARENT_QUERY, (node_id,)).fetchone()
+    return None if row is None else row[0]
+
+
+def tree_adjacency(tree_id: int, conn: sqlite.Connection) -> dict[int, list[int]]:
+    adjacency: defaultdict[int, list[int]] = defaultdict(list)
+    for parent_id, child_id in conn.execute(TREE_EDGES_QUERY, (tree_id,)):
+        adjacency[parent_id].append(child_id)
+    return dict(adjacency)
+
+
+# the edge row is written by the nodes_edge_insert trigger, the parent row is never touched
+def add_child(parent_id: int, child: GoalNode, conn: sqlite.Connection) -> int:
+    child.parent_id = parent_id
+    row_id = db_insert(INSERT_NODE_QUERY, node_to_row(child), conn)
+    assert row_id is not None
+    child.id = row_id
+    return row_id
+
+
+def subtree(root_id: int, conn: sqlite.Connection, max_depth: int|None=None,
+            include_root: bool=True) -> Iterator[GoalNode]:
+    params = {"root": root_id,
+              "max_depth": MAX_TREE_DEPTH if max_depth is None else max_depth,
+              "min_depth": 0 if include_root else 1}
+    return db_select(SUBTREE_QUERY, GoalNode, row_to_node, conn, params)
+
+
+def nodes_at_depth(root_id: int, depth: int, conn: sqlite.Connection) -> Iterator[GoalNode]:
+    params = {"root": root_id, "max_depth": depth, "min_depth": depth}
+    return db_select(SUBTREE_QUERY, GoalNode, row_to_node, conn, params)
+
+
+def ancestors(node_id: int, conn: sqlite.Connection) -> Iterator[GoalNode]:
+    return db_select(ANCESTORS_QUERY, GoalNode, row_to_node, conn,
+                     {"node": node_id, "max_depth": MAX_TREE_DEPTH})
+
+
+def ancestor_ids(node_id: int, conn: sqlite.Connection) -> list[int]:
+    return [row[0] for row in conn.execute(ANCESTOR_IDS_QUERY, {"node": node_id, "max_depth": MAX_TREE_DEPTH})]
+
+
+# root nodes are at depth 0
+def node_depth(node_id: int, conn: sqlite.Connection) -> int:
+    return conn.execute(DEPTH_QUERY, {"node": node_id, "max_depth": MAX_TREE_DEPTH}).fetchone()[0]
+
+
+def move_node(node_id: int, new_parent_id: int, conn: sqlite.Connection) -> bool:
+    if new_parent_id == node_id or node_id in ancestor_ids(new_parent_id, conn):
+        raise ValueError(f"can't move node {node_id} under its own descendant {new_parent_id}")
+    # the stats triggers keep the moved node's tree_id, so a parent in another tree would leave both trees wrong
+    tree_ids = dict(conn.execute(TREE_IDS_QUERY, (node_id, new_parent_id)).fetchall())
+    if new_parent_id in tree_ids and tree_ids.get(node_id) != tree_ids[new_parent_id]:
+        raise ValueError(f"can't move node {node_id} under {new_parent_id}, it is in another tree")
+    return db_update("UPDATE nodes SET parent_id = ? WHERE id = ?", (new_parent_id, node_id), conn) == 1
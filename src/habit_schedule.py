@@ -0,0 +1,174 @@
+import heapq
+from calendar import monthrange
+from datetime import date
+from typing import Final, Iterator
+import click
+from sqlcipher3 import dbapi2 as sqlite
+from db import date_from_db, date_to_db, db_connection, transaction
+
+
+FREQUENCIES: Final[tuple[str, ...]] = ("daily", "weekly", "monthly", "quarterly", "yearly")
+PERIOD_DAYS: Final[dict[str, int]] = {"daily": 1, "weekly": 7}
+PERIOD_MONTHS: Final[dict[str, int]] = {"monthly": 1, "quarterly": 3, "yearly": 12}
+
+SCHEDULE_QUERY: Final[str] = """
+SELECT id, frequency_type, schedule_start, next_due_date FROM habits WHERE next_due_date IS NOT NULL
+"""
+SET_SCHEDULE_QUERY: Final[str] = """
+UPDATE habits SET frequency_type = ?, schedule_start = ?, next_due_date = ? WHERE id = ?
+"""
+UNSCHEDULE_QUERY: Final[str] = "UPDATE habits SET schedule_start = NULL, next_due_date = NULL WHERE id = ?"
+SET_NEXT_DUE_QUERY: Final[str] = "UPDATE habits SET next_due_date = ? WHERE id = ?"
+COMPLETE_QUERY: Final[str] = "UPDATE habits SET complete_today = 1, next_due_date = ? WHERE id = ?"
+# one statement for every habit at rollover, the WHERE keeps untouched rows out of the journal
+RESET_COMPLETE_QUERY: Final[str] = "UPDATE habits SET complete_today = 0 WHERE complete_today = 1"
+# answered from the habits_next_due_date index, no scan of the table
+DUE_QUERY: Final[str] = """
+SELECT id, goal, next_due_date FROM habits WHERE next_due_date <= ? ORDER BY next_due_date, id
+"""
+
+
+def _add_months(start: date, months: int) -> date:
+    year, month = divmod(start.month - 1 + months, 12)
+    year += start.year
+    return date(year, month + 1, min(start.day, monthrange(year, month + 1)[1]))
+
+
+def occurrence_on_or_after(frequency: str, start: int, day: int) -> int:
+    # first occurrence of a schedule starting on start that falls on or after day, in constant time
+    if day <= start:
+        return start
+    if (step := PERIOD_DAYS.get(frequency)) is not None:
+        return start + -(-(day - start) // step) * step
+    step = PERIOD_MONTHS[frequency]
+    first, target = date_from_db(start), date_from_db(day)
+    months = (target.year - first.year) * 12 + target.month - first.month # pyright: ignore[]
+    periods = -(-months // step)
+    occurrence = _add_months(first, periods * step) # pyright: ignore[]
+    if occurrence < target: # pyright: ignore[]
+        occurrence = _add_months(first, (periods + 1) * step) # pyright: ignore[]
+    return date_to_db(occurrence) # pyright: ignore[]
+
+
+class HabitScheduler:
+    """
+    min-heap of (next due day, habit id) over every scheduled habit. rescheduling pushes a new entry and
+    leaves the old one behind, entries that don't match _due are skipped and dropped when the heap compacts
+    """
+
+    def __init__(self):
+        self._heap: list[tuple[int, int]] = []
+        self._due: dict[int, int] = {}
+        self._schedules: dict[int, tuple[str, int]] = {}
+
+    @classmethod
+    def load(cls, conn: sqlite.Connection) -> "HabitScheduler":
+        scheduler = cls()
+        for habit_id, frequency, start, next_due in conn.execute(SCHEDULE_QUERY):
+            scheduler._schedules[habit_id] = (frequency, start)
+            scheduler._due[habit_id] = next_due
+            scheduler._heap.append((next_due, habit_id))
+        heapq.heapify(scheduler._heap)
+        return scheduler
+
+    def __len__(self) -> int:
+        return len(self._due)
+
+    def next_due(self, habit_id: int) -> int|None:
+        return self._due.get(habit_id)
+
+    def _push(self, habit_id: int, next_due: int):
+        self._due[habit_id] = next_due
+        heapq.heappush(self._heap, (next_due, habit_id))
+        if len(self._heap) > 2 * len(self._due) + 64:
+            self._heap = [(due, habit_id) for habit_id, due in self._due.items()]
+            heapq.heapify(self._heap)
+
+    def _entries_upto(self, last_day: int) -> Iterator[tuple[int, int]]:
+        # a heap's children are never due before their parent, so only the k matching entries and
+        # their direct children get looked at
+        heap = self._heap
+        stack = [0] if heap else []
+        while stack:
+            idx = stack.pop()
+            due, habit_id = heap[idx]
+            if due > last_day:
+                continue
+            if self._due.get(habit_id) == due:
+                yield due, habit_id
+            stack.extend(child for child in (2 * idx + 1, 2 * idx + 2) if child < len(heap))
+
+    def due_within(self, today: int, days: int=0) -> list[tuple[int, int]]:
+        # (due day, habit id) for everything due by today + days, overdue habits included, soonest first
+        return sorted(self._entries_upto(today + days))
+
+    def due_today(self, today: int) -> list[int]:
+        return [habit_id for _, habit_id in self.due_within(today)]
+
+    def schedule(self, habit_id: int, frequency: str, start: int, today: int, conn: sqlite.Connection) -> int:
+        if frequency not in FREQUENCIES:
+            raise ValueError(f"frequency must be one of {', '.join(FREQUENCIES)}, got {frequency!r}")
+        next_due = occurrence_on_or_after(frequency, start, today)
+        with transaction(conn, "IMMEDIATE"):
+            conn.execute(SET_SCHEDULE_QUERY, (frequency, start, next_due, habit_id))
+        self._schedules[habit_id] = (frequency, start)
+        self._push(habit_id, next_due)
+        return next_due
+
+    def unschedule(self, habit_id: int, conn: sqlite.Connection):
+        with transaction(conn, "IMMEDIATE"):
+            conn.execute(UNSCHEDULE_QUERY, (habit_id,))
+        self._schedules.pop(habit_id, None)
+        self._due.pop(habit_id, None)
+
+    def complete(self, habit_id: int, day: int, conn: sqlite.Connection) -> int:
+        # finishing early (a weekly habit two days before it's due) still moves on past that occurrence
+        frequency, start = self._schedules[habit_id]
+        next_due = occurrence_on_or_after(frequency, start, max(day, self._due[habit_id]) + 1)
+        with transaction(conn, "IMMEDIATE"):
+            conn.execute(COMPLETE_QUERY, (next_due, habit_id))
+        self._push(habit_id, next_due)
+        return next_due
+
+    def advance(self, today: int, conn: sqlite.Connection) -> list[tuple[int, int]]:
+        """
+        moves every habit whose occurrence went by without a completion on to its next one on or after
+        today, returns the missed (habit id, due day) pairs
+        """
+        missed = [(habit_id, due) for due, habit_id in sorted(self._entries_upto(today - 1))]
+        updates = [(occurrence_on_or_after(*self._schedules[habit_id], today), habit_id) for habit_id, _ in missed]
+        # the heap only changes once the write went through
+        with transaction(conn, "IMMEDIATE"):
+            conn.executemany(SET_NEXT_DUE_QUERY, updates)
+        for next_due, habit_id in updates:
+            self._push(habit_id, next_due)
+        while self._heap and self._due.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+        return missed
+
+    def rollover(self, today: int, conn: sqlite.Connection) -> list[tuple[int, int]]:
+        # start of a new day, complete_today goes back to 0 everywhere and missed occurrences move on
+        with transaction(conn, "IMMEDIATE"):
+            conn.execute(RESET_COMPLETE_QUERY)
+            return self.advance(today, conn)
+
+
+def due_habits(last_day: int, conn: sqlite.Connection) -> list[tuple[int, str, int]]:
+    # (id, goal, next due day), for one-off lookups that don't warrant loading a scheduler
+    return conn.execute(DUE_QUERY, (last_day,)).fetchall()
+
+
+def show_due_command(days: str="0"):
+    today = date.today()
+    with db_connection() as conn:
+        habits = due_habits(date_to_db(today) + int(days), conn) # pyright: ignore[]
+    if not habits:
+        click.echo("nothing due")
+    for _, goal, next_due in habits:
+        click.echo(f"{date_from_db(next_due):%a %d %b}  {goal}")
+
+
+def rollover_habits_command():
+    with db_connection() as conn:
+        missed = HabitScheduler.load(conn).rollover(date_to_db(date.today()), conn) # pyright: ignore[]
+    click.echo(f"{len(missed)} missed habit occurrences moved on")
@@ -1,29 +1,25 @@
-from rich.console import Console
-from click_options import ARG_OPTS as arg_opts 
-from custom_types import ColorScheme
+from click_options import resolve_action
+from cli_output import hex_to_rgb
 import click
 
 
-console = Console(color_system="truecolor")
-
-
 @click.command()
 @click.argument("action")
 @click.argument("target")
-def goal_creation(action, target):
+@click.argument("args", nargs=-1) # passed through to the action, e.g. the file for import goals
+def goal_creation(action, target, args):
     key = f"{action}-{target}"
-    if (operation := arg_opts.get(key)) is not None:
-        operation()
+    if (operation := resolve_action(key)) is not None:
+        operation(*args)
+    elif (operation := resolve_action(action)) is not None:
+        operation(target, *args)
     else:
-        console.print(f"target: {target} or action: {action} are not valid !",style=ColorScheme.ERROR_2)
+        from color_palette import ColorScheme
+        click.secho(f"target: {target} or action: {action} are not valid !", fg=hex_to_rgb(ColorScheme.ERROR_2))
         ...
     ...
 
 
-def get_version():
-    console.print("speedyJ version: 0.0.1 - 1/8/26", style="#2AF500")
-
-
 def main():
     ...
 
@@ -0,0 +1,96 @@
+from time import perf_counter
+from typing import Final
+import click
+from sqlcipher3 import dbapi2 as sqlite
+from db import db_connection, transaction
+
+
+# the rows are kept current by the triggers in migrations/node_closure.sql. only prerequisite links are
+# stored, parent/child ancestry comes from goal_tree's recursive queries
+DESCENDANTS_QUERY: Final[str] = "SELECT descendant, depth FROM node_closure WHERE ancestor = ?"
+ANCESTORS_QUERY: Final[str] = "SELECT ancestor, depth FROM node_closure WHERE descendant = ?"
+REACHABLE_QUERY: Final[str] = "SELECT EXISTS (SELECT 1 FROM node_closure WHERE ancestor = ? AND descendant = ?)"
+
+# full recompute into a temp table, the same statement the migration backfills with
+EXPECTED_TABLE: Final[str] = "expected_closure"
+EXPECTED_CLOSURE_QUERIES: Final[tuple[str, ...]] = (
+    f"DROP TABLE IF EXISTS temp.{EXPECTED_TABLE}",
+    f"""CREATE TEMP TABLE {EXPECTED_TABLE}(ancestor INTEGER, descendant INTEGER, depth INTEGER,
+                                        PRIMARY KEY(ancestor, descendant)) WITHOUT ROWID""",
+    f"""INSERT INTO temp.{EXPECTED_TABLE}(ancestor, descendant, depth)
+    WITH RECURSIVE walk(ancestor, descendant, depth) AS (
+      SELECT prerequisite_id, node_id, 1 FROM prerequisite_edges
+      UNION
+      SELECT walk.ancestor, prerequisite_edges.node_id, walk.depth + 1
+      FROM walk JOIN prerequisite_edges ON prerequisite_edges.prerequisite_id = walk.descendant
+      WHERE walk.depth < (SELECT count(*) FROM prerequisite_edges)
+    )
+    SELECT ancestor, descendant, min(depth) FROM walk
+    WHERE ancestor != descendant GROUP BY ancestor, descendant""",
+)
+# prerequisite_edges rows the json column no longer lists, and json entries that have no row yet
+STALE_PREREQUISITES_QUERY: Final[str] = """
+DELETE FROM prerequisite_edges WHERE NOT EXISTS (
+  SELECT 1 FROM nodes, json_each(coalesce(nodes.prerequisite, '[]')) AS prereq
+  WHERE nodes.id = prerequisite_edges.node_id AND CAST(prereq.value AS INTEGER) = prerequisite_edges.prerequisite_id)
+"""
+MISSING_PREREQUISITES_QUERY: Final[str] = """
+INSERT OR IGNORE INTO prerequisite_edges(prerequisite_id, node_id)
+SELECT CAST(prereq.value AS INTEGER), nodes.id FROM nodes, json_each(nodes.prerequisite) AS prereq
+WHERE nodes.prerequisite IS NOT NULL AND nodes.prerequisite != '[]'
+  AND EXISTS (SELECT 1 FROM nodes AS p WHERE p.id = CAST(prereq.value AS INTEGER))
+"""
+
+
+def blocked_by(node_id: int, conn: sqlite.Connection) -> list[int]:
+    # every goal that waits on node_id, directly or through other prerequisites
+    return [row[0] for row in conn.execute(DESCENDANTS_QUERY, (node_id,))]
+
+
+def blockers_of(node_id: int, conn: sqlite.Connection) -> list[int]:
+    return [row[0] for row in conn.execute(ANCESTORS_QUERY, (node_id,))]
+
+
+def is_reachable(from_id: int, to_id: int, conn: sqlite.Connection) -> bool:
+    # whether to_id waits on from_id
+    return bool(conn.execute(REACHABLE_QUERY, (from_id, to_id)).fetchone()[0])
+
+
+def _expected_closure(conn: sqlite.Connection):
+    for query in EXPECTED_CLOSURE_QUERIES:
+        conn.execute(query)
+
+
+def verify_closure(conn: sqlite.Connection) -> tuple[int, int]:
+    """
+    returns (missing, extra) row counts against a full recompute, a wrong depth counts as both
+    """
+    with transaction(conn):
+        _expected_closure(conn)
+        missing = conn.execute(f"""SELECT count(*) FROM (SELECT * FROM temp.{EXPECTED_TABLE}
+                                   EXCEPT SELECT * FROM node_closure)""").fetchone()[0]
+        extra = conn.execute(f"""SELECT count(*) FROM (SELECT * FROM node_closure
+                                 EXCEPT SELECT * FROM temp.{EXPECTED_TABLE})""").fetchone()[0]
+        conn.execute(f"DROP TABLE temp.{EXPECTED_TABLE}")
+    return missing, extra
+
+
+def rebuild_closure(conn: sqlite.Connection) -> int:
+    """
+    re-syncs prerequisite_edges with nodes.prerequisite and recomputes node_closure, returns the row count
+    """
+    with transaction(conn, "IMMEDIATE"):
+        conn.execute(STALE_PREREQUISITES_QUERY)
+        conn.execute(MISSING_PREREQUISITES_QUERY)
+        _expected_closure(conn)
+        conn.execute("DELETE FROM node_closure")
+        conn.execute(f"INSERT INTO node_closure SELECT * FROM temp.{EXPECTED_TABLE}")
+        conn.execute(f"DROP TABLE temp.{EXPECTED_TABLE}")
+        return conn.execute("SELECT count(*) FROM node_closure").fetchone()[0]
+
+
+def rebuild_closure_command():
+    start = perf_counter()
+    with db_connection() as conn:
+        rows = rebuild_closure(conn)
+    click.echo(f"rebuilt {rows:,} closure rows in {perf_counter() - start:.2f}s")
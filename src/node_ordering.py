@@ -0,0 +1,148 @@
+from typing import Final, NamedTuple, Sequence
+from sqlcipher3 import dbapi2 as sqlite
+from db import transaction
+
+
+POSITION_STEP: Final[float] = 1024.0 # gap left between siblings appended to either end
+MIN_GAP_BITS: Final[int] = 44 # a gap narrower than magnitude * 2**-44 counts as exhausted
+REBALANCE_HEADROOM_BITS: Final[int] = 12 # a rebalanced range leaves room for at least 12 more halvings per gap
+
+BEFORE_QUERY: Final[str] = """
+SELECT node_pos FROM nodes WHERE parent_id = ? AND node_pos <= ? AND id IS NOT ?
+ORDER BY node_pos DESC LIMIT ?
+"""
+AFTER_QUERY: Final[str] = """
+SELECT node_pos FROM nodes WHERE parent_id = ? AND node_pos > ? AND id IS NOT ?
+ORDER BY node_pos LIMIT ?
+"""
+FIRST_QUERY: Final[str] = "SELECT min(node_pos) FROM nodes WHERE parent_id = ? AND id IS NOT ?"
+# spreads every sibling strictly inside (lo, hi) evenly, skipping one slot for the node being placed
+REBALANCE_QUERY: Final[str] = """
+UPDATE nodes SET node_pos = :lo + :spacing * (ranked.slot + (ranked.slot > :before))
+FROM (SELECT id, row_number() OVER (ORDER BY node_pos) AS slot FROM nodes
+      WHERE parent_id = :parent AND node_pos > :lo AND node_pos < :hi AND id IS NOT :exclude) AS ranked
+WHERE nodes.id = ranked.id
+"""
+
+
+class RebalancePlan(NamedTuple):
+    lo: float # exclusive bounds of the rebalanced range
+    hi: float
+    spacing: float
+    before: int # siblings below the gap that get moved
+    after: int # siblings above the gap that get moved
+
+    def position(self, slot: int) -> float:
+        # slots 1..before are the lower siblings, before + 1 is the new node
+        return self.lo + self.spacing * slot
+
+    @property
+    def new_position(self) -> float:
+        return self.position(self.before + 1)
+
+
+def _resolution(lo: float, hi: float) -> float:
+    return max(abs(lo), abs(hi), POSITION_STEP) * 2.0 ** -MIN_GAP_BITS
+
+
+def position_between(lo: float|None, hi: float|None) -> float|None:
+    """
+    returns None when the gap between lo and hi is too narrow to split
+    """
+    if lo is None and hi is None:
+        return POSITION_STEP
+    if lo is None:
+        return hi - POSITION_STEP # pyright: ignore[]
+    if hi is None:
+        return lo + POSITION_STEP
+    if hi - lo <= _resolution(lo, hi):
+        return None
+    return lo + (hi - lo) / 2
+
+
+def plan_rebalance(before: Sequence[float], after: Sequence[float], window: int) -> RebalancePlan|None:
+    """
+    before: sibling positions at or below the gap, nearest first
+    after: sibling positions above the gap, nearest first
+    both need up to window + 1 entries, fewer means that end of the sibling list was reached.
+    returns None if `window` siblings either side aren't enough to make room, try again with a bigger window
+    """
+    below = before[:window]
+    above = after[:window]
+    slots = len(below) + len(above) + 2 # + the new node, spacing is measured to both bounds
+    if len(before) > window:
+        lo = before[window]
+    else:
+        lo = (below[-1] if below else above[0]) - POSITION_STEP * slots
+    if len(after) > window:
+        hi = after[window]
+    else:
+        hi = (above[-1] if above else below[0]) + POSITION_STEP * slots
+    spacing = (hi - lo) / slots
+    # bigger ranges have to end up sparser, otherwise a hot spot keeps re-spreading the same dense block
+    whole_list = len(before) <= window and len(after) <= window
+    if not whole_list and spacing < _resolution(lo, hi) * 2.0 ** REBALANCE_HEADROOM_BITS * window:
+        return None
+    return RebalancePlan(lo, hi, spacing, len(below), len(above))
+
+
+def _neighbors(parent_id: int, lo: float, conn: sqlite.Connection,
+               limit: int, exclude: int|None) -> tuple[list[float], list[float]]:
+    before = [row[0] for row in conn.execute(BEFORE_QUERY, (parent_id, lo, exclude, limit))]
+    after = [row[0] for row in conn.execute(AFTER_QUERY, (parent_id, lo, exclude, limit))]
+    return before, after
+
+
+def _sibling_position(parent_id: int, after_pos: float|None, conn: sqlite.Connection,
+                      exclude: int|None) -> float:
+    if after_pos is None:
+        first = conn.execute(FIRST_QUERY, (parent_id, exclude)).fetchone()[0]
+        return position_between(None, first) # pyright: ignore[]
+    before, after = _neighbors(parent_id, after_pos, conn, 1, exclude)
+    if (position := position_between(after_pos, after[0] if after else None)) is not None:
+        return position
+    window = 1
+    while True:
+        before, after = _neighbors(parent_id, after_pos, conn, window + 1, exclude)
+        if (plan := plan_rebalance(before, after, window)) is not None:
+            break
+        window *= 2
+    conn.execute(REBALANCE_QUERY, {"lo": plan.lo, "hi": plan.hi, "spacing": plan.spacing,
+                                   "before": plan.before, "parent": parent_id, "exclude": exclude})
+    return plan.new_position
+
+
+def _node_row(node_id: int, conn: sqlite.Connection) -> tuple[int, float]:
+    row = conn.execute("SELECT parent_id, node_pos FROM nodes WHERE id = ?", (node_id,)).fetchone()
+    if row is None:
+        raise KeyError(f"no node with id {node_id}")
+    return row
+
+
+def _after_pos(parent_id: int, after_id: int|None, conn: sqlite.Connection) -> float|None:
+    # node_pos only orders siblings, a position taken from another parent's child would be meaningless here
+    if after_id is None:
+        return None
+    after_parent, after_pos = _node_row(after_id, conn)
+    if after_parent != parent_id:
+        raise ValueError(f"node {after_id} is a child of {after_parent}, not of {parent_id}")
+    return after_pos
+
+
+def position_after(parent_id: int, after_id: int|None, conn: sqlite.Connection) -> float:
+    """
+    position for a new child of parent_id placed right after the sibling after_id (None for first),
+    may rebalance a range of siblings to make room
+    """
+    with transaction(conn, "IMMEDIATE"):
+        return _sibling_position(parent_id, _after_pos(parent_id, after_id, conn), conn, None)
+
+
+def move_after(node_id: int, after_id: int|None, conn: sqlite.Connection) -> float:
+    if after_id == node_id:
+        raise ValueError(f"can't move node {node_id} after itself")
+    with transaction(conn, "IMMEDIATE"):
+        parent_id, _ = _node_row(node_id, conn)
+        position = _sibling_position(parent_id, _after_pos(parent_id, after_id, conn), conn, node_id)
+        conn.execute("UPDATE nodes SET node_pos = ? WHERE id = ?", (position, node_id))
+    return position
@@ -1,15 +1,19 @@
-import builtins
 import string
 from datetime import date, datetime, time
-from rich import print as rprint
 from rich.live import Live
 from rich.prompt import Confirm, FloatPrompt, IntPrompt, InvalidResponse, Prompt
 from custom_types import ConfidenceLevel, Question
 from rich.text import Text
 from rich.console import Console 
 from enum import StrEnum
+from functools import partial
 from rich.prompt import Confirm, IntPrompt, InvalidResponse, PromptBase
 from datetime import date, datetime, time, timezone
+from date_parsing import get_parser
+from time_parsing import parse_time, to_time
+from prompter_registry import build, register, resolve
+import prompt_io
+from custom_prompter import RATING_VALIDATOR
 
 class StrFormats(StrEnum):
     """
@@ -31,78 +35,24 @@ class StrFormats(StrEnum):
     TWELVE_HR_TIME_FORMAT = "%I:%M %p"
     MILITARY_TIME_FORMAT = "%H:%M"
 
+# every format compiled once, tried in the enum's order
+STR_FORMAT_PARSER = get_parser(*StrFormats)
+
 class TimePrompt(PromptBase[date]):
     response_type = time 
-    units = ["hour", "minute", "second", "milisecond"]  
     validate_error_message = "[prompt.invalid]Please enter a valid time HH:MM (am or pm) or HH:MM for military time."
-    err_msg = {"non_digit": "[prompt.invalid]Non numerical character detected !",
-               "format": "[prompt.invalid]Invalid time format ! (H*n:MM:SS.MS) only"}
-
-
-    def unit_in_value(self, value: str):
-        for unit in self.units:
-            if unit in value:
-                return unit
-        return False
-
-    def determine_unit(self,value: str):
-        for char in value:
-            if char == ":" or char == ".":
-                continue
-            else:
-                if not char.isdigit():
-                    raise InvalidResponse(self.err_msg["non_digit"])
-        unit = ""
-        colon_count = value.count(":")
-        period_count = value.count(".")
-        if colon_count > 2 or period_count > 1:
-            raise InvalidResponse(self.err_msg["format"])
-        elif colon_count == 2:
-            unit = "hours"
-        elif colon_count == 1:
-            unit = "minutes"
-        elif colon_count == 0 and period_count == 1:
-            period_index = value.index('.') - 1
-            digits = value[:period_index]
-            if all([(not bool(int(digit))) for digit in digits]):
-                unit = "miliseconds"
-            else:
-                unit = "seconds"
-        return unit
-
-
-    def split_time_units(self, value: str, unit: str):
-        time_info = {}
-        unit_idx = self.units.index(unit)
-        if unit + "s" in value: 
-            value = value.replace(unit + "s", "")
-        value = value.replace(unit, "")
-        if value.find(":") == -1 and value.find(".") == -1:
-            split_units = value
-        elif unit == "second" or unit == "microsecond":
-            split_units = value.split(".")
-        elif value.find("."):
-            split_units = value.split(":") + value.split(".")
-        else:
-            split_units = value.split(":") 
-        for idx,time_unit in enumerate(self.units[unit_idx:]):
-            try:
-                time_info[time_unit] = split_units[idx]
-            except Exception:
-                break
-        rprint(time_info)
-        return time_info
-
-        
-
-
+    err_msg = {"format": "[prompt.invalid]Invalid time format ! (HH:MM[:SS.MS] [am/pm] or e.g 2 hours 5 minutes) only",
+               "range": "[prompt.invalid]{} is a day or more, not a time of day !"}
 
 
     def validate_time_unit(self, value: str):
-        if not (unit := self.unit_in_value(value)):
-            unit = self.determine_unit(value)
-        time_info = self.split_time_units(value,unit)
-        return time(*time_info)
+        # single pass tokenizer, see time_parsing
+        if (time_info := parse_time(value)) is None:
+            raise InvalidResponse(self.err_msg["format"])
+        try:
+            return to_time(time_info)
+        except ValueError:
+            raise InvalidResponse(self.err_msg["range"].format(value))
 
 
     def process_response(self, value: str, confirm_time: bool=True) -> time: # pyright: ignore[]
@@ -116,15 +66,9 @@ class DatePrompt(PromptBase[date]):
     validate_error_message = "[prompt.invalid]Please enter a valid date MM/DD/YY or M/D/YY"
 
     def find_correct_format(self,value: str):
-        for format in StrFormats:
-            try:
-                chosen_date = datetime.strptime(value, format.value)
-            except ValueError:
-                continue
-            else:
-                print(f"This is {format.name} format which is {format}")
-                return format
-        raise InvalidResponse("That format does not match one of the avalible ones !")
+        if (format := STR_FORMAT_PARSER.find_format(value)) is None:
+            raise InvalidResponse("That format does not match one of the avalible ones !")
+        return StrFormats(format)
 
 
 
@@ -135,17 +79,12 @@ class DatePrompt(PromptBase[date]):
             formatted_str = curr_utc_datetime.strftime(StrFormats.US_DATETIME_FORMAT_2DY)
             formatted_date = curr_utc_datetime.strptime(formatted_str, StrFormats.US_DATETIME_FORMAT_2DY)
             #NOTE ask user for prefered date format here then save to config !
-            print(f"todays date is: {formatted_str}")
             return formatted_date
         elif value == "later":
             return datetime(1,1,1,1,1,1,1)
-        try:
-            chosen_date = datetime.strptime(value,StrFormats.US_DATE_FORMAT_2DY)
-        except ValueError:
-            format = self.find_correct_format(value)
-            return datetime.strptime(value,format)
-        else:
-            return chosen_date
+        if (chosen_date := STR_FORMAT_PARSER.parse_datetime(value)) is None:
+            raise InvalidResponse("That format does not match one of the avalible ones !")
+        return chosen_date
 
 
 
@@ -158,6 +97,28 @@ class IntegerPrompt(IntPrompt):
 
 console = Console(color_system="truecolor")
 
+
+class _IOConsole:
+    # rich's prompts only read and print through their console, so any prompt_io backend can stand in for it
+    def __init__(self, io: prompt_io.PromptIO):
+        self.io = io
+
+    def input(self, prompt: Text|str="", password: bool=False, stream=None) -> str:
+        return self.io.input(prompt)
+
+    def print(self, *objects, **kwargs):
+        self.io.print(*objects)
+
+
+def _prompt_console() -> Console:
+    # looked up on every ask, the backend installed with prompt_io.use_io or else this module's console
+    io = prompt_io.current(console)
+    return io.console if isinstance(io, prompt_io.ConsoleIO) else _IOConsole(io) # pyright: ignore[]
+
+
+# longer choice lists are filtered with select_prompt instead of numbered
+MAX_LISTED_CHOICES = 27
+
 QUESTIONS: dict[str, list[Question]] = {
     "new_goal": [
         {
@@ -189,19 +150,22 @@ QUESTIONS: dict[str, list[Question]] = {
             "type": "text",
             "name": "priority",
             "answer_type": int,
-            "question": "priority of this goal (1-10) ?"
+            "question": "priority of this goal (1-10) ?",
+            "validator": RATING_VALIDATOR
         },
         {
             "type": "text",
             "name": "importance",
             "answer_type": int,
-            "question": "importance of this goal (1-10) ?"
+            "question": "importance of this goal (1-10) ?",
+            "validator": RATING_VALIDATOR
         },
         {
             "type": "text",
             "name": "difficulty",
             "answer_type": int,
-            "question": "difficulty of this goal (1-10) ?"
+            "question": "difficulty of this goal (1-10) ?",
+            "validator": RATING_VALIDATOR
         },
         {
             "type": "text",
@@ -229,57 +193,32 @@ QUESTIONS: dict[str, list[Question]] = {
 
 
 
-def date_prompt(return_as: type[str|date|datetime]=date):
-    chosen_date = DatePrompt().ask("when are you gonna start ?", choices=["now", "later"])
+def date_prompt(return_as: type[str|date|datetime]=date, question: str="when are you gonna start ?"):
+    chosen_date = DatePrompt().ask(question, choices=["now", "later"], console=_prompt_console())
     if chosen_date == datetime(1,1,1,1,1,1,1):
-        console.print("will decide later")
+        prompt_io.current(console).print("will decide later")
         return None
     else:
         return chosen_date
 
 
-def time_prompt(confirm: bool=False):
-    return TimePrompt().ask("time ?")
+def time_prompt(confirm: bool=False, question: str="time ?"):
+    return TimePrompt().ask(question, console=_prompt_console())
 
 def get_prompter(answer_type,question,kwarg_dict):
-    match answer_type:
-        case builtins.str:
-            console.print("returning str prompter !")
-            return Prompt().ask(question, **kwarg_dict)
-        case builtins.bool:
-            console.print("returning bool prompter !")
-            return Confirm().ask(question, **kwarg_dict)
-        case builtins.int:
-            console.print("returning int prompter !")
-            return IntPrompt.ask(question, **kwarg_dict)
-        case builtins.float:
-            console.print("returning floatprompter !")
-            return FloatPrompt.ask(question, **kwarg_dict)
-        case a if a is date | datetime:
-            return date_prompt()
-        case a if a is time:
-            return time_prompt()    
+    # one off questions, built on every call. questions that get asked again should go through
+    # prompter_registry.resolve so it happens once
+    return build({"type": "text", "question": question, "answer_type": answer_type, "kwargs": kwarg_dict})()
 
 
 def loop_prompter(question: Question):
-    assert "answer_type" in question
-    assert "question" in question
     assert "validator" in question
-
-    while True:
-        result = get_prompter(question["answer_type"],
-                                question["question"],
-                                question["kwargs"] if "kwargs" in question else {} 
-                                )
-        if not question["validator"]["func"](result):
-            console.print(question["validator"]["error_msg"])
-            continue
-        else:
-            return result
+    return build(question | {"type": question.get("type", "text"),
+                             "validator": question["validator"] | {"loop_until_correct": True}})()
         
 
 def show_selections(question: Text, choices: list[str|int|float], lettered_choices: bool=False):
-    if len(choices) > 27:
+    if len(choices) > MAX_LISTED_CHOICES:
         raise ValueError("Too many choices, use search instead")
     for idx,choice in enumerate(choices,1):
         if not lettered_choices:
@@ -298,11 +237,11 @@ def confirm_selection(answer):
 
 
 def get_integer_choice(choice_count: int):
-    answer = IntegerPrompt.ask("choice (enter Q to quit)")
+    answer = IntegerPrompt.ask("choice (enter Q to quit)", console=_prompt_console())
     if answer == "Q":
         return answer
     if answer > choice_count or answer <= 0:
-        console.print(f"{answer} is out of range ! (1-{choice_count} only)")
+        prompt_io.current(console).print(f"{answer} is out of range ! (1-{choice_count} only)")
     elif answer == "Q":
         return answer 
     else:
@@ -310,11 +249,11 @@ def get_integer_choice(choice_count: int):
 
 def get_lettered_choice(choice_count: int):
     possible_choices = list(string.ascii_lowercase)[0: choice_count]
-    answer = Prompt.ask("choice (enter Q to quit)")
+    answer = Prompt.ask("choice (enter Q to quit)", console=_prompt_console())
     if answer == "Q":
         return answer 
     if len(answer) > 1 or answer not in possible_choices: 
-        console.print("Invalid choice !")
+        prompt_io.current(console).print("Invalid choice !")
     else:
         return possible_choices.index(answer)
 
@@ -344,7 +283,8 @@ def multi_select_prompt(question: Text, choices: list[str|Text], lettered_choice
             question.append_text(Text(f"\n{idx}. {choice}"))
     question.append_text(Text("\n\n"))
 
-    with Live(question,console=console,auto_refresh=False, transient=True) as live:
+    io = prompt_io.current(console)
+    with io.live(question, auto_refresh=False, transient=True) as live:
         while True:
             if lettered_choices:
                 answer = get_lettered_choice(len(choices))
@@ -361,11 +301,11 @@ def multi_select_prompt(question: Text, choices: list[str|Text], lettered_choice
                     len(selected_choices) <= max_choices):
                     break
                 else:
-                    console.print(f"Too {"few" if len(selected_choices) < min_choices else "many"} choices selected")
+                    io.print(f"Too {"few" if len(selected_choices) < min_choices else "many"} choices selected")
                     if len(selected_choices) > max_choices:
-                        console.print(f"This question requires no more than {max_choices} choices")
+                        io.print(f"This question requires no more than {max_choices} choices")
                     if len(selected_choices) < min_choices:
-                        console.print(f"This question requires at least {min_choices} {"choice" if min_choices == 1 else "choices"}")
+                        io.print(f"This question requires at least {min_choices} {"choice" if min_choices == 1 else "choices"}")
                     live.refresh()
             else:
                 # question.highlight_words([str(choices[answer])], "bold black on #FFDA00")#NOTE: switch to enum const value
@@ -373,7 +313,7 @@ def multi_select_prompt(question: Text, choices: list[str|Text], lettered_choice
                 live.console.clear()
                 live.update(question, refresh=True)
 
-    console.print(*selected_choices)
+    io.print(*selected_choices)
     return selected_choices
                 
 
@@ -409,6 +349,154 @@ def single_select_prompt(question: Text, choices: list[str|Text], lettered_choic
 
 
  
+# the built in prompters, each factory binds its question and options once when the question is resolved
+def _kwargs(question: Question) -> dict:
+    return question["kwargs"] if "kwargs" in question else {}
+
+
+def _choices(question: Question) -> list:
+    if "choices" not in question:
+        raise ValueError("no choices provided for select type !")
+    return list(question["choices"])
+
+
+def _read_picks(io: prompt_io.PromptIO, message: str, positions: dict[str, int], count: int, multi: bool,
+                min_choices: int, max_choices: int|None) -> list[int]|int:
+    # a choice's number or its text per line, multi select toggles picks and finishes with Q like
+    # multi_select_prompt does
+    picked: dict[int, None] = {}
+    while True:
+        answer = io.input(message)
+        if multi and answer == "Q":
+            if min_choices <= len(picked) <= (max_choices or len(picked)):
+                return list(picked)
+            io.print(f"pick {min_choices}-{max_choices or 'any'} choices")
+            continue
+        idx = int(answer) - 1 if answer.isdigit() and 0 < int(answer) <= count else positions.get(answer)
+        if idx is None:
+            io.print(f"{answer} is not one of the choices !")
+        elif not multi:
+            return idx
+        elif idx in picked:
+            del picked[idx]
+        else:
+            picked[idx] = None
+
+
+def _virtual_select(question: Question, choices: list, multi: bool):
+    # past what fits on screen the choices go in a filterable window, the index is built once per question.
+    # picks come back as the question's own choice objects, the same ones a short list would give
+    from choice_index import ChoiceIndex
+    from select_prompt import select_indexes # prompt_toolkit is only needed for long choice lists
+    options = {"min_choices": 2, "max_choices": 2} if multi else {} # multi_select_prompt's defaults
+    options |= {key: value for key, value in _kwargs(question).items()
+                if key in ("min_choices", "max_choices", "height")}
+    message = str(question["question"])
+    index = ChoiceIndex([str(choice) for choice in choices])
+    positions = {label: idx for idx, label in reversed(list(enumerate(index.choices)))} # first of a duplicate
+
+    def ask():
+        # only a terminal gets the prompt_toolkit window, any other backend answers from its stream
+        io = prompt_io.current(console)
+        if isinstance(io, prompt_io.ConsoleIO):
+            picked = select_indexes(message, index, multi, **options)
+        else:
+            picked = _read_picks(io, message, positions, len(choices), multi, options.get("min_choices", 0),
+                                 options.get("max_choices"))
+        if picked is None:
+            return None
+        return [choices[idx] for idx in picked] if isinstance(picked, list) else choices[picked]
+    return ask
+
+
+def _rich_prompter(prompt_type: type[PromptBase], question: Question, **options):
+    # question and options are bound once, the console is picked on every ask
+    ask = partial(prompt_type.ask, question["question"], **options, **_kwargs(question))
+    return lambda: ask(console=_prompt_console())
+
+
+@register("print")
+def _print_prompter(question: Question):
+    return lambda: prompt_io.current(console).print(question["question"])
+
+
+@register("text", str)
+def _str_prompter(question: Question):
+    return _rich_prompter(Prompt, question)
+
+
+@register("text", int)
+def _int_prompter(question: Question):
+    return _rich_prompter(IntPrompt, question)
+
+
+@register("text", float)
+def _float_prompter(question: Question):
+    return _rich_prompter(FloatPrompt, question)
+
+
+@register("confirm", bool)
+@register("text", bool)
+def _confirm_prompter(question: Question):
+    return _rich_prompter(Confirm, question)
+
+
+@register("text", date)
+@register("text", datetime)
+def _date_prompter(question: Question):
+    return partial(date_prompt, question["answer_type"], str(question["question"]))
+
+
+@register("text", time)
+def _time_prompter(question: Question):
+    return partial(time_prompt, question=str(question["question"]))
+
+
+@register("select", list)
+def _multi_select_prompter(question: Question):
+    choices = _choices(question)
+    if len(choices) > MAX_LISTED_CHOICES:
+        return _virtual_select(question, choices, multi=True)
+    # multi_select_prompt appends the choices to the Text it's given, so every ask starts from a fresh one
+    return lambda: multi_select_prompt(Text.from_markup(str(question["question"])), choices, **_kwargs(question))
+
+
+@register("select")
+def _select_prompter(question: Question):
+    choices = _choices(question)
+    if len(choices) > MAX_LISTED_CHOICES:
+        return _virtual_select(question, choices, multi=False)
+    return _rich_prompter(Prompt, question, choices=[str(choice) for choice in choices])
+
+
+def _read_search(io: prompt_io.PromptIO, message: str, conn=None):
+    # the typed text's best match, an empty answer skips the question like an empty autocomplete does
+    from goal_search import search
+    if conn is None:
+        from db import db_connection
+        with db_connection() as conn:
+            return _read_search(io, message, conn)
+    while answer := io.input(message):
+        if results := search(answer, conn, 1):
+            return results[0]
+        io.print(f"nothing matches {answer} !")
+    return None
+
+
+@register("search")
+def _search_prompter(question: Question):
+    message = str(question["question"])
+
+    def ask():
+        # only a terminal gets the autocomplete, any other backend answers from its stream
+        io = prompt_io.current(console)
+        if isinstance(io, prompt_io.ConsoleIO):
+            from search_prompt import search_prompt # prompt_toolkit is only needed for this question type
+            return search_prompt(message)
+        return _read_search(io, message)
+    return ask
+
+
 def ask_questions():
     answers = {}
     for question in QUESTIONS["new_goal"]:
@@ -418,24 +506,10 @@ def ask_questions():
         assert "answer_type" in question
         if "when" in question:
             ...
-        if question["type"] == "print":
-            console.print(question["question"])
-            continue
-        elif question["type"] == "search":
-            ...
-        elif question["type"] == "select" and question["answer_type"] is list:
-            if "choices" not in question: 
-                raise ValueError("no choices provided for select type !")
-            multi_select_prompt(Text(question["question"]), question["choices"])
-        else:
-            if "validator" in question and question["validator"]["loop_until_correct"]:
-                result = loop_prompter(question)
-            else:
-                result = get_prompter(question["answer_type"],
-                                        question["question"],
-                                        question["kwargs"] if "kwargs" in question else {} 
-                                        )
+        result = resolve(question)()
+        if question["type"] != "print":
             answers[question["name"]] = result
+    return answers
 
 
 
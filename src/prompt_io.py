@@ -0,0 +1,118 @@
+import sys
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, ContextManager, Iterable, Iterator, Protocol, TextIO
+from rich.console import Console, RenderableType
+from rich.live import Live
+from rich.text import Text
+
+
+class PromptIO(Protocol):
+    """
+    where the prompters read answers from and write to. live() stands in for rich's Live, the object it
+    yields needs update(), refresh() and a console with input(), print() and clear()
+    """
+
+    def input(self, prompt: Text|str="") -> str: ...
+
+    def print(self, *objects: Any) -> None: ...
+
+    def clear(self) -> None: ...
+
+    def live(self, renderable: RenderableType, **settings: Any) -> ContextManager[Any]: ...
+
+
+class ConsoleIO:
+    # the interactive default, a thin layer over a rich Console
+    def __init__(self, console: Console):
+        self.console = console
+
+    def input(self, prompt: Text|str="") -> str:
+        return self.console.input(prompt)
+
+    def print(self, *objects: Any):
+        self.console.print(*objects)
+
+    def clear(self):
+        self.console.clear()
+
+    def live(self, renderable: RenderableType, **settings: Any) -> ContextManager[Live]:
+        settings["console"] = self.console
+        return Live(renderable, **settings)
+
+
+class _NullLive:
+    # what AnswerStreamIO.live hands out, nothing gets rendered
+    def __init__(self, console: "AnswerStreamIO"):
+        self.console = console
+
+    def update(self, renderable: RenderableType, refresh: bool=False):
+        pass
+
+    def refresh(self):
+        pass
+
+
+class AnswerStreamIO:
+    """
+    headless backend, answers come from any iterable of strings and nothing is rendered. running out of
+    answers raises EOFError the way input() does at the end of a pipe. record=True keeps what the prompters
+    printed and asked in .output
+    """
+
+    def __init__(self, answers: Iterable[str], record: bool=False):
+        self.answers = iter(answers)
+        self.record = record
+        self.output: list[Any] = []
+        self._live = _NullLive(self)
+
+    @classmethod
+    def from_file(cls, source: str|Path|TextIO="-", record: bool=False) -> "AnswerStreamIO":
+        # one answer per line from a path, an open file or stdin for "-". a path is read up front and closed,
+        # an open file or stdin is left open for whoever opened it
+        if isinstance(source, (str, Path)) and source != "-":
+            with open(source, encoding="utf-8") as file:
+                return cls([line.rstrip("\r\n") for line in file], record)
+        stream = sys.stdin if source == "-" else source
+        return cls((line.rstrip("\r\n") for line in stream), record)
+
+    def input(self, prompt: Text|str="") -> str:
+        if self.record:
+            self.output.append(prompt)
+        if (answer := next(self.answers, None)) is None:
+            raise EOFError("answer stream ran out")
+        return answer
+
+    def print(self, *objects: Any):
+        if self.record:
+            self.output.extend(objects)
+
+    def clear(self):
+        pass
+
+    def live(self, renderable: RenderableType, **settings: Any) -> ContextManager[_NullLive]:
+        return nullcontext(self._live)
+
+
+_current: ContextVar[PromptIO|None] = ContextVar("prompt_io", default=None)
+_console_ios: dict[int, ConsoleIO] = {}
+
+
+def current(default: Console) -> PromptIO:
+    # the backend installed with use_io, else the calling module's own console
+    if (backend := _current.get()) is not None:
+        return backend
+    if (console_io := _console_ios.get(id(default))) is None or console_io.console is not default:
+        console_io = _console_ios[id(default)] = ConsoleIO(default)
+    return console_io
+
+
+@contextmanager
+def use_io(backend: PromptIO) -> Iterator[PromptIO]:
+    # a context variable, so each thread or task can drive its own questionnaire
+    token = _current.set(backend)
+    try:
+        yield backend
+    finally:
+        _current.reset(token)
@@ -12,10 +12,13 @@ from rich.live import Live
 from rich.console import Console
 from rich.text import Text
 from datetime import date, datetime, time
+from date_parsing import DateParser, get_parser
+import prompt_io
 from time import sleep
 
 
 type AnswerDtype = Literal["str","int","float","bool","date","datetime","time"]
+type RenderMode = Literal["incremental", "full"]
 
 console = Console(color_system="truecolor")
 err_console = Console(color_system="truecolor", stderr=True, style="bold on #E50202")
@@ -52,7 +55,7 @@ def get_valid_answer(question: Question, live: Live, err_msg: Text|None):
         if err_msg:
             live.console.print(err_msg)
         live.refresh()
-        answer = console.input()
+        answer = live.console.input()
         valid, err_msg = question["validator"](answer)
         if valid:
             return answer
@@ -109,18 +112,24 @@ class StrPrompt(PromptBase[str]):
 
 class DatePrompt(PromptBase[datetime|date]):
     response_type = datetime
-    date_regex: Final[re.Pattern] = re.compile(r"^(0[1-9]|1[0-2])\/(0[1-9]|[12][0-9]|3[01])\/(19|20)\d{2}$")
-    datetime_regex: Final[re.Pattern] = re.compile("")
+    date_parser: Final[DateParser] = get_parser(*DatetimeFormats.US_DATE_FORMAT["formats"],
+                                                DatetimeFormats.EU_DATE_FORMAT_2DY,
+                                                DatetimeFormats.EU_DATE_FORMAT_4DY,
+                                                DatetimeFormats.ISO_STANDARD_DATE_FORMAT_4DY,
+                                                DatetimeFormats.ISO_STANDARD_DATE_FORMAT_2DY)
+    datetime_parser: Final[DateParser] = get_parser(DatetimeFormats.US_DATETIME_FORMAT_2DY,
+                                                    DatetimeFormats.US_MIL_DATETIME_FORMAT_2DY,
+                                                    DatetimeFormats.US_DATETIME_FORMAT_4DY,
+                                                    DatetimeFormats.US_MIL_DATETIME_FORMAT_4DY)
 
 
     def process_response(self, value: str) -> date|datetime:
         if value == "now":
-            now = datetime.now().strftime("format")
-            return datetime.strptime(now,"")
-        elif self.date_regex.fullmatch(value):
-            return datetime.strptime(value, "").date()
-        elif self.datetime_regex.fullmatch(value):
-            return datetime.strptime(value,"")
+            return datetime.now().replace(second=0, microsecond=0)
+        elif (chosen_date := self.date_parser.parse_datetime(value)) is not None:
+            return chosen_date.date()
+        elif (chosen_datetime := self.datetime_parser.parse_datetime(value)) is not None:
+            return chosen_datetime
         else:
             return datetime(1,1,1)
 
@@ -195,50 +204,66 @@ def str_to_text(string: str, style: str|None=None, remove_nl: bool=True):
     return Text(string,end=" " if remove_nl else '\n')
 
 
-def _ask_live_sequence(settings: LiveSettings, questions: QuestionSequence):
-    questions["answers"] = {}
-    question_log = Text(end="") 
-    # turn each str to rich Text object
-
-    initial_question = questions["questions"][0]
-    initial_question_str = str_to_text(questions["questions"][0]["question"]) # pyright: ignore[]
+def _as_text(question: str|Text) -> Text:
+    return question.copy() if isinstance(question, Text) else str_to_text(question)
 
-    with Live(initial_question_str, **settings._asdict()) as live:
-        answer = console.input()
-        if "validator" in initial_question:
-            valid = initial_question["validator"](answer)
 
-            if not valid[0]:
-                answer = get_valid_answer(initial_question, live,valid[1] if valid[1] else None)
+def _answered(question: Text, answer: str) -> Text:
+    return question.copy().append_text(Text(" " + answer, style="bold #00DB1F"))
 
-        question_log.append_text(initial_question_str.append_text(Text(" " + answer + "\n",style="bold #00DB1F")))
-        live.console.clear()
-        live.refresh()
 
-        for question in questions["questions"][1:]:
-            assert isinstance(question["question"],str)
+def _ask_live_sequence(settings: LiveSettings, questions: QuestionSequence,
+                       render_mode: RenderMode="incremental") -> dict[str, Any]:
+    if render_mode == "full":
+        return _ask_live_sequence_full(settings, questions)
+    # answered questions are printed once above the live region, only the active prompt gets redrawn
+    questions["answers"] = {}
+    io = prompt_io.current(settings.console)
+    with io.live(Text(""), **settings._asdict()) as live:
+        for question in questions["questions"]:
+            prompt = _as_text(question["question"])
+            # one redraw per question, right before blocking on its answer
+            live.update(prompt, refresh=True)
+            answer = io.input()
+            if "validator" in question:
+                valid, err_msg = question["validator"](answer)
+                if not valid:
+                    answer = get_valid_answer(question, live, err_msg)
+            questions["answers"][question["name"]] = answer
+            live.console.print(_answered(prompt, answer))
+        live.update(Text(""), refresh=True)
+    return questions["answers"]
+
+
+def _ask_live_sequence_full(settings: LiveSettings, questions: QuestionSequence) -> dict[str, Any]:
+    # every answer clears the screen and redraws the whole log, output grows with the square of the length
+    questions["answers"] = {}
+    question_log = Text(end="")
+    io = prompt_io.current(settings.console)
+    with io.live(Text(""), **settings._asdict()) as live:
+        for question in questions["questions"]:
+            prompt = _as_text(question["question"])
             live.console.clear()
-            question = str_to_text(question["question"])
-            live.update(question_log.append_text(question), refresh=True)
-            answer = console.input()
-            question_log.append_text(Text(" " + answer + "\n", style="bold #00DB1F"))
+            live.update(question_log.copy().append_text(prompt), refresh=True)
+            answer = io.input()
+            if "validator" in question:
+                valid, err_msg = question["validator"](answer)
+                if not valid:
+                    answer = get_valid_answer(question, live, err_msg)
+            questions["answers"][question["name"]] = answer
+            question_log.append_text(_answered(prompt, answer + "\n"))
             live.update(question_log, refresh=True)
-
         live.console.clear()
-        console.print(question_log)
+    io.print(question_log)
+    return questions["answers"]
 
 
-
-
-
-        ...
-
 def ask_user(question: Question|QuestionSequence,
              settings: LiveSettings=LiveSettings()):
     if "answers" not in question: 
         assert "question" in question and "ret_type" in question
     else: 
-        answer = _ask_live_sequence(settings, question)
+        return _ask_live_sequence(settings, question)
 
     ...
 
@@ -252,9 +277,10 @@ def confirm_prompt(question: Text, confirm_type: Literal["yes or no", "true or f
         f_question = f_question.append_text(Text("  \t[(t)rue or (f)alse]", style="bold #F500A4"))
         question = question.append_text(Text("  \t[(t)rue or (f)alse]\n", style="bold #F500A4"))
 
-    with Live(question,**live_settings) as live:
+    io = prompt_io.current(console)
+    with io.live(question, **live_settings) as live:
         while True:
-            answer = console.input()
+            answer = io.input()
             if answer.lower() in ["yes", "y", "true", "t"]:
                 answer = True
                 break
@@ -267,16 +293,17 @@ def confirm_prompt(question: Text, confirm_type: Literal["yes or no", "true or f
                 live.refresh()
                 continue
         live.console.clear()
-    console.print(f_question.append_text(Text(f": {answer}" ,style="bold green")))
+    io.print(f_question.append_text(Text(f": {answer}" ,style="bold green")))
     return answer
 
 
 def number_prompt(question: Text, min_val: int, max_val: int, numeric_type: Literal["float","int"]="float"):
     number = getattr(builtins,numeric_type)
     question = question.append_text(Text(f"\t[{min_val} - {max_val}]\n", style="bold #F500A4"))
-    with Live(question, **live_settings) as live:
+    io = prompt_io.current(console)
+    with io.live(question, **live_settings) as live:
         while True: 
-            answer = console.input()
+            answer = io.input()
             if answer.isdigit() and number(answer) >= min_val and number(answer) <= max_val:
                 return number(answer)
             else:
@@ -0,0 +1,72 @@
+from typing import Any, Callable, Final
+from rich.console import Console
+import prompt_io
+from custom_types import AnswerType, PromptValidator, Question, QuestionType
+
+
+# a prompter with its question and configuration already bound, asking is just calling it
+type Ask = Callable[[], Any]
+# builds the bound prompter for a question, runs once per question
+type PrompterFactory = Callable[[Question], Ask]
+
+ANY_ANSWER: Final[None] = None # registers a prompter for every answer type of a question type
+RESOLVED_CACHE_SIZE: Final[int] = 256 # resolved prompters kept, least recently used goes first
+
+_console = Console(color_system="truecolor")
+_REGISTRY: dict[tuple[QuestionType, AnswerType|None], PrompterFactory] = {}
+# keyed by id(), the question is kept alongside its prompter so the id can't be reused while it's cached.
+# questions are dicts holding lambdas so they can't be hashed by value. insertion order is recency
+_RESOLVED: dict[int, tuple[Question, Ask]] = {}
+
+
+def register(question_type: QuestionType, answer_type: AnswerType|None=ANY_ANSWER,
+             replace: bool=False) -> Callable[[PrompterFactory], PrompterFactory]:
+    """
+    decorator, the factory is called once per question with the question dict and returns the prompter.
+    an exact (question type, answer type) match wins over one registered for ANY_ANSWER
+    """
+    key = (question_type, answer_type)
+
+    def add(factory: PrompterFactory) -> PrompterFactory:
+        if key in _REGISTRY and not replace:
+            raise ValueError(f"a prompter is already registered for {question_type!r} questions "
+                             f"answering {answer_type!r}, pass replace=True to override it")
+        _REGISTRY[key] = factory
+        _RESOLVED.clear() # questions resolved against the old prompter have to pick up the new one
+        return factory
+    return add
+
+
+def _until_valid(ask: Ask, validator: PromptValidator) -> Ask:
+    def validated() -> Any:
+        while not validator["func"](answer := ask()):
+            prompt_io.current(_console).print(validator["error_msg"])
+        return answer
+    return validated
+
+
+def build(question: Question) -> Ask:
+    # uncached, for throwaway questions that would only fill up resolve's cache
+    question_type, answer_type = question["type"], question.get("answer_type")
+    factory = _REGISTRY.get((question_type, answer_type)) or _REGISTRY.get((question_type, ANY_ANSWER))
+    if factory is None:
+        raise ValueError(f"no prompter registered for {question_type!r} questions answering {answer_type!r}")
+    ask = factory(question)
+    if (validator := question.get("validator")) is not None and validator["loop_until_correct"]:
+        ask = _until_valid(ask, validator)
+    return ask
+
+
+def resolve(question: Question) -> Ask:
+    if (cached := _RESOLVED.pop(id(question), None)) is not None and cached[0] is question:
+        _RESOLVED[id(question)] = cached
+        return cached[1]
+    ask = build(question)
+    if len(_RESOLVED) >= RESOLVED_CACHE_SIZE:
+        del _RESOLVED[next(iter(_RESOLVED))]
+    _RESOLVED[id(question)] = (question, ask)
+    return ask
+
+
+def ask(question: Question) -> Any:
+    return resolve(question)()
@@ -0,0 +1,219 @@
+from dataclasses import dataclass
+from functools import partial
+from datetime import date, datetime
+from typing import Any, Callable, Final, Iterable, Literal
+from rich.console import Console
+from rich.text import Text
+import custom_prompter
+import prompt_logic
+import prompt_io
+from custom_prompter import HINT_STYLE, ErrorMsgs, Question, QuestionSequence, str_to_date
+
+
+type StepKind = Literal["print", "str", "int", "float", "bool", "date", "datetime"]
+# an answer string to (ok, value, error message), the resolved prompter for a question type
+type Parser = Callable[[str], tuple[bool, Any, str|None]]
+type Reader = Callable[[Text], str]
+type Writer = Callable[[Text|str], None]
+
+_HINT: Final[str] = HINT_STYLE.removeprefix("[").removesuffix("]")
+_KINDS: Final[dict[Any, StepKind]] = {"print": "print", str: "str", int: "int", float: "float", bool: "bool",
+                                      date: "date", datetime: "datetime"}
+# what gets appended to every prompt of a kind, built once per plan instead of on every ask
+_HINTS: Final[dict[StepKind, str]] = {"date": " (MM/DD/YY): ", "datetime": " (MM/DD/YY HH:MM am/pm): ",
+                                      "bool": " (y/n): ", "print": ""}
+_FORMATS: Final[dict[StepKind, str]] = {"date": "MM/DD/YY", "datetime": "MM/DD/YY HH:MM am/pm"}
+PLAN_CACHE_SIZE: Final[int] = 128 # compiled plans kept, least recently used goes first
+_TRUE: Final[frozenset[str]] = frozenset(("y", "yes", "t", "true"))
+_FALSE: Final[frozenset[str]] = frozenset(("n", "no", "f", "false"))
+
+
+@dataclass(frozen=True, slots=True)
+class CompiledStep:
+    key: str # where the answer goes in the answers dict
+    kind: StepKind
+    prompt: Text
+    parse: Parser
+    skippable: bool
+    skip_if: Callable[[dict[str, Any]], bool]|None
+    post_answer_logic: Callable[[Any], Any]|None
+    followup_if: Callable[[Any], bool]|None
+    followup: int|None # index into QuestionPlan.steps, the branch taken when followup_if is true
+
+
+@dataclass(frozen=True, slots=True)
+class QuestionPlan:
+    steps: tuple[CompiledStep, ...]
+    entry: tuple[int, ...] # top level steps in order, followups are only reached through a branch
+    not_skippable: Text
+
+
+def _as_str(answer: str, errors: ErrorMsgs) -> tuple[bool, Any, str|None]:
+    return True, answer, None
+
+
+def _as_int(answer: str, errors: ErrorMsgs) -> tuple[bool, Any, str|None]:
+    try:
+        return True, int(answer), None
+    except ValueError:
+        return False, answer, errors.invalid_dtype.format(answer)
+
+
+def _as_float(answer: str, errors: ErrorMsgs) -> tuple[bool, Any, str|None]:
+    try:
+        return True, float(answer), None
+    except ValueError:
+        return False, answer, errors.invalid_dtype.format(answer)
+
+
+def _as_bool(answer: str, errors: ErrorMsgs) -> tuple[bool, Any, str|None]:
+    lowered = answer.lower()
+    if lowered in _TRUE or lowered in _FALSE:
+        return True, lowered in _TRUE, None
+    return False, answer, errors.invalid_choice.format(answer)
+
+
+def _as_date(answer: str, errors: ErrorMsgs, ret_type: type[date|datetime]=date) -> tuple[bool, Any, str|None]:
+    if answer == "now":
+        now = datetime.now().replace(second=0, microsecond=0)
+        return True, now.date() if ret_type is date else now, None
+    if (value := str_to_date(answer, ret_type)) is None:
+        return False, answer, errors.invalid_format.format(answer, _FORMATS["date" if ret_type is date else "datetime"])
+    return True, value, None
+
+
+_PARSERS: Final[dict[StepKind, Callable[..., tuple[bool, Any, str|None]]]] = {
+        "str": _as_str, "print": _as_str, "int": _as_int, "float": _as_float, "bool": _as_bool,
+        "date": _as_date, "datetime": partial(_as_date, ret_type=datetime)}
+
+
+def _parser(kind: StepKind, validation: Callable[[str], bool]|None, errors: ErrorMsgs) -> Parser:
+    parse = partial(_PARSERS[kind], errors=errors)
+    if validation is None:
+        return parse
+
+    def validated(answer: str) -> tuple[bool, Any, str|None]:
+        ok, value, err_msg = parse(answer)
+        if ok and not validation(answer):
+            return False, answer, errors.validation_error.format(answer)
+        return ok, value, err_msg
+    return validated
+
+
+def _prompt_text(question: Question, kind: StepKind) -> Text:
+    prompt = Text("\n" * question.prefix_nl)
+    if question.preffixed_str:
+        prompt.append_text(Text.from_markup(question.preffixed_str))
+    prompt.append_text(Text.from_markup(question.question, style="bold"))
+    prompt.append(_HINTS.get(kind, ": "), style=_HINT)
+    prompt.append("\n" * question.suffix_nl)
+    return prompt
+
+
+def _from_prompt_logic(question: prompt_logic.Question) -> Question:
+    # prompt_logic's dict questions, `when` is the inverse of skip_if and validators return (ok, message)
+    when = question.get("when")
+    validator = question.get("validator")
+    return Question(str(question["question"]), {"str": str, "int": int, "float": float, "bool": bool,
+                                                 "date": date, "datetime": datetime}[question["ret_type"]],
+                    validation=None if validator is None else (lambda answer: validator(answer)[0]),
+                    skip_if=None if when is None else (lambda answers: not when(answers)),
+                    name=question["name"])
+
+
+def compile_sequence(sequence: QuestionSequence|prompt_logic.QuestionSequence,
+                     errors: ErrorMsgs=ErrorMsgs()) -> QuestionPlan:
+    if isinstance(sequence, dict):
+        questions = tuple(map(_from_prompt_logic, sequence["questions"]))
+    else:
+        questions = sequence.questions
+    steps: list[CompiledStep] = []
+
+    def add(question: Question) -> int:
+        # followups are compiled depth first and land after the question that branches to them
+        kind = _KINDS.get(question.exp_ret_type)
+        if kind is None:
+            raise ValueError(f"no prompter for {question.exp_ret_type!r} in {question.question!r}")
+        idx = len(steps)
+        steps.append(None) # pyright: ignore[]
+        followup = None if question.followup_if is None else add(question.followup_if[1])
+        steps[idx] = CompiledStep(question.name or question.question, kind, _prompt_text(question, kind),
+                                  _parser(kind, question.validation, errors), question.skippable,
+                                  question.skip_if, question.post_answer_logic,
+                                  None if question.followup_if is None else question.followup_if[0], followup)
+        return idx
+
+    entry = tuple(add(question) for question in questions)
+    return QuestionPlan(tuple(steps), entry, Text.from_markup(errors.not_skippable))
+
+
+# keyed by id(), the sequence is kept alongside its plan so the id can't be reused while it's cached.
+# sequences hold lambdas so they can't be hashed by value. insertion order is recency, a hit moves to the end
+_PLANS: dict[int, tuple[Any, QuestionPlan]] = {}
+
+
+def get_plan(sequence: QuestionSequence|prompt_logic.QuestionSequence) -> QuestionPlan:
+    if (cached := _PLANS.pop(id(sequence), None)) is not None and cached[0] is sequence:
+        _PLANS[id(sequence)] = cached
+        return cached[1]
+    plan = compile_sequence(sequence)
+    if len(_PLANS) >= PLAN_CACHE_SIZE:
+        del _PLANS[next(iter(_PLANS))]
+    _PLANS[id(sequence)] = (sequence, plan)
+    return plan
+
+
+def _run_step(plan: QuestionPlan, idx: int, answers: dict[str, Any], read: Reader, write: Writer):
+    step = plan.steps[idx]
+    if step.skip_if is not None and step.skip_if(answers):
+        answers[step.key] = None
+        return
+    if step.kind == "print":
+        write(step.prompt)
+        return
+    while True:
+        answer = read(step.prompt)
+        if answer.strip() == "":
+            if step.skippable:
+                answers[step.key] = None
+                return
+            write(plan.not_skippable)
+            continue
+        ok, value, err_msg = step.parse(answer)
+        if ok:
+            break
+        write(Text.from_markup(err_msg or ""))
+    if step.post_answer_logic is not None:
+        value = step.post_answer_logic(value)
+    answers[step.key] = value
+    if step.followup is not None and step.followup_if(value): # pyright: ignore[]
+        _run_step(plan, step.followup, answers, read, write)
+
+
+def run_plan(plan: QuestionPlan, read: Reader, write: Writer) -> dict[str, Any]:
+    answers: dict[str, Any] = {}
+    for idx in plan.entry:
+        _run_step(plan, idx, answers, read, write)
+    return answers
+
+
+def run_interactive(plan: QuestionPlan, console: Console=custom_prompter._console) -> dict[str, Any]:
+    # goes through whatever backend prompt_io.use_io installed, the console is the fallback
+    io = prompt_io.current(console)
+    return run_plan(plan, io.input, io.print)
+
+
+def run_scripted(plan: QuestionPlan, script: Iterable[str]) -> tuple[dict[str, Any], list[Text|str]]:
+    """
+    runs the plan against a fixed list of answers, returns the answers and every message that would have
+    been printed. running out of script raises ValueError rather than blocking
+    """
+    script = iter(script)
+    output: list[Text|str] = []
+
+    def read(prompt: Text) -> str:
+        if (answer := next(script, None)) is None:
+            raise ValueError(f"script ran out of answers at {prompt.plain.strip()!r}")
+        return answer
+
+    return run_plan(plan, read, output.append), output
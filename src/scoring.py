@@ -0,0 +1,129 @@
+from typing import Final, NamedTuple
+import numpy as np
+from sqlcipher3 import dbapi2 as sqlite
+from custom_types import GoalNode, SuccessScore
+from db import db_select_columns
+
+
+STATUS_CODES: Final[dict[str, int]] = {"incomplete": 0, "in progress": 1, "complete": 2, "locked": 3}
+# how far along each status code counts as, indexed by the code
+STATUS_PROGRESS: Final[np.ndarray] = np.array([0.0, 0.5, 1.0, 0.0])
+LATE_DECAY_DAYS: Final[float] = 7.0 # progress made on an overdue goal counts half after this many days
+DUE_HORIZON_DAYS: Final[float] = 60.0 # deadlines further out than this stop lowering derailment
+SCORE_WEIGHTS: Final[tuple[float, float, float]] = (0.5, 0.3, 0.2) # completion, inertia, 1 - derailment
+
+TREE_COLUMNS_QUERY: Final[str] = """
+SELECT id, parent_id, depth, priority, importance, difficulty, days_until_due, days_past_due, status
+FROM nodes WHERE tree_id = ?
+"""
+
+
+class TreeArrays(NamedTuple):
+    ids: np.ndarray
+    parent_idx: np.ndarray # index into ids, -1 for roots
+    depth: np.ndarray
+    priority: np.ndarray
+    importance: np.ndarray
+    difficulty: np.ndarray
+    days_until_due: np.ndarray
+    days_past_due: np.ndarray
+    status: np.ndarray # STATUS_CODES
+
+
+class TreeScores(NamedTuple):
+    ids: np.ndarray
+    completion_percentage: np.ndarray
+    success_inertia: np.ndarray
+    derailment_chance: np.ndarray
+    score: np.ndarray
+
+    def get(self, node_id: int) -> SuccessScore:
+        idx = int(np.searchsorted(self.ids, node_id))
+        if idx >= len(self.ids) or self.ids[idx] != node_id:
+            raise KeyError(f"node {node_id} was not scored")
+        return SuccessScore(float(self.completion_percentage[idx]), float(self.success_inertia[idx]),
+                            float(self.derailment_chance[idx]), int(self.score[idx]))
+
+
+def build_tree_arrays(ids, parent_ids, depth, priority, importance, difficulty,
+                      days_until_due, days_past_due, statuses) -> TreeArrays:
+    ids = np.asarray(ids, dtype=np.int64)
+    order = np.argsort(ids, kind="stable")
+    ids = ids[order]
+    parent_ids = np.asarray(parent_ids, dtype=np.int64)[order]
+    # parents outside of the loaded nodes (0 for roots) become -1
+    parent_idx = np.searchsorted(ids, parent_ids)
+    found = parent_idx < len(ids)
+    found[found] = ids[parent_idx[found]] == parent_ids[found]
+    parent_idx = np.where(found, parent_idx, -1)
+    def as_float(values) -> np.ndarray:
+        return np.asarray(values, dtype=np.float64)[order]
+    status = np.fromiter((STATUS_CODES.get(status, 0) for status in statuses), dtype=np.int8, count=len(ids))
+    return TreeArrays(ids, parent_idx, np.asarray(depth, dtype=np.int64)[order], as_float(priority),
+                      as_float(importance), as_float(difficulty), as_float(days_until_due),
+                      as_float(days_past_due), status[order])
+
+
+def load_tree_arrays(tree_id: int, conn: sqlite.Connection) -> TreeArrays:
+    columns: dict[str, list] = {}
+    for batch in db_select_columns(TREE_COLUMNS_QUERY, conn, (tree_id,)):
+        for name, values in batch.items():
+            columns.setdefault(name, []).extend(values)
+    if not columns:
+        return build_tree_arrays(*([] for _ in range(9)))
+    return build_tree_arrays(columns["id"], columns["parent_id"], columns["depth"], columns["priority"],
+                             columns["importance"], columns["difficulty"], columns["days_until_due"],
+                             columns["days_past_due"], columns["status"])
+
+
+def _roll_up(values: np.ndarray, arrays: TreeArrays) -> np.ndarray:
+    """
+    values: (n, k) per node sums, returns subtree sums. one np.add.at per level, deepest first
+    """
+    totals = values.copy()
+    order = np.argsort(arrays.depth, kind="stable")
+    depths = arrays.depth[order]
+    bounds = np.flatnonzero(np.diff(depths)) + 1
+    for level in reversed(np.split(order, bounds)):
+        level = level[arrays.parent_idx[level] >= 0]
+        if len(level):
+            np.add.at(totals, arrays.parent_idx[level], totals[level])
+    return totals
+
+
+def score_tree(arrays: TreeArrays) -> TreeScores:
+    """
+    every stat is a weighted mean over a node's subtree, weighted by 1 + priority + importance.
+    completion: share of the subtree that's complete
+    inertia: progress (in progress counts half) discounted the longer a goal is overdue
+    derailment: logistic of difficulty, lateness and how close the deadline is, 0 once complete
+    """
+    weight = 1.0 + np.clip(arrays.priority, 0, None) + np.clip(arrays.importance, 0, None)
+    complete = (arrays.status == STATUS_CODES["complete"]).astype(np.float64)
+    progress = STATUS_PROGRESS[arrays.status] / (1.0 + arrays.days_past_due / LATE_DECAY_DAYS)
+    risk = (0.35 * (arrays.difficulty - 5.0)
+            + 0.2 * arrays.days_past_due
+            - 0.05 * np.minimum(np.clip(arrays.days_until_due, 0, None), DUE_HORIZON_DAYS))
+    derailment = (1.0 - complete) / (1.0 + np.exp(-risk))
+
+    sums = _roll_up(np.column_stack((weight, weight * complete, weight * progress, weight * derailment)), arrays)
+    completion = sums[:, 1] / sums[:, 0]
+    inertia = sums[:, 2] / sums[:, 0]
+    derailment = sums[:, 3] / sums[:, 0]
+    completion_weight, inertia_weight, derail_weight = SCORE_WEIGHTS
+    score = np.rint(100.0 * (completion_weight * completion + inertia_weight * inertia
+                             + derail_weight * (1.0 - derailment)))
+    return TreeScores(arrays.ids, 100.0 * completion, inertia, derailment, score.astype(np.int64))
+
+
+def score_tree_nodes(tree_id: int, conn: sqlite.Connection) -> TreeScores:
+    return score_tree(load_tree_arrays(tree_id, conn))
+
+
+def score_node(node: GoalNode, conn: sqlite.Connection|None=None) -> SuccessScore:
+    # without a connection the node is scored on its own, with one its whole subtree counts
+    if conn is not None:
+        return score_tree_nodes(node.tree_id, conn).get(node.id)
+    arrays = build_tree_arrays([node.id], [0], [0], [node.priority], [node.importance], [node.difficulty],
+                               [node.days_until_due], [node.days_past_due], [node.status])
+    return score_tree(arrays).get(node.id)
@@ -0,0 +1,35 @@
+from typing import Iterator
+import questionary
+from prompt_toolkit.completion import CompleteEvent, Completer, Completion
+from prompt_toolkit.document import Document
+from sqlcipher3 import dbapi2 as sqlite
+from db import db_connection
+from goal_search import SEARCH_LIMIT, SearchResult, search
+
+
+class SearchCompleter(Completer):
+    """
+    re-runs the fts5 search on every keystroke, the last typed word matches as a prefix.
+    results are kept by title so the picked completion can be mapped back to its row
+    """
+
+    def __init__(self, conn: sqlite.Connection, limit: int=SEARCH_LIMIT):
+        self.conn = conn
+        self.limit = limit
+        self.results: dict[str, SearchResult] = {}
+
+    def get_completions(self, document: Document, complete_event: CompleteEvent) -> Iterator[Completion]:
+        text = document.text_before_cursor
+        for result in search(text, self.conn, self.limit):
+            self.results.setdefault(result.title, result)
+            yield Completion(result.title, start_position=-len(text), display_meta=result.source_type)
+
+
+def search_prompt(message: str, conn: sqlite.Connection|None=None) -> SearchResult|None:
+    # None when nothing was picked or the typed text isn't one of the suggested titles
+    if conn is None:
+        with db_connection() as conn:
+            return search_prompt(message, conn)
+    completer = SearchCompleter(conn)
+    answer = questionary.autocomplete(message, choices=[], completer=completer).ask()
+    return None if answer is None else completer.results.get(answer)
@@ -0,0 +1,141 @@
+from typing import Final, Sequence
+from prompt_toolkit.application import Application
+from prompt_toolkit.buffer import Buffer
+from prompt_toolkit.formatted_text import StyleAndTextTuples
+from prompt_toolkit.key_binding import KeyBindings, KeyPressEvent
+from prompt_toolkit.layout import HSplit, Layout, Window
+from prompt_toolkit.layout.controls import BufferControl, FormattedTextControl
+from prompt_toolkit.styles import Style
+from choice_index import ChoiceIndex, IncrementalFilter
+
+
+WINDOW_HEIGHT: Final[int] = 10
+STYLE: Final[Style] = Style.from_dict({"cursor": "bold reverse", "selected": "bold #FFDA00",
+                                       "hint": "#EB05BD", "error": "bold #EB2005"})
+
+
+class VirtualSelect:
+    """
+    the state behind select_prompt. only the `height` matches around the cursor are ever turned into
+    lines, so a keystroke costs the filter update plus one window however many choices there are
+    """
+
+    def __init__(self, choices: Sequence[str]|ChoiceIndex, height: int=WINDOW_HEIGHT, multi: bool=True):
+        self.index = choices if isinstance(choices, ChoiceIndex) else ChoiceIndex(choices)
+        self.filter = IncrementalFilter(self.index)
+        self.height = height
+        self.multi = multi
+        self.matches: Sequence[int] = self.filter.matches
+        self.cursor = 0 # position in matches
+        self.top = 0 # position in matches of the first visible line
+        self.selected: dict[int, None] = {} # choice indexes in the order they were picked
+
+    def set_query(self, query: str):
+        self.matches = self.filter.update(query)
+        self.cursor = self.top = 0
+
+    def move(self, delta: int):
+        if not self.matches:
+            return
+        self.cursor = max(0, min(len(self.matches) - 1, self.cursor + delta))
+        if self.cursor < self.top:
+            self.top = self.cursor
+        elif self.cursor >= self.top + self.height:
+            self.top = self.cursor - self.height + 1
+
+    def current(self) -> int|None:
+        return self.matches[self.cursor] if self.matches else None
+
+    def toggle(self):
+        if (choice := self.current()) is None:
+            return
+        if choice in self.selected:
+            del self.selected[choice]
+        elif self.multi:
+            self.selected[choice] = None
+        else:
+            self.selected = {choice: None}
+
+    def visible(self) -> list[tuple[int, bool, bool]]:
+        # (choice index, under the cursor, selected) for each line of the window
+        return [(choice, self.top + offset == self.cursor, choice in self.selected)
+                for offset, choice in enumerate(self.matches[self.top:self.top + self.height])]
+
+    def fragments(self) -> StyleAndTextTuples:
+        lines: StyleAndTextTuples = []
+        for choice, under_cursor, selected in self.visible():
+            style = "class:cursor" if under_cursor else "class:selected" if selected else ""
+            lines.append((style, f"{'[x]' if selected else '[ ]'} {self.index.choices[choice]}\n"))
+        return lines
+
+    def answer(self) -> list[str]:
+        return [self.index.choices[choice] for choice in self.selected]
+
+
+def select_prompt(message: str, choices: Sequence[str]|ChoiceIndex, multi: bool=True, min_choices: int=0,
+                  max_choices: int|None=None, height: int=WINDOW_HEIGHT) -> list[str]|str|None:
+    """
+    type to filter, up/down/pgup/pgdn to move, tab to pick, enter to finish. single select returns the
+    choice under the cursor, multi select the picked choices (or the one under the cursor when none were
+    picked). None when cancelled
+    """
+    index = choices if isinstance(choices, ChoiceIndex) else ChoiceIndex(choices)
+    if (picked := select_indexes(message, index, multi, min_choices, max_choices, height)) is None:
+        return None
+    return [index.choices[idx] for idx in picked] if isinstance(picked, list) else index.choices[picked]
+
+
+def select_indexes(message: str, choices: Sequence[str]|ChoiceIndex, multi: bool=True, min_choices: int=0,
+                   max_choices: int|None=None, height: int=WINDOW_HEIGHT) -> list[int]|int|None:
+    # select_prompt answering with positions in choices, for callers that map them back to their own objects
+    select = VirtualSelect(choices, height, multi)
+    status: list[StyleAndTextTuples] = [[]]
+    query = Buffer(multiline=False, on_text_changed=lambda buffer: select.set_query(buffer.text))
+    bindings = KeyBindings()
+
+    def count() -> StyleAndTextTuples:
+        picked = f", {len(select.selected)} picked" if multi else ""
+        return [("class:hint", f"{len(select.matches)}/{len(select.index)} matching{picked}  "), *status[0]]
+
+    @bindings.add("up")
+    def _(event: KeyPressEvent):
+        select.move(-1)
+
+    @bindings.add("down")
+    def _(event: KeyPressEvent):
+        select.move(1)
+
+    @bindings.add("pageup")
+    def _(event: KeyPressEvent):
+        select.move(-height)
+
+    @bindings.add("pagedown")
+    def _(event: KeyPressEvent):
+        select.move(height)
+
+    @bindings.add("tab")
+    def _(event: KeyPressEvent):
+        select.toggle()
+        status[0] = []
+
+    @bindings.add("enter")
+    def _(event: KeyPressEvent):
+        if (picked := list(select.selected)) == [] and (choice := select.current()) is not None:
+            picked = [choice]
+        if not picked:
+            return
+        if multi and not min_choices <= len(picked) <= (max_choices or len(picked)):
+            status[0] = [("class:error", f"pick {min_choices}-{max_choices or 'any'} choices")]
+            return
+        event.app.exit(result=picked if multi else picked[0])
+
+    @bindings.add("c-c")
+    @bindings.add("escape")
+    def _(event: KeyPressEvent):
+        event.app.exit(result=None)
+
+    layout = Layout(HSplit([
+        Window(BufferControl(query), height=1, get_line_prefix=lambda line, wrap: [("bold", f"{message} ")]),
+        Window(FormattedTextControl(count), height=1),
+        Window(FormattedTextControl(select.fragments), height=height)]))
+    return Application(layout, key_bindings=bindings, style=STYLE, erase_when_done=True).run()
@@ -0,0 +1,181 @@
+from dataclasses import astuple, dataclass, replace
+from typing import Final, Iterable
+import numpy as np
+from sqlcipher3 import dbapi2 as sqlite
+from custom_types import StreakRecord
+from db import date_from_db, db_insert_many, transaction
+
+
+COMPLETION: Final[int] = 1
+MISS: Final[int] = 0
+STREAK_COLUMNS: Final[tuple[str, ...]] = (
+        "habit_id", "started_on", "last_event", "last_complete", "last_incomplete", "current_kind",
+        "current_run", "longest_completion_streak", "shortest_completion_streak", "completion_runs",
+        "average_completion_streak", "longest_incompletion_streak", "shortest_incompletion_streak",
+        "incompletion_runs", "average_incompletion_streak")
+SELECT_STREAK_QUERY: Final[str] = f"SELECT {', '.join(STREAK_COLUMNS)} FROM streaks WHERE habit_id = ?"
+UPSERT_STREAK_QUERY: Final[str] = (f"INSERT OR REPLACE INTO streaks({', '.join(STREAK_COLUMNS)}) "
+                                   f"VALUES({', '.join('?' * len(STREAK_COLUMNS))})")
+_NO_DAY: Final[int] = np.iinfo(np.int64).min
+
+
+@dataclass(slots=True)
+class StreakState:
+    # a streaks row, fields in STREAK_COLUMNS order. days are days since the unix epoch
+    habit_id: int
+    started_on: int
+    last_event: int
+    last_complete: int|None
+    last_incomplete: int|None
+    current_kind: int
+    current_run: int
+    longest_completion_streak: int=0
+    shortest_completion_streak: int|None=None
+    completion_runs: int=0
+    average_completion_streak: float=0.0
+    longest_incompletion_streak: int=0
+    shortest_incompletion_streak: int|None=None
+    incompletion_runs: int=0
+    average_incompletion_streak: float=0.0
+
+
+def _close_run(state: StreakState):
+    # the open run just ended, it now counts toward the shortest and the running mean
+    length = state.current_run
+    if state.current_kind == COMPLETION:
+        state.completion_runs += 1
+        state.average_completion_streak += (length - state.average_completion_streak) / state.completion_runs
+        if state.shortest_completion_streak is None or length < state.shortest_completion_streak:
+            state.shortest_completion_streak = length
+    else:
+        state.incompletion_runs += 1
+        state.average_incompletion_streak += (length - state.average_incompletion_streak) / state.incompletion_runs
+        if state.shortest_incompletion_streak is None or length < state.shortest_incompletion_streak:
+            state.shortest_incompletion_streak = length
+
+
+def fold_event(state: StreakState|None, habit_id: int, day: int, completed: bool) -> StreakState:
+    """
+    folds one completion or miss into the aggregates in constant time, returns a new state.
+    events have to arrive in date order, one per day at most
+    """
+    kind = COMPLETION if completed else MISS
+    if state is None:
+        state = StreakState(habit_id, day, day, None, None, kind, 0)
+    elif day <= state.last_event:
+        raise ValueError(f"habit {habit_id}: event on day {day} isn't after the last one on day {state.last_event}")
+    else:
+        state = replace(state)
+        if kind != state.current_kind:
+            _close_run(state)
+            state.current_kind = kind
+            state.current_run = 0
+    state.current_run += 1
+    state.last_event = day
+    if kind == COMPLETION:
+        state.last_complete = day
+        state.longest_completion_streak = max(state.longest_completion_streak, state.current_run)
+    else:
+        state.last_incomplete = day
+        state.longest_incompletion_streak = max(state.longest_incompletion_streak, state.current_run)
+    return state
+
+
+def to_streak_record(state: StreakState) -> StreakRecord:
+    # runs of a kind that haven't closed yet have no shortest, the record holds 0 for those
+    return StreakRecord(date_from_db(state.started_on), date_from_db(state.last_complete), # pyright: ignore[]
+                        date_from_db(state.last_incomplete), # pyright: ignore[]
+                        state.longest_completion_streak, state.shortest_completion_streak or 0,
+                        state.longest_incompletion_streak, state.shortest_incompletion_streak or 0)
+
+
+def load_streak(habit_id: int, conn: sqlite.Connection) -> StreakState|None:
+    row = conn.execute(SELECT_STREAK_QUERY, (habit_id,)).fetchone()
+    return None if row is None else StreakState(*row)
+
+
+def record_event(habit_id: int, day: int, completed: bool, conn: sqlite.Connection) -> StreakState:
+    # one row read and one row written however long the habit's history is
+    with transaction(conn, "IMMEDIATE"):
+        state = fold_event(load_streak(habit_id, conn), habit_id, day, completed)
+        conn.execute(UPSERT_STREAK_QUERY, astuple(state))
+    return state
+
+
+def _min_at(length: int, groups: np.ndarray, values: np.ndarray) -> np.ndarray:
+    out = np.full(length, np.iinfo(np.int64).max, dtype=np.int64)
+    np.minimum.at(out, groups, values)
+    return out
+
+
+def _max_at(length: int, groups: np.ndarray, values: np.ndarray, initial: int) -> np.ndarray:
+    out = np.full(length, initial, dtype=np.int64)
+    np.maximum.at(out, groups, values)
+    return out
+
+
+def compute_streaks(habit_ids: Iterable[int]|np.ndarray, days: Iterable[int]|np.ndarray,
+                    completed: Iterable[bool]|np.ndarray) -> list[StreakState]:
+    """
+    full-history backfill, the same states folding every event through fold_event would give but
+    computed with array operations over the runs. the three sequences are parallel, in any order
+    """
+    habit_ids = np.asarray(habit_ids, dtype=np.int64)
+    days = np.asarray(days, dtype=np.int64)
+    kinds = np.asarray(completed, dtype=bool)
+    if not len(habit_ids):
+        return []
+    order = np.lexsort((days, habit_ids))
+    habit_ids, days, kinds = habit_ids[order], days[order], kinds[order]
+    new_habit = np.empty(len(habit_ids), dtype=bool)
+    new_habit[0] = True
+    np.not_equal(habit_ids[1:], habit_ids[:-1], out=new_habit[1:])
+    repeated = ~new_habit[1:] & (days[1:] == days[:-1])
+    if repeated.any():
+        at = int(np.flatnonzero(repeated)[0]) + 1
+        raise ValueError(f"habit {habit_ids[at]}: more than one event on day {days[at]}")
+
+    habit_idx = np.cumsum(new_habit) - 1
+    habit_count = int(habit_idx[-1]) + 1
+    habit_starts = np.flatnonzero(new_habit)
+    habit_ends = np.append(habit_starts[1:], len(habit_ids)) - 1
+    last_complete = _max_at(habit_count, habit_idx[kinds], days[kinds], _NO_DAY)
+    last_incomplete = _max_at(habit_count, habit_idx[~kinds], days[~kinds], _NO_DAY)
+
+    # runs of one kind, a new one starts wherever the habit or the kind changes
+    new_run = new_habit.copy()
+    new_run[1:] |= kinds[1:] != kinds[:-1]
+    run_starts = np.flatnonzero(new_run)
+    run_lengths = np.diff(np.append(run_starts, len(habit_ids)))
+    run_habit = habit_idx[run_starts]
+    run_kind = kinds[run_starts]
+    open_run = np.append(run_habit[1:] != run_habit[:-1], True)
+
+    columns = {}
+    for prefix, of_kind in (("completion", run_kind), ("incompletion", ~run_kind)):
+        closed = of_kind & ~open_run
+        runs = np.bincount(run_habit[closed], minlength=habit_count)
+        totals = np.bincount(run_habit[closed], weights=run_lengths[closed], minlength=habit_count)
+        columns[prefix] = (_max_at(habit_count, run_habit[of_kind], run_lengths[of_kind], 0),
+                           _min_at(habit_count, run_habit[closed], run_lengths[closed]), runs,
+                           np.divide(totals, runs, out=np.zeros(habit_count), where=runs > 0))
+
+    states = []
+    for idx, (habit_id, started_on, last_event, kind, current_run) in enumerate(zip(
+            habit_ids[habit_starts].tolist(), days[habit_starts].tolist(), days[habit_ends].tolist(),
+            run_kind[open_run].tolist(), run_lengths[open_run].tolist())):
+        aggregates = []
+        for longest, shortest, runs, average in columns.values():
+            count = int(runs[idx])
+            aggregates += [int(longest[idx]), int(shortest[idx]) if count else None, count, float(average[idx])]
+        states.append(StreakState(habit_id, started_on, last_event,
+                                  None if last_complete[idx] == _NO_DAY else int(last_complete[idx]),
+                                  None if last_incomplete[idx] == _NO_DAY else int(last_incomplete[idx]),
+                                  COMPLETION if kind else MISS, current_run, *aggregates))
+    return states
+
+
+def backfill_streaks(habit_ids: Iterable[int]|np.ndarray, days: Iterable[int]|np.ndarray,
+                     completed: Iterable[bool]|np.ndarray, conn: sqlite.Connection) -> int:
+    # replaces the stored streaks of every habit that has events, returns how many were written
+    return db_insert_many(UPSERT_STREAK_QUERY, compute_streaks(habit_ids, days, completed), conn, astuple).rows
@@ -0,0 +1,202 @@
+# run from src/: python -m testing.closure_benchmark
+# prerequisite closure lookups vs recursive walks on ~1M closure rows, a randomized check that the triggers
+# keep the closure equal to a full recompute, and what the closure costs tree inserts (none, parent/child
+# links aren't in it)
+import json
+import random
+import statistics
+import sys
+import tempfile
+from time import perf_counter
+from sqlcipher3 import dbapi2 as sqlite
+import db
+import dependencies
+import node_closure
+from testing.db_benchmarks import fresh_db, make_node
+
+
+DEEP_CHAIN = 10_000 # one tree that's a single chain, a parent/child closure would need 50M rows for it
+PROJECT_SIZE = 80 # prerequisites only link goals inside the same project
+PROJECTS = 1_700
+CHECK_PROJECTS = 40 # the consistency check recomputes the whole closure every round, so it gets a small db
+QUERIES = 200
+CHECK_ROUNDS = 20
+EDITS_PER_ROUND = 100
+DEEP_INSERT_BUDGET = 2.0 # seconds for the chain, it took minutes with parent/child closure rows
+
+BLOCKED_WALK_QUERY = """
+WITH RECURSIVE walk(id) AS (
+  SELECT node_id FROM prerequisite_edges WHERE prerequisite_id = ?
+  UNION
+  SELECT prerequisite_edges.node_id FROM prerequisite_edges JOIN walk ON prerequisite_edges.prerequisite_id = walk.id
+)
+SELECT id FROM walk
+"""
+BLOCKED_REACHABLE_QUERY = """
+WITH RECURSIVE walk(id) AS (
+  SELECT node_id FROM prerequisite_edges WHERE prerequisite_id = ?
+  UNION
+  SELECT prerequisite_edges.node_id FROM prerequisite_edges JOIN walk ON prerequisite_edges.prerequisite_id = walk.id
+)
+SELECT EXISTS (SELECT 1 FROM walk WHERE id = ?)
+"""
+
+
+def chain(first_id: int, tree_id: int):
+    for node_id in range(first_id, first_id + DEEP_CHAIN):
+        yield make_node(node_id, 0 if node_id == first_id else node_id - 1, tree_id)
+
+
+def prerequisite_forest(first_id: int, projects: int=PROJECTS):
+    # every goal waits on one or two earlier goals of its project, a dag with plenty of diamonds
+    node_id = first_id - 1
+    for project in range(projects):
+        start = node_id + 1
+        for offset in range(PROJECT_SIZE):
+            node_id += 1
+            node = make_node(node_id, 0, 2 + project)
+            if offset:
+                node.prerequisite = random.sample(range(start, node_id), min(offset, random.randint(1, 2)))
+            yield node
+
+
+def per_query_ms(conn, query: str, params: list[tuple]) -> float:
+    start = perf_counter()
+    for args in params:
+        conn.execute(query, args).fetchall()
+    return (perf_counter() - start) * 1000 / len(params)
+
+
+def per_call_ms(func, params: list[tuple]) -> float:
+    start = perf_counter()
+    for args in params:
+        func(*args)
+    return (perf_counter() - start) * 1000 / len(params)
+
+
+def compare(label: str, walk_ms: float, closure_ms: float):
+    print(f"  {label:<38} walk {walk_ms:8.3f}ms  closure {closure_ms:8.3f}ms  {walk_ms / closure_ms:6.1f}x")
+
+
+def random_edit(conn: sqlite.Connection, first: int, last: int) -> bool:
+    # rewrites one goal's prerequisites (or deletes the goal) through nodes, the way the app changes them.
+    # returns False when the triggers rejected it as a cycle
+    node_id = random.randint(first, last)
+    if random.random() < 0.05:
+        db.db_delete("DELETE FROM nodes WHERE id = ?", (node_id,), conn)
+        return True
+    project_start = first + (node_id - first) // PROJECT_SIZE * PROJECT_SIZE
+    # mostly earlier goals, sometimes later ones so cycles get attempted too
+    pool = range(project_start, min(project_start + PROJECT_SIZE, last + 1))
+    prerequisites = random.sample([other for other in pool if other != node_id], random.randint(0, 3))
+    try:
+        db.db_update("UPDATE nodes SET prerequisite = ? WHERE id = ?", (json.dumps(prerequisites), node_id), conn)
+    except sqlite.IntegrityError:
+        return False
+    return True
+
+
+def check_consistency(directory: str):
+    conn = fresh_db(directory, "consistency.db")
+    db.insert_nodes(prerequisite_forest(1, CHECK_PROJECTS), conn)
+    first, last = 1, CHECK_PROJECTS * PROJECT_SIZE
+    rejected = 0
+    for round in range(CHECK_ROUNDS):
+        for _ in range(EDITS_PER_ROUND):
+            rejected += not random_edit(conn, first, last)
+        missing, extra = node_closure.verify_closure(conn)
+        if missing or extra:
+            print(f"FAIL closure drifted after round {round}, {missing} missing {extra} extra rows")
+            sys.exit(1)
+        for _ in range(QUERIES // 10):
+            a = random.randint(first, last)
+            b = a + random.randint(-PROJECT_SIZE, PROJECT_SIZE)
+            walked = bool(conn.execute(BLOCKED_REACHABLE_QUERY, (a, b)).fetchone()[0])
+            if node_closure.is_reachable(a, b, conn) != walked:
+                print(f"FAIL is_reachable({a}, {b}) disagrees with a walk")
+                sys.exit(1)
+    print(f"  {CHECK_ROUNDS * EDITS_PER_ROUND:,} random edits ({rejected} rejected as cycles), closure matched "
+          f"a full recompute after every {EDITS_PER_ROUND}")
+    conn.close()
+
+
+def check_dependency_writes(directory: str):
+    # a graph that didn't load every node still has to keep the links it doesn't know about, and a goal that
+    # waits on an incomplete prerequisite can't be started
+    conn = fresh_db(directory, "dependencies.db")
+    nodes = [make_node(node_id, 0, node_id) for node_id in range(1, 4)]
+    nodes[0].postrequisite, nodes[1].prerequisite = [2], [1]
+    db.insert_nodes(nodes, conn)
+    graph = dependencies.DependencyGraph()
+    dependencies.add_prerequisites(graph, 3, [1], conn)
+    added = conn.execute("SELECT postrequisite FROM nodes WHERE id = 1").fetchone()[0]
+    try:
+        dependencies.set_status(graph, 3, "in progress", conn)
+        started = True
+    except ValueError:
+        started = False
+    status = conn.execute("SELECT status FROM nodes WHERE id = 3").fetchone()[0]
+    dependencies.remove_prerequisites(graph, 3, [1], conn)
+    requisites = [(json.loads(pre or "[]"), json.loads(post or "[]"))
+                  for pre, post in conn.execute("SELECT prerequisite, postrequisite FROM nodes ORDER BY id")]
+    conn.close()
+    if json.loads(added) != [2, 3] or started or status != "locked" or requisites != [([], [2]), ([1], []), ([], [])]:
+        print(f"FAIL prerequisite writes: node 1 postrequisites {added} after a link, node 3 started {started} "
+              f"({status}), links after removing it {requisites}")
+        sys.exit(1)
+
+
+def main():
+    random.seed(3)
+    with tempfile.TemporaryDirectory() as directory:
+        conn = fresh_db(directory, "closure.db")
+        start = perf_counter()
+        db.insert_nodes(chain(1, 1), conn)
+        chain_secs = perf_counter() - start
+        print(f"{DEEP_CHAIN:,} level chain inserted in {chain_secs:.2f}s")
+        if chain_secs > DEEP_INSERT_BUDGET:
+            print(f"FAIL deep chain over its {DEEP_INSERT_BUDGET}s budget")
+            sys.exit(1)
+        first = DEEP_CHAIN + 1
+        start = perf_counter()
+        db.insert_nodes(prerequisite_forest(first), conn)
+        print(f"{PROJECTS * PROJECT_SIZE:,} prerequisite goals inserted in {perf_counter() - start:.2f}s")
+        rows = conn.execute("SELECT count(*) FROM node_closure").fetchone()[0]
+        print(f"closure rows: {rows:,}")
+
+        heads = [(first + project * PROJECT_SIZE + random.randint(0, 3),) for project in random.sample(range(PROJECTS), QUERIES)]
+        pairs = [(node_id, node_id + random.randint(1, PROJECT_SIZE - 5)) for (node_id,) in heads]
+        compare("everything blocked by X", per_query_ms(conn, BLOCKED_WALK_QUERY, heads),
+                per_call_ms(lambda node_id: node_closure.blocked_by(node_id, conn), heads))
+        compare("is B blocked by A", per_query_ms(conn, BLOCKED_REACHABLE_QUERY, pairs),
+                per_call_ms(lambda a, b: node_closure.is_reachable(a, b, conn), pairs))
+
+        # incremental upkeep, a new prerequisite link near the top of a project and taking it away again
+        timings = []
+        for (node_id,) in heads[:50]:
+            target = node_id + PROJECT_SIZE - 10
+            if node_closure.is_reachable(target, node_id, conn):
+                continue
+            start = perf_counter()
+            with db.transaction(conn):
+                conn.execute("INSERT OR IGNORE INTO prerequisite_edges(prerequisite_id, node_id) VALUES(?, ?)",
+                             (node_id, target))
+                conn.execute("DELETE FROM prerequisite_edges WHERE prerequisite_id = ? AND node_id = ?",
+                             (node_id, target))
+            timings.append((perf_counter() - start) * 1000)
+        print(f"  add + remove a prerequisite link: {statistics.median(timings):.2f}ms median")
+
+        start = perf_counter()
+        rows = node_closure.rebuild_closure(conn)
+        print(f"rebuild: {rows:,} rows in {perf_counter() - start:.2f}s")
+        missing, extra = node_closure.verify_closure(conn)
+        if missing or extra:
+            print(f"FAIL closure drifted, {missing} missing {extra} extra rows")
+            sys.exit(1)
+        conn.close()
+        check_consistency(directory)
+        check_dependency_writes(directory)
+
+
+if __name__ == "__main__":
+    main()
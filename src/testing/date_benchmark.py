@@ -0,0 +1,109 @@
+# run from src/: python -m testing.date_benchmark
+# compiled date parsing vs strptime, checks both agree on every input first
+import random
+import sys
+from datetime import date, datetime
+from time import perf_counter
+from date_parsing import DateParser
+from old_prompting import StrFormats
+
+
+N_VALUES = 100_000
+REPEATS = 3
+# (value, format) pairs off the random mix's path, each has to parse the same as strptime
+EDGE_CASES = [("12:30", "%I:%M"), ("12:30 am", "%I:%M %p"), ("12:30 pm", "%I:%M %p"), ("1:05", "%I:%M"),
+              ("1/ 5/26", "%m/%d/%y"), (" 1/5/26", "%m/%d/%y"), ("1/5/26 ", "%m/%d/%y"),
+              ("01/02/26  3:04 pm", "%m/%d/%y %I:%M %p"), ("00:10", "%I:%M"), ("13:10", "%I:%M")]
+
+
+def random_values(n: int, seed: int=7) -> list[str]:
+    # mix of every format the prompts accept plus some garbage, roughly what a bulk import sees
+    rng = random.Random(seed)
+    values = []
+    for _ in range(n):
+        moment = datetime(2000, 1, 1) + (datetime(2040, 1, 1) - datetime(2000, 1, 1)) * rng.random()
+        fmt = rng.choice(list(StrFormats))
+        value = moment.strftime(fmt)
+        if rng.random() < 0.3: # unpadded months/days like 1/5/26
+            value = value.replace("/0", "/").lstrip("0")
+        if rng.random() < 0.05:
+            value = value[:-1] + "x"
+        if rng.random() < 0.03: # strptime refuses these, the compiled parser has to as well
+            value = rng.choice((" ", "\t")) + value if rng.random() < 0.5 else value + " "
+        values.append(value)
+    return values
+
+
+def strptime_loop(value: str) -> datetime|None:
+    # what DatePrompt.find_correct_format used to do
+    for fmt in StrFormats:
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+    return None
+
+
+def strptime_or_none(value: str, fmt: str) -> datetime|None:
+    try:
+        return datetime.strptime(value, fmt)
+    except ValueError:
+        return None
+
+
+def strptime_import_date(value: str) -> date|None:
+    # goal_import's old path, str_to_date as MM/DD/YY then ISO
+    for fmt in ("%m/%d/%y", "%Y/%m/%d"):
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+def timed(fn, values: list[str]) -> float:
+    best = float("inf")
+    for _ in range(REPEATS):
+        start = perf_counter()
+        for value in values:
+            fn(value)
+        best = min(best, perf_counter() - start)
+    return best
+
+
+def report(label: str, baseline: float, compiled: float, n: int):
+    print(f"{label:<34} strptime {baseline / n * 1e6:6.2f}us  compiled {compiled / n * 1e6:6.2f}us  "
+          f"{baseline / compiled:5.1f}x")
+
+
+def main():
+    values = random_values(N_VALUES)
+    parser = DateParser(StrFormats)
+    mismatches = [value for value in values if strptime_loop(value) != parser.parse_datetime(value)]
+    if mismatches:
+        print(f"FAIL {len(mismatches)} inputs parse differently, e.g. {mismatches[:5]}")
+        sys.exit(1)
+    edge_mismatches = [(value, fmt) for value, fmt in EDGE_CASES
+                       if strptime_or_none(value, fmt) != DateParser((fmt,)).parse_datetime(value)]
+    if edge_mismatches:
+        print(f"FAIL edge cases parse differently from strptime: {edge_mismatches}")
+        sys.exit(1)
+
+    def uncached(value: str):
+        return parser._parse(value)
+    report("all StrFormats, unique inputs", timed(strptime_loop, values), timed(uncached, values), len(values))
+
+    # a due date column repeats the same handful of dates over and over
+    due_dates = [values[i % 500] for i in range(N_VALUES)]
+    report("all StrFormats, repeated inputs", timed(strptime_loop, due_dates),
+           timed(parser.parse_datetime, due_dates), len(due_dates))
+
+    import_parser = DateParser(("%m/%d/%y", "%Y/%m/%d"))
+    import_dates = [date(2020, 1, 1).fromordinal(date(2020, 1, 1).toordinal() + i % 3650).strftime("%m/%d/%y")
+                    for i in range(N_VALUES)]
+    report("goal import due dates", timed(strptime_import_date, import_dates),
+           timed(import_parser.parse_datetime, import_dates), len(import_dates))
+
+
+if __name__ == "__main__":
+    main()
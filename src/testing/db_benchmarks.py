@@ -0,0 +1,248 @@
+# run from src/: python -m testing.db_benchmarks
+import io
+import json
+import random
+import sys
+import tempfile
+import tracemalloc
+from pathlib import Path
+from time import perf_counter
+from typing import Iterator
+from custom_types import GoalNode
+import db
+import goal_import
+import goal_tree
+import tree_stats
+
+
+PASSWORD = "benchmark"
+TREE_SIZE = 100_000
+PER_ROW_SAMPLE = 5_000 # per row inserts are slow enough that only a sample is timed
+DEEP_TREE_LEVELS = 10_000
+WIDE_TREE_SIBLINGS = 100_000
+COMPARE_CHUNK_SIZE = 700 # small chunks so plenty of nodes hang off a parent from an earlier chunk
+BULK_SPEEDUP_TARGET = 10.0 # over per row inserts with the pool's defaults
+# what the per row insert triggers leave behind, the bulk path's per chunk statements have to match it
+DERIVED_QUERIES = (
+    "SELECT parent_id, child_id, tree_id FROM node_edges ORDER BY child_id",
+    "SELECT id, depth FROM nodes ORDER BY id",
+    "SELECT tree_id, depth, node_count FROM tree_levels ORDER BY tree_id, depth",
+    "SELECT id, node_count, complete_count, tree_height, tree_width, completion_percentage FROM trees ORDER BY id",
+    "SELECT prerequisite_id, node_id FROM prerequisite_edges ORDER BY node_id, prerequisite_id",
+    "SELECT rowid, title, body, source_type FROM search_index ORDER BY rowid",
+)
+
+
+def make_node(node_id: int, parent_id: int, tree_id: int=1) -> GoalNode:
+    return GoalNode(id=node_id, tree_id=tree_id, node_id=node_id, parent_id=parent_id,
+                    node_pos=float(node_id), goal_type="goal", goal_info={}, status="incomplete",
+                    intent=f"goal {node_id}", start_date=0, due_date=0, days_until_due=30,
+                    description="", post_completion_info={},
+                    priority=random.randint(0, 10), importance=random.randint(0, 10),
+                    difficulty=random.randint(0, 10))
+
+
+def random_tree(size: int, tree_id: int=1) -> Iterator[GoalNode]:
+    # node n hangs off a random earlier node so ids line up with nodes.id on an empty table
+    yield make_node(1, 0, tree_id)
+    for node_id in range(2, size + 1):
+        yield make_node(node_id, random.randint(1, node_id - 1), tree_id)
+
+
+def fresh_db(directory: str, name: str, trees: int=0):
+    # trees rows 1..trees, nodes of a tree without one don't get stats kept
+    conn, _ = db.connect_to_db(PASSWORD, Path(directory) / name)
+    db.run_migrations(conn)
+    conn.executemany("""INSERT INTO trees(id, tree_id, root_node, goal, node_count, tree_height, tree_width,
+                        completion_percentage) VALUES(?, ?, 1, 'benchmark', 0, 0, 0, 0)""",
+                     [(tree_id, tree_id) for tree_id in range(1, trees + 1)])
+    return conn
+
+
+def derived_state(conn) -> list[list[tuple]]:
+    return [conn.execute(query).fetchall() for query in DERIVED_QUERIES]
+
+
+def check_tree_stats(conn, label: str):
+    if drift := tree_stats.verify_tree_stats(1, conn):
+        print(f"FAIL tree stats drifted after the {label} {drift}")
+        sys.exit(1)
+
+
+def bench_bulk_insert(directory: str):
+    # nodes are built up front so only the writes are timed. the tree has a trees row so every insert
+    # also keeps its stats, and some nodes wait on an earlier one so every insert trigger has work to do
+    nodes = list(random_tree(TREE_SIZE))
+    for node in nodes[::7]:
+        node.status = "complete"
+    for node in nodes[20::13]:
+        node.prerequisite = [node.id - 10]
+    per_row_rates = {}
+    # WAL + synchronous=NORMAL (the pool default) doesn't fsync on commit, FULL does
+    for synchronous in ("NORMAL", "FULL"):
+        conn = fresh_db(directory, f"per_row_{synchronous}.db", trees=1)
+        conn.execute(f"PRAGMA synchronous = {synchronous}")
+        start = perf_counter()
+        for node in nodes[:PER_ROW_SAMPLE]:
+            db.db_insert(db.INSERT_NODE_QUERY, db.node_to_row(node), conn)
+        per_row_rates[synchronous] = PER_ROW_SAMPLE / (perf_counter() - start)
+        check_tree_stats(conn, "per row inserts")
+        per_row_state = derived_state(conn)
+        conn.close()
+
+    # the bulk path switches the insert triggers off and does their work per chunk, same result expected
+    conn = fresh_db(directory, "bulk_sample.db", trees=1)
+    db.insert_nodes(nodes[:PER_ROW_SAMPLE], conn, COMPARE_CHUNK_SIZE)
+    if derived_state(conn) != per_row_state:
+        print("FAIL bulk insert left different edges, depths, stats or search rows than per row inserts")
+        sys.exit(1)
+    conn.close()
+
+    conn = fresh_db(directory, "bulk.db", trees=1)
+    result = db.insert_nodes(nodes, conn)
+    bulk_rate = result.rows / result.secs
+    assert conn.execute("SELECT count(*) FROM nodes").fetchone()[0] == TREE_SIZE
+    check_tree_stats(conn, "bulk insert")
+    conn.close()
+
+    for synchronous, rate in per_row_rates.items():
+        print(f"per row insert (synchronous={synchronous}): {rate:,.0f} rows/s "
+              f"({TREE_SIZE / rate:.2f}s projected for {TREE_SIZE:,}) "
+              f"bulk speedup: {bulk_rate / rate:.1f}x")
+    print(f"bulk insert: {bulk_rate:,.0f} rows/s ({result.secs:.2f}s for {result.rows:,} in {result.chunks} chunks) "
+          f"with edges, tree stats, prerequisites and the search index kept")
+    if bulk_rate / per_row_rates["NORMAL"] < BULK_SPEEDUP_TARGET:
+        print(f"FAIL bulk insert under {BULK_SPEEDUP_TARGET:.0f}x per row inserts")
+        sys.exit(1)
+
+
+def check_pool_migrates(directory: str):
+    # the app only opens databases through the pool, a fresh file has to come out of it with the full schema
+    db.DATABASES["benchmark"] = Path(directory) / "pooled.db"
+    try:
+        with db.db_connection("benchmark", PASSWORD) as conn:
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+    finally:
+        db.close_pools()
+        del db.DATABASES["benchmark"]
+    if version != len(db.MIGRATIONS):
+        print(f"FAIL a new pool left the database at migration {version} of {len(db.MIGRATIONS)}")
+        sys.exit(1)
+
+
+def check_moves(directory: str):
+    # moves inside a tree keep its stats, a move under another tree's node has to be refused
+    conn = fresh_db(directory, "moves.db", trees=2)
+    db.insert_nodes([make_node(1, 0), make_node(2, 1), make_node(3, 2), make_node(4, 0, tree_id=2)], conn)
+    goal_tree.move_node(3, 1, conn)
+    check_tree_stats(conn, "a move inside the tree")
+    try:
+        goal_tree.move_node(1, 4, conn)
+    except ValueError:
+        pass
+    else:
+        print("FAIL moving a node under a node of another tree wasn't refused")
+        sys.exit(1)
+    check_tree_stats(conn, "a refused cross tree move")
+    conn.close()
+
+
+def check_import_rejects(directory: str):
+    # a failed trailing chunk only rejects its own records, not the already written chunk before it
+    conn = fresh_db(directory, "import.db", trees=1)
+    conn.execute("""CREATE TRIGGER reject_g5 BEFORE INSERT ON nodes WHEN NEW.intent = 'g5'
+                    BEGIN SELECT RAISE(ABORT, 'boom'); END""")
+    records = (goal_import.ImportRecord(line, {"goal": f"g{line}", "tree_id": 1}) for line in range(1, 6))
+    rejects = io.StringIO()
+    imported, rejected = goal_import.import_goal_records(records, conn, rejects, chunk_size=3)
+    rejected_goals = [json.loads(line)["record"]["goal"] for line in rejects.getvalue().splitlines()]
+    written = [row[0] for row in conn.execute("SELECT intent FROM nodes ORDER BY id")]
+    conn.close()
+    if (imported, rejected, rejected_goals, written) != (3, 2, ["g4", "g5"], ["g1", "g2", "g3"]):
+        print(f"FAIL import of 5 records with a failing last chunk wrote {written} and rejected {rejected_goals}")
+        sys.exit(1)
+
+
+def bench_streaming_select(directory: str):
+    conn = fresh_db(directory, "select.db")
+    db.insert_nodes(random_tree(TREE_SIZE), conn)
+
+    tracemalloc.start()
+    start = perf_counter()
+    nodes = [db.row_to_node(row) for row in conn.execute(db.SELECT_NODES_QUERY).fetchall()]
+    materialized_secs = perf_counter() - start
+    _, materialized_peak = tracemalloc.get_traced_memory()
+    del nodes
+    tracemalloc.reset_peak()
+
+    start = perf_counter()
+    priority_total = sum(node.priority for node in db.db_select(db.SELECT_NODES_QUERY, GoalNode, conn=conn))
+    streamed_secs = perf_counter() - start
+    _, streamed_peak = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+
+    start = perf_counter()
+    column_total = sum(sum(batch["priority"]) for batch in
+                       db.db_select_columns("SELECT priority FROM nodes", conn))
+    column_secs = perf_counter() - start
+    _, column_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    conn.close()
+    assert priority_total == column_total
+
+    print(f"fetchall + convert: {materialized_secs:.2f}s peak {materialized_peak / 2**20:.1f}MiB")
+    print(f"streamed GoalNode:  {streamed_secs:.2f}s peak {streamed_peak / 2**20:.1f}MiB")
+    print(f"streamed columns:   {column_secs:.2f}s peak {column_peak / 2**20:.1f}MiB")
+
+
+def timed(label: str, func, *args):
+    start = perf_counter()
+    result = func(*args)
+    print(f"{label}: {(perf_counter() - start) * 1000:.1f}ms")
+    return result
+
+
+def walk_subtree_per_level(root_id: int, conn) -> int:
+    # what the CTEs replace, a node load and a children_of query per node
+    count, stack = 0, [root_id]
+    while stack:
+        node_id = stack.pop()
+        db.row_to_node(conn.execute(db.SELECT_NODES_QUERY + " WHERE id = ?", (node_id,)).fetchone())
+        count += 1
+        stack.extend(goal_tree.children_of(node_id, conn))
+    return count
+
+
+def bench_tree_queries(directory: str):
+    conn = fresh_db(directory, "deep.db")
+    db.insert_nodes((make_node(node_id, node_id - 1) for node_id in range(1, DEEP_TREE_LEVELS + 1)), conn)
+    print(f"deep tree ({DEEP_TREE_LEVELS:,} levels)")
+    assert timed("  subtree (CTE)", lambda: sum(1 for _ in goal_tree.subtree(1, conn))) == DEEP_TREE_LEVELS
+    assert timed("  subtree (query per node)", walk_subtree_per_level, 1, conn) == DEEP_TREE_LEVELS
+    assert timed("  ancestors of deepest", lambda: sum(1 for _ in goal_tree.ancestors(DEEP_TREE_LEVELS, conn))) == DEEP_TREE_LEVELS - 1
+    assert timed("  depth of deepest", goal_tree.node_depth, DEEP_TREE_LEVELS, conn) == DEEP_TREE_LEVELS - 1
+    assert timed("  nodes at depth 5000", lambda: [node.id for node in goal_tree.nodes_at_depth(1, 5000, conn)]) == [5001]
+    conn.close()
+
+    conn = fresh_db(directory, "wide.db")
+    db.insert_nodes((make_node(node_id, 0 if node_id == 1 else 1) for node_id in range(1, WIDE_TREE_SIBLINGS + 2)), conn)
+    print(f"wide tree ({WIDE_TREE_SIBLINGS:,} siblings)")
+    assert timed("  subtree (CTE)", lambda: sum(1 for _ in goal_tree.subtree(1, conn))) == WIDE_TREE_SIBLINGS + 1
+    assert timed("  subtree (query per node)", walk_subtree_per_level, 1, conn) == WIDE_TREE_SIBLINGS + 1
+    assert timed("  nodes at depth 1", lambda: sum(1 for _ in goal_tree.nodes_at_depth(1, 1, conn))) == WIDE_TREE_SIBLINGS
+    assert timed("  ancestors of a leaf", lambda: [node.id for node in goal_tree.ancestors(WIDE_TREE_SIBLINGS, conn)]) == [1]
+    conn.close()
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        bench_bulk_insert(directory)
+        check_pool_migrates(directory)
+        check_moves(directory)
+        check_import_rejects(directory)
+        bench_streaming_select(directory)
+        bench_tree_queries(directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+# run from src/: python -m testing.dispatch_benchmark
+# picking and configuring the prompter for every ask (what get_prompter used to do) vs resolving each
+# question once through prompter_registry, then the new_goal questions answered end to end, on a terminal
+# and from an answer stream with nothing reaching the console
+import sys
+from datetime import date, datetime, time
+from functools import partial
+from time import perf_counter
+from rich.console import Console
+from rich.prompt import Confirm, FloatPrompt, IntPrompt, Prompt
+import old_prompting
+import prompter_registry
+from custom_types import Question
+from prompt_io import AnswerStreamIO, ConsoleIO, use_io
+from testing.prompt_benchmark import swapped
+from testing.render_benchmark import ByteCounter, ScriptedConsole
+
+
+ASKS = 200_000
+QUESTIONNAIRES = 300
+NEW_GOAL_ANSWERS = ["ship the thing", "y", "ship", "7", "8", "6", "01/02/26", "03/04/26", "confident"]
+
+
+def branching_prompter(question: Question):
+    # get_prompter's per ask dispatch, returning the configured prompter instead of asking with it
+    kwargs = question["kwargs"] if "kwargs" in question else {}
+    if question["type"] == "print":
+        return partial(old_prompting.console.print, question["question"])
+    elif question["type"] == "search":
+        from search_prompt import search_prompt
+        return partial(search_prompt, str(question["question"]))
+    elif question["type"] == "select" and question["answer_type"] is list:
+        return partial(old_prompting.multi_select_prompt, question["question"], question["choices"])
+    match question["answer_type"]:
+        case a if a is str:
+            return partial(Prompt.ask, question["question"], **kwargs)
+        case a if a is bool:
+            return partial(Confirm.ask, question["question"], **kwargs)
+        case a if a is int:
+            return partial(IntPrompt.ask, question["question"], **kwargs)
+        case a if a is float:
+            return partial(FloatPrompt.ask, question["question"], **kwargs)
+        case a if a is date or a is datetime:
+            return partial(old_prompting.date_prompt, a, str(question["question"]))
+        case a if a is time:
+            return partial(old_prompting.time_prompt, question=str(question["question"]))
+
+
+def timed_dispatch(dispatch, questions: list[Question]) -> float:
+    start = perf_counter()
+    for idx in range(ASKS):
+        dispatch(questions[idx % len(questions)])
+    return perf_counter() - start
+
+
+def run_new_goal() -> tuple[float, dict]:
+    counter = ByteCounter()
+    console = ScriptedConsole(NEW_GOAL_ANSWERS * QUESTIONNAIRES, file=counter, force_terminal=True,
+                              color_system="truecolor", width=100, height=50)
+    # the prompters resolved above are reused, they pick up the installed backend each time they ask
+    with use_io(ConsoleIO(console)):
+        start = perf_counter()
+        for _ in range(QUESTIONNAIRES):
+            answers = old_prompting.ask_questions()
+        return perf_counter() - start, answers
+
+
+def run_new_goal_headless() -> tuple[dict, int]:
+    # (answers, bytes that still reached old_prompting's console)
+    counter = ByteCounter()
+    with swapped(old_prompting, "console", Console(file=counter, force_terminal=True)), \
+         use_io(AnswerStreamIO(NEW_GOAL_ANSWERS)):
+        answers = old_prompting.ask_questions()
+    return answers, counter.bytes
+
+
+def main():
+    questions = old_prompting.QUESTIONS["new_goal"]
+    branching = timed_dispatch(branching_prompter, questions)
+    registry = timed_dispatch(prompter_registry.resolve, questions)
+    print(f"{ASKS:,} asks: branching {branching * 1e9 / ASKS:.0f}ns  registry {registry * 1e9 / ASKS:.0f}ns  "
+          f"{branching / registry:.1f}x")
+
+    @prompter_registry.register("text", complex)
+    def _complex_prompter(question: Question):
+        return lambda: complex(old_prompting.console.input(str(question["question"])))
+    custom = {"type": "text", "name": "z", "question": "z ?", "answer_type": complex}
+    with swapped(old_prompting, "console", ScriptedConsole(["1+2j"], file=ByteCounter())):
+        if prompter_registry.ask(custom) != 1 + 2j: # pyright: ignore[]
+            print("FAIL registered prompter wasn't used")
+            sys.exit(1)
+
+    secs, answers = run_new_goal()
+    expected = {"goal": "ship the thing", "alias?": True, "alias": "ship", "priority": 7, "importance": 8,
+                "difficulty": 6, "start_date": datetime(2026, 1, 2), "due_date": datetime(2026, 3, 4),
+                "deadline_confidence": "confident"}
+    if answers != expected:
+        print(f"FAIL new_goal answered {answers}")
+        sys.exit(1)
+    print(f"new_goal questions end to end {secs * 1000 / QUESTIONNAIRES:.2f}ms per questionnaire")
+    answers, leaked = run_new_goal_headless()
+    if answers != expected or leaked:
+        print(f"FAIL headless new_goal answered {answers}, {leaked:,} bytes reached the console")
+        sys.exit(1)
+
+    throwaway = [{"type": "text", "name": "x", "question": "x ?", "answer_type": str}
+                 for _ in range(prompter_registry.RESOLVED_CACHE_SIZE)]
+    for question in throwaway:
+        prompter_registry.resolve(question) # pyright: ignore[]
+        prompter_registry.resolve(questions[1])
+    if len(prompter_registry._RESOLVED) > prompter_registry.RESOLVED_CACHE_SIZE or \
+       prompter_registry._RESOLVED[id(questions[1])][0] is not questions[1]:
+        print("FAIL resolved prompter cache isn't bounded or dropped the one in use")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
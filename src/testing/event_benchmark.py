@@ -0,0 +1,111 @@
+# run from src/: python -m testing.event_benchmark
+# month-clustered event log vs a flat table for range queries, incremental streaks vs rebuilding them
+import random
+import sys
+import tempfile
+from datetime import date
+from time import perf_counter
+import event_log
+from db import date_to_db
+from event_log import Event
+from testing.db_benchmarks import fresh_db
+
+
+HABITS = 1_000
+FIRST_DAY = date_to_db(date(2024, 1, 1))
+DAYS = 731 # 2024 and 2025
+QUERIES = 50
+Q3 = (date_to_db(date(2025, 7, 1)), date_to_db(date(2025, 9, 30)))
+
+FLAT_TABLE = """
+CREATE TABLE flat_events(id INTEGER PRIMARY KEY, day INTEGER, subject_type TEXT, subject_id INTEGER,
+                         kind TEXT, value REAL, status TEXT)
+"""
+FLAT_COUNT_QUERY = "SELECT count(*) FROM flat_events WHERE day BETWEEN ? AND ? AND kind = ?"
+
+
+def history(days: range):
+    rates = [random.uniform(0.3, 0.95) for _ in range(HABITS)]
+    for day in days:
+        for habit_id in range(1, HABITS + 1):
+            done = random.random() < rates[habit_id - 1]
+            yield Event("habit", habit_id, "completion" if done else "miss", day)
+            if done and habit_id % 4 == 0:
+                yield Event("habit", habit_id, "time spent", day, random.randint(300, 3600))
+
+
+def per_query_ms(func, repeat: int=QUERIES) -> float:
+    start = perf_counter()
+    for _ in range(repeat):
+        func()
+    return (perf_counter() - start) * 1000 / repeat
+
+
+def streaks_table(conn) -> list[tuple]:
+    return conn.execute("SELECT * FROM streaks ORDER BY habit_id").fetchall()
+
+
+def same_streaks(a: list[tuple], b: list[tuple]) -> bool:
+    return len(a) == len(b) and all(
+        all(abs(x - y) < 1e-9 if isinstance(x, float) else x == y for x, y in zip(left, right))
+        for left, right in zip(a, b))
+
+
+def main():
+    random.seed(12)
+    with tempfile.TemporaryDirectory() as directory:
+        conn = fresh_db(directory, "events.db")
+        conn.executemany("INSERT INTO habits(id, goal) VALUES(?, ?)",
+                         [(habit_id, f"habit {habit_id}") for habit_id in range(1, HABITS + 1)])
+        conn.commit()
+        start = perf_counter()
+        written = event_log.append_events(history(range(FIRST_DAY, FIRST_DAY + DAYS)), conn)
+        print(f"{written:,} events appended in {perf_counter() - start:.2f}s")
+
+        conn.execute(FLAT_TABLE)
+        conn.execute("""INSERT INTO flat_events SELECT id, day, subject_type, subject_id, kind, value, status
+                        FROM events ORDER BY id""")
+        conn.commit()
+        scan_ms = per_query_ms(lambda: conn.execute(FLAT_COUNT_QUERY, (*Q3, "completion")).fetchone(), 5)
+        conn.execute("CREATE INDEX flat_events_day ON flat_events(day)")
+        conn.commit()
+
+        expected = conn.execute(FLAT_COUNT_QUERY, (*Q3, "completion")).fetchone()[0]
+        clustered = event_log.count_between(*Q3, "completion", conn)
+        monthly = sum(row[1] for row in event_log.month_totals(*Q3, "completion", conn))
+        if not expected == clustered == monthly:
+            print(f"FAIL completions in Q3: flat {expected} clustered {clustered} month totals {monthly}")
+            sys.exit(1)
+        flat_ms = per_query_ms(lambda: conn.execute(FLAT_COUNT_QUERY, (*Q3, "completion")).fetchone())
+        clustered_ms = per_query_ms(lambda: event_log.count_between(*Q3, "completion", conn))
+        totals_ms = per_query_ms(lambda: event_log.month_totals(*Q3, "completion", conn))
+        print(f"completions in Q3 ({expected:,}): flat table scan {scan_ms:.2f}ms  "
+              f"flat + day index {flat_ms:.2f}ms ({scan_ms / flat_ms:.0f}x)  "
+              f"month clustered {clustered_ms:.2f}ms ({scan_ms / clustered_ms:.0f}x)  "
+              f"event_months {totals_ms:.3f}ms ({scan_ms / totals_ms:.0f}x)")
+
+        start = perf_counter()
+        event_log.materialize_streaks(conn)
+        print(f"first materialization of the whole log: {perf_counter() - start:.2f}s")
+        # one more day of events, folded in vs rebuilding every habit from the log
+        event_log.append_events(history(range(FIRST_DAY + DAYS, FIRST_DAY + DAYS + 1)), conn)
+        # a correction for a day that was already folded in, those habits get recomputed
+        event_log.append_events([Event("habit", habit_id, "completion", FIRST_DAY + DAYS - 3)
+                                 for habit_id in random.sample(range(1, HABITS + 1), 20)], conn)
+        start = perf_counter()
+        changed = event_log.materialize_streaks(conn)
+        incremental_secs = perf_counter() - start
+        materialized = streaks_table(conn)
+        start = perf_counter()
+        event_log.rebuild_streaks(conn)
+        rebuild_secs = perf_counter() - start
+        print(f"next day ({changed:,} habits): materialize {incremental_secs * 1000:.1f}ms  "
+              f"rebuild {rebuild_secs * 1000:.1f}ms  {rebuild_secs / incremental_secs:.0f}x")
+        if not same_streaks(materialized, streaks_table(conn)):
+            print("FAIL incremental streaks drifted from a rebuild")
+            sys.exit(1)
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+# run from src/: python -m testing.headless_benchmark
+# one questionnaire through every prompter, answered from a stream with nothing rendered vs a scripted
+# terminal that still draws every Live region
+import io
+import sys
+from datetime import date
+from time import perf_counter
+from rich.text import Text
+import custom_prompter
+import prompt_logic
+from custom_prompter import PromptResult
+from prompt_io import AnswerStreamIO, ConsoleIO, PromptIO, use_io
+from prompt_logic import LiveSettings, QuestionSequence
+from testing.render_benchmark import ByteCounter, ScriptedConsole
+
+
+HEADLESS_RUNS = 5_000
+CONSOLE_RUNS = 200
+# the bad answers are there so the retry paths run too
+ANSWERS = ("maybe", "yes", "11", "7", "abc", "42", "13/45/26", "01/02/26", "read more",
+           "no", "fine", "3", "long", "nothing")
+EXPECTED = (True, 7, 42, date(2026, 1, 2), "read more", {"mood": "fine", "energy": "3", "day": "long", "notes": "nothing"})
+
+
+def sequence() -> QuestionSequence:
+    return {"questions": ({"name": "mood", "question": "how are you feeling ?", "ret_type": "str",
+                           "validator": lambda answer: (answer != "no", Text("answer properly"))},
+                          {"name": "energy", "question": "energy out of 5 ?", "ret_type": "str"},
+                          {"name": "day", "question": "how was the day ?", "ret_type": "str"},
+                          {"name": "notes", "question": "anything else ?", "ret_type": "str"}),
+            "answers": {}}
+
+
+def until_valid(ask):
+    # the custom prompters hand back a failed PromptResult and leave the retry to the caller
+    while isinstance(answer := ask(), PromptResult) and not answer.success:
+        pass
+    return answer
+
+
+def questionnaire(settings: LiveSettings) -> tuple:
+    return (prompt_logic.confirm_prompt(Text("did you work out ?")),
+            prompt_logic.number_prompt(Text("how many sets ?"), 0, 10, "int"),
+            until_valid(lambda: custom_prompter.prompt_numeric("minutes", style="custom_inline", min=0, max=300)),
+            until_valid(lambda: custom_prompter.prompt_date("when")),
+            custom_prompter.prompt_str("what next"),
+            prompt_logic._ask_live_sequence(settings, sequence()))
+
+
+def run(backend: PromptIO, settings: LiveSettings, runs: int) -> float:
+    start = perf_counter()
+    with use_io(backend):
+        for _ in range(runs):
+            result = questionnaire(settings)
+    secs = perf_counter() - start
+    if result != EXPECTED:
+        print(f"FAIL {type(backend).__name__} answered {result}")
+        sys.exit(1)
+    return secs
+
+
+def main():
+    answers = ANSWERS
+    headless = AnswerStreamIO(answers * HEADLESS_RUNS)
+    headless_secs = run(headless, LiveSettings(), HEADLESS_RUNS)
+
+    counter = ByteCounter()
+    console = ScriptedConsole(list(answers * CONSOLE_RUNS), file=counter, force_terminal=True,
+                              color_system="truecolor", width=100, height=50)
+    console_secs = run(ConsoleIO(console), LiveSettings(console=console), CONSOLE_RUNS)
+
+    piped = AnswerStreamIO.from_file(io.StringIO("\n".join(answers) + "\n"), record=True)
+    run(piped, LiveSettings(), 1)
+    if next(piped.answers, None) is not None or not piped.output:
+        print("FAIL piped answers weren't all read")
+        sys.exit(1)
+
+    headless_rate = HEADLESS_RUNS / headless_secs
+    console_rate = CONSOLE_RUNS / console_secs
+    print(f"{len(answers)} answers per questionnaire")
+    print(f"  rendered terminal {console_rate:>10,.0f} questionnaires/s  {counter.bytes // CONSOLE_RUNS:,} bytes each")
+    print(f"  answer stream     {headless_rate:>10,.0f} questionnaires/s  {headless_rate / console_rate:.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+# run from src/: python -m testing.ordering_stress
+# randomized stress test for node_ordering, a pure python sibling list drives the same
+# position_between/plan_rebalance logic the database functions use, then a smaller run checks the db path
+import random
+from time import perf_counter
+import db
+import node_ordering
+from node_ordering import plan_rebalance, position_between
+from testing.db_benchmarks import make_node
+
+
+TOTAL_INSERTIONS = 1_000_000
+LIST_SIZE = 20_000 # insertions per sibling list
+DB_INSERTIONS = 5_000
+SEED = 2026
+
+
+class SiblingList:
+    def __init__(self):
+        self.ids: list[int] = []
+        self.positions: list[float] = []
+        self.rebalances = 0
+        self.moved = 0
+        self.largest_window = 0
+
+    def insert(self, idx: int, node_id: int):
+        positions = self.positions
+        lo = positions[idx - 1] if idx > 0 else None
+        hi = positions[idx] if idx < len(positions) else None
+        if (position := position_between(lo, hi)) is None:
+            window = 1
+            while (plan := plan_rebalance(positions[max(0, idx - window - 1):idx][::-1],
+                                          positions[idx:idx + window + 1], window)) is None:
+                window *= 2
+            for offset in range(plan.before):
+                positions[idx - 1 - offset] = plan.position(plan.before - offset)
+            for offset in range(plan.after):
+                positions[idx + offset] = plan.position(plan.before + 2 + offset)
+            position = plan.new_position
+            self.rebalances += 1
+            self.moved += plan.before + plan.after
+            self.largest_window = max(self.largest_window, plan.before + plan.after)
+            self.check(max(0, idx - window - 2), idx + window + 2, position, idx)
+        positions.insert(idx, position)
+        self.ids.insert(idx, node_id)
+        assert (lo is None or positions[idx - 1] < position) and (hi is None or position < positions[idx + 1])
+
+    def check(self, start: int=0, stop: int|None=None, pending: float|None=None, pending_idx: int=0):
+        positions = self.positions[start:stop]
+        if pending is not None:
+            positions.insert(pending_idx - start, pending)
+        assert all(a < b for a, b in zip(positions, positions[1:])), "sibling positions out of order"
+
+
+# where in the list each insertion goes, the adversarial ones keep splitting the same gap
+PATTERNS = {
+    "uniform": lambda rng, size: rng.randint(0, size),
+    "after first": lambda rng, size: min(1, size),
+    "same gap": lambda rng, size: size // 2,
+    "before last": lambda rng, size: max(size - 1, 0),
+    "hot spot": lambda rng, size: min(size, max(0, int(rng.gauss(size / 3, 5)))),
+}
+
+
+def stress_model(rng: random.Random):
+    lists = TOTAL_INSERTIONS // LIST_SIZE
+    stats = {name: [0, 0, 0] for name in PATTERNS}
+    start = perf_counter()
+    for list_idx in range(lists):
+        name = list(PATTERNS)[list_idx % len(PATTERNS)]
+        choose = PATTERNS[name]
+        siblings = SiblingList()
+        for node_id in range(LIST_SIZE):
+            siblings.insert(choose(rng, len(siblings.ids)), node_id)
+        siblings.check()
+        stats[name][0] += siblings.rebalances
+        stats[name][1] += siblings.moved
+        stats[name][2] = max(stats[name][2], siblings.largest_window)
+    print(f"{lists * LIST_SIZE:,} insertions over {lists} sibling lists of {LIST_SIZE:,} in {perf_counter() - start:.1f}s")
+    for name, (rebalances, moved, window) in stats.items():
+        print(f"  {name:<12} rebalances: {rebalances:>6,} rows moved: {moved:>9,} largest range: {window:,}")
+
+
+def stress_db(rng: random.Random):
+    conn, _ = db.connect_to_db("stress", ":memory:")
+    db.run_migrations(conn)
+    db.insert_nodes([make_node(1, 0)], conn)
+    expected: list[int] = []
+    for node_id in range(2, DB_INSERTIONS + 2):
+        idx = min(1, len(expected)) if rng.random() < 0.5 else rng.randint(0, len(expected))
+        after_id = expected[idx - 1] if idx > 0 else None
+        node = make_node(node_id, 1)
+        node.node_pos = node_ordering.position_after(1, after_id, conn)
+        db.insert_nodes([node], conn)
+        expected.insert(idx, node_id)
+    for _ in range(DB_INSERTIONS // 5):
+        node_id = expected.pop(rng.randrange(len(expected)))
+        idx = rng.randint(0, len(expected))
+        node_ordering.move_after(node_id, expected[idx - 1] if idx > 0 else None, conn)
+        expected.insert(idx, node_id)
+    actual = [row[0] for row in conn.execute("SELECT id FROM nodes WHERE parent_id = 1 ORDER BY node_pos")]
+    assert actual == expected, "database sibling order diverged from the expected order"
+    # a grandchild isn't a sibling of node 1's children, placing after it has to be refused
+    grandchild = DB_INSERTIONS + 2
+    db.insert_nodes([make_node(grandchild, expected[0])], conn)
+    for place in (lambda: node_ordering.position_after(1, grandchild, conn),
+                  lambda: node_ordering.move_after(expected[-1], grandchild, conn)):
+        try:
+            place()
+        except ValueError:
+            continue
+        raise AssertionError("placing after a node with another parent wasn't refused")
+    assert [row[0] for row in conn.execute("SELECT id FROM nodes WHERE parent_id = 1 ORDER BY node_pos")] == expected
+    print(f"db: {DB_INSERTIONS:,} insertions and {DB_INSERTIONS // 5:,} moves kept sibling order")
+    conn.close()
+
+
+def main():
+    rng = random.Random(SEED)
+    stress_model(rng)
+    stress_db(rng)
+
+
+if __name__ == "__main__":
+    main()
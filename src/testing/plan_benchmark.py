@@ -0,0 +1,77 @@
+# run from src/: python -m testing.plan_benchmark
+# scripted runs of one question sequence, compiled on every run vs compiled once and cached
+import sys
+from datetime import date, datetime
+from time import perf_counter
+import question_plan
+from custom_prompter import Question, QuestionSequence
+
+
+RUNS = 2_000
+SECTIONS = 10
+
+
+def sequence() -> QuestionSequence:
+    # every section has a styled header, a few typed questions, a validated one with a followup and a skip
+    questions = []
+    for section in range(SECTIONS):
+        questions += [
+            Question(f"[bold #F58F00]section {section}[/]", "print", prefix_nl=1),
+            Question(f"what is goal [underline]{section}[/] about", str, name=f"goal {section}"),
+            Question("how important is it", int, validation=lambda answer: 0 <= int(answer) <= 10,
+                     name=f"importance {section}",
+                     followup_if=(lambda value: value > 8, Question("why so important", str, name=f"why {section}"))),
+            Question("when does it start", date, skippable=True, name=f"start {section}"),
+            Question("is it a habit", bool, name=f"habit {section}"),
+            Question("how often", str, name=f"frequency {section}",
+                     skip_if=lambda answers, section=section: not answers[f"habit {section}"]),
+        ]
+    return QuestionSequence(tuple(questions), {})
+
+
+def script() -> list[str]:
+    answers = []
+    for section in range(SECTIONS):
+        answers += [f"goal {section}", "11", "9", "because", "01/02/26", "yes", "daily"]
+    return answers
+
+
+def main():
+    questions, answers = sequence(), script()
+    start = perf_counter()
+    for _ in range(RUNS):
+        uncached, _ = question_plan.run_scripted(question_plan.compile_sequence(questions), answers)
+    per_run_compile_ms = (perf_counter() - start) * 1000 / RUNS
+    start = perf_counter()
+    for _ in range(RUNS):
+        cached, output = question_plan.run_scripted(question_plan.get_plan(questions), answers)
+    cached_ms = (perf_counter() - start) * 1000 / RUNS
+
+    expected = {f"importance {section}": 9 for section in range(SECTIONS)} | {f"start {section}": date(2026, 1, 2)
+                                                                                for section in range(SECTIONS)}
+    if cached != uncached or any(cached[key] != value for key, value in expected.items()) or len(output) != 2 * SECTIONS:
+        print("FAIL cached plan answered differently")
+        sys.exit(1)
+
+    # "now" answers with the type asked for, and the cache keeps the most recently used plans only
+    now = QuestionSequence((Question("today", date, name="day"), Question("right now", datetime, name="moment")), {})
+    answered, _ = question_plan.run_scripted(question_plan.get_plan(now), ["now", "now"])
+    if type(answered["day"]) is not date or type(answered["moment"]) is not datetime:
+        print(f"FAIL now answered {answered}")
+        sys.exit(1)
+    others = [QuestionSequence((Question("x", str),), {}) for _ in range(question_plan.PLAN_CACHE_SIZE)]
+    for other in others:
+        question_plan.get_plan(other)
+        question_plan.get_plan(questions)
+    if len(question_plan._PLANS) > question_plan.PLAN_CACHE_SIZE or \
+       question_plan._PLANS[id(questions)][0] is not questions:
+        print(f"FAIL plan cache holds {len(question_plan._PLANS)} plans or dropped the one in use")
+        sys.exit(1)
+
+    print(f"{len(questions.questions)} questions, {RUNS:,} scripted runs")
+    print(f"  compiled every run {per_run_compile_ms:.3f}ms  cached plan {cached_ms:.3f}ms  "
+          f"{per_run_compile_ms / cached_ms:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
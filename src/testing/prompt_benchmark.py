@@ -0,0 +1,248 @@
+# run from src/: python -m testing.prompt_benchmark [--json out.json] [--baseline previous.json]
+# per answer latency and throughput of the prompt and validation layer over generated answers, with every
+# console the prompters write to captured. --json keeps the results so two commits can be compared with
+# --baseline, which exits non-zero when a benchmark lost more than --tolerance of its throughput
+import argparse
+import json
+import platform
+import random
+import statistics
+import subprocess
+import sys
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from time import perf_counter_ns
+from typing import Any, Callable, Iterator
+import rich
+from rich.text import Text
+import custom_prompter
+import old_prompting
+import prompt_logic
+from custom_prompter import PromptResult
+from prompt_io import AnswerStreamIO, use_io
+from testing.render_benchmark import ByteCounter, ScriptedConsole
+
+
+SRC_DIR = Path(__file__).resolve().parent.parent
+N_ANSWERS = 20_000
+N_SELECTS = 500
+SELECT_CHOICES = 20
+
+
+@dataclass(slots=True)
+class BenchResult:
+    answers: int
+    errors: int # answers the prompter rejected or raised on, generated inputs include bad ones on purpose
+    answers_per_sec: float
+    mean_us: float
+    p50_us: float
+    p95_us: float
+    p99_us: float
+    max_us: float
+    output_bytes: int
+
+
+def summarize(latencies_ns: list[int], errors: int, output_bytes: int, answers: int|None=None) -> BenchResult:
+    # answers defaults to one per timed call, a multi-select flow takes several answers per call
+    answers = answers or len(latencies_ns)
+    per_answer = sorted(latency / 1000 * len(latencies_ns) / answers for latency in latencies_ns)
+    quantiles = statistics.quantiles(per_answer, n=100)
+    total_secs = sum(latencies_ns) / 1e9
+    return BenchResult(answers, errors, round(answers / total_secs, 1), round(statistics.fmean(per_answer), 3),
+                       round(quantiles[49], 3), round(quantiles[94], 3), round(quantiles[98], 3),
+                       round(per_answer[-1], 3), output_bytes)
+
+
+def time_calls(fn: Callable[[str], Any], values: list[str],
+               failed: Callable[[Any], bool]=lambda _: False) -> tuple[list[int], int]:
+    # a call counts as an error when it raises or failed() says its result was a rejection
+    latencies, errors = [], 0
+    for value in values:
+        start = perf_counter_ns()
+        try:
+            result = fn(value)
+        except Exception:
+            latencies.append(perf_counter_ns() - start)
+            errors += 1
+            continue
+        latencies.append(perf_counter_ns() - start)
+        errors += failed(result)
+    return latencies, errors
+
+
+def rejected(result: Any) -> bool:
+    return isinstance(result, PromptResult) and not result.success
+
+
+def numeric_answers(n: int, rng: random.Random) -> list[str]:
+    # mostly in range, then out of range, floats where ints are expected, garbage and blanks
+    kinds = [lambda: str(rng.randint(0, 1000))] * 6 + [lambda: str(rng.randint(1001, 10**6)),
+                                                       lambda: str(-rng.randint(1, 100)),
+                                                       lambda: f"{rng.uniform(0, 1000):.2f}",
+                                                       lambda: rng.choice(("abc", "12a", "", " ", "1e3"))]
+    return [rng.choice(kinds)() for _ in range(n)]
+
+
+def date_answers(n: int, rng: random.Random) -> list[str]:
+    values = []
+    for _ in range(n):
+        day = date(2000, 1, 1) + timedelta(days=rng.randrange(365 * 40))
+        value = day.strftime(rng.choice(("%m/%d/%y", "%m/%d/%y", "%Y/%m/%d", "%m/%d/%Y")))
+        if rng.random() < 0.3:
+            value = value.replace("/0", "/").lstrip("0")
+        if rng.random() < 0.1:
+            value = rng.choice(("13/45/26", "tomorrow", "", "1/2", value[:-1] + "x"))
+        values.append(value)
+    return values
+
+
+def time_answers(n: int, rng: random.Random) -> list[str]:
+    kinds = [lambda: f"{rng.randint(0, 23)}:{rng.randint(0, 59):02}",
+             lambda: f"{rng.randint(0, 23)}:{rng.randint(0, 59):02}:{rng.randint(0, 59):02}",
+             lambda: f"{rng.randint(0, 59)}.{rng.randint(0, 999):03}",
+             lambda: f"{rng.randint(1, 12)} hours",
+             lambda: f"{rng.randint(1, 59)} minute",
+             lambda: rng.choice(("noon", "12:3a", "1:2:3:4", ""))]
+    return [rng.choice(kinds)() for _ in range(n)]
+
+
+@contextmanager
+def swapped(module: Any, name: str, value: Any) -> Iterator[Any]:
+    # old_prompting's select flow only talks to its module console, so a scripted one stands in for it
+    previous = getattr(module, name)
+    setattr(module, name, value)
+    try:
+        yield value
+    finally:
+        setattr(module, name, previous)
+
+
+def bench_prompt_numeric(answers: list[str]) -> BenchResult:
+    with use_io(backend := AnswerStreamIO(answers, record=True)):
+        latencies, errors = time_calls(
+                lambda _: custom_prompter.prompt_numeric("how many", style="custom_inline", min=0, max=1000),
+                answers, rejected)
+    return summarize(latencies, errors, sum(len(str(line)) for line in backend.output))
+
+
+def bench_prompt_date(answers: list[str]) -> BenchResult:
+    with use_io(backend := AnswerStreamIO(answers, record=True)):
+        latencies, errors = time_calls(lambda _: custom_prompter.prompt_date("when"), answers, rejected)
+    return summarize(latencies, errors, sum(len(str(line)) for line in backend.output))
+
+
+def bench_numeric_process_response(answers: list[str]) -> BenchResult:
+    # process_response prints the range on every accepted answer
+    prompt = prompt_logic.NumericPrompt("how many", console=prompt_logic.console)
+    prompt.min, prompt.max = 0, 1000
+    with prompt_logic.console.capture() as capture:
+        latencies, errors = time_calls(prompt.process_response, answers)
+    return summarize(latencies, errors, len(capture.get().encode()))
+
+
+def bench_validate_time_unit(answers: list[str]) -> BenchResult:
+    # anything printed on the way goes through rich's global console
+    prompt = old_prompting.TimePrompt("time", console=old_prompting.console)
+    with rich.get_console().capture() as capture:
+        latencies, errors = time_calls(prompt.validate_time_unit, answers)
+    return summarize(latencies, errors, len(capture.get().encode()))
+
+
+def bench_str_to_date(answers: list[str]) -> BenchResult:
+    latencies, errors = time_calls(lambda value: custom_prompter.str_to_date(value, date), answers,
+                                   lambda result: result is None)
+    return summarize(latencies, errors, 0)
+
+
+def bench_multi_select(n_flows: int, rng: random.Random) -> BenchResult:
+    # each flow picks two distinct choices with an out of range and a premature quit mixed in, then quits
+    choices = [f"choice {idx}" for idx in range(SELECT_CHOICES)]
+    script, flows = [], []
+    for _ in range(n_flows):
+        first, second = rng.sample(range(1, SELECT_CHOICES + 1), 2)
+        flow = [str(first), str(SELECT_CHOICES + 5), "Q", str(second), "Q"]
+        flows.append(len(flow))
+        script += flow
+    counter = ByteCounter()
+    console = ScriptedConsole(script, file=counter, force_terminal=True, color_system="truecolor",
+                              width=100, height=50)
+    latencies, errors = [], 0
+    with swapped(old_prompting, "console", console):
+        for _ in range(n_flows):
+            start = perf_counter_ns()
+            selected = old_prompting.multi_select_prompt(Text("pick two"), list(choices))
+            latencies.append(perf_counter_ns() - start)
+            errors += selected is None or len(selected) != 2
+    return summarize(latencies, errors, counter.bytes, sum(flows))
+
+
+def git_commit() -> tuple[str|None, bool]:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=SRC_DIR, capture_output=True, text=True,
+                                check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=SRC_DIR,
+                               capture_output=True, text=True, check=True).stdout.strip() != ""
+    except (OSError, subprocess.CalledProcessError):
+        return None, False
+    return commit, dirty
+
+
+def run_all(n_answers: int, n_selects: int, seed: int) -> dict[str, BenchResult]:
+    rng = random.Random(seed)
+    numbers, dates, times = numeric_answers(n_answers, rng), date_answers(n_answers, rng), time_answers(n_answers, rng)
+    return {"prompt_numeric": bench_prompt_numeric(numbers),
+            "prompt_date": bench_prompt_date(dates),
+            "NumericPrompt.process_response": bench_numeric_process_response(numbers),
+            "TimePrompt.validate_time_unit": bench_validate_time_unit(times),
+            "str_to_date": bench_str_to_date(dates),
+            "multi_select_prompt": bench_multi_select(n_selects, rng)}
+
+
+def compare(results: dict[str, BenchResult], baseline: dict[str, Any], tolerance: float) -> list[str]:
+    # benchmarks whose throughput fell by more than tolerance, missing or new benchmarks are only reported
+    regressions = []
+    print(f"\nvs {baseline.get('commit') or 'baseline'}")
+    for name, result in results.items():
+        if (before := baseline["results"].get(name)) is None:
+            print(f"  {name:<32} new")
+            continue
+        ratio = result.answers_per_sec / before["answers_per_sec"]
+        flag = ""
+        if ratio < 1 - tolerance:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"  {name:<32} {ratio:6.2f}x throughput  p50 {before['p50_us']:.1f} -> {result.p50_us:.1f}us{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="prompt layer benchmarks")
+    parser.add_argument("--json", type=Path, help="write the results here")
+    parser.add_argument("--baseline", type=Path, help="results from an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed throughput loss vs the baseline")
+    parser.add_argument("--answers", type=int, default=N_ANSWERS)
+    parser.add_argument("--selects", type=int, default=N_SELECTS)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    results = run_all(args.answers, args.selects, args.seed)
+    print(f"{'':<32} {'answers/s':>12} {'p50us':>9} {'p95us':>9} {'p99us':>9} {'errors':>8}")
+    for name, result in results.items():
+        print(f"{name:<32} {result.answers_per_sec:>12,.0f} {result.p50_us:>9.2f} {result.p95_us:>9.2f} "
+              f"{result.p99_us:>9.2f} {result.errors:>8,}")
+
+    commit, dirty = git_commit()
+    report = {"commit": commit, "dirty": dirty, "created": datetime.now().isoformat(timespec="seconds"),
+              "python": platform.python_version(), "platform": platform.platform(), "seed": args.seed,
+              "results": {name: asdict(result) for name, result in results.items()}}
+    if args.json is not None:
+        args.json.write_text(json.dumps(report, indent=2) + "\n")
+    if args.baseline is not None:
+        if compare(results, json.loads(args.baseline.read_text()), args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
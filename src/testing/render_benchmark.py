@@ -0,0 +1,74 @@
+# run from src/: python -m testing.render_benchmark
+# bytes written to the terminal by a long live question sequence, incremental vs full redraw
+import io
+import sys
+from time import perf_counter
+from rich.console import Console
+import prompt_logic
+from prompt_logic import LiveSettings, QuestionSequence
+
+
+QUESTIONS = 200
+WIDTH = 100
+
+
+class ByteCounter(io.TextIOBase):
+    def __init__(self):
+        self.bytes = 0
+        self.writes = 0
+
+    def write(self, text: str) -> int:
+        self.bytes += len(text.encode())
+        self.writes += 1
+        return len(text)
+
+    def isatty(self) -> bool:
+        return True
+
+
+class ScriptedConsole(Console):
+    # a terminal that answers every prompt from a list instead of stdin
+    def __init__(self, answers: list[str], **kwargs):
+        super().__init__(**kwargs)
+        self.answers = iter(answers)
+
+    def input(self, *args, **kwargs) -> str:
+        return next(self.answers)
+
+
+def sequence(length: int) -> QuestionSequence:
+    return {"questions": tuple({"name": f"q{idx}", "question": f"question {idx}, what is the answer ?",
+                                "ret_type": "str"} for idx in range(length)),
+            "answers": {}}
+
+
+def run(render_mode: prompt_logic.RenderMode, length: int) -> tuple[ByteCounter, float, dict]:
+    counter = ByteCounter()
+    console = ScriptedConsole([f"answer {idx}" for idx in range(length)], file=counter, force_terminal=True,
+                              color_system="truecolor", width=WIDTH, height=50)
+    start = perf_counter()
+    answers = prompt_logic._ask_live_sequence(LiveSettings(console=console), sequence(length), render_mode)
+    return counter, perf_counter() - start, answers
+
+
+def main():
+    results = {}
+    for length in (QUESTIONS // 4, QUESTIONS // 2, QUESTIONS):
+        for render_mode in ("full", "incremental"):
+            counter, secs, answers = run(render_mode, length)
+            if answers != {f"q{idx}": f"answer {idx}" for idx in range(length)}:
+                print(f"FAIL {render_mode} mode lost answers")
+                sys.exit(1)
+            results[render_mode, length] = counter.bytes
+            print(f"{length:>4} questions {render_mode:<12} {counter.bytes:>12,} bytes "
+                  f"{counter.writes:>6,} writes {secs * 1000:8.1f}ms")
+    # incremental output grows with the length, full redraw grows with the square of it until the log is
+    # taller than the terminal and Live crops it to the screen
+    for render_mode in ("full", "incremental"):
+        growth = results[render_mode, QUESTIONS] / results[render_mode, QUESTIONS // 2]
+        print(f"{render_mode}: {growth:.1f}x the bytes for twice the questions")
+    print(f"{QUESTIONS} questions: {results['full', QUESTIONS] / results['incremental', QUESTIONS]:.0f}x fewer bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+# run from src/: python -m testing.schedule_benchmark
+# due lookups from the scheduler heap and the next_due_date index vs scanning every habit's calendar
+import random
+import sys
+import tempfile
+from time import perf_counter
+from habit_schedule import FREQUENCIES, HabitScheduler, due_habits, occurrence_on_or_after
+from testing.db_benchmarks import fresh_db
+
+
+HABITS = 50_000
+TODAY = 20_000
+LOOKUPS = 200
+SIMULATED_DAYS = 60
+
+
+def scan_due(schedules: dict[int, tuple[str, int]], last_day: int, today: int) -> list[int]:
+    # what deciding "is it due" per habit looks like without stored due dates
+    return sorted(habit_id for habit_id, (frequency, start) in schedules.items()
+                  if occurrence_on_or_after(frequency, start, today) <= last_day)
+
+
+def per_call_ms(func, repeat: int) -> float:
+    start = perf_counter()
+    for _ in range(repeat):
+        func()
+    return (perf_counter() - start) * 1000 / repeat
+
+
+def main():
+    random.seed(8)
+    schedules = {habit_id: (random.choices(FREQUENCIES, weights=(10, 30, 35, 15, 10))[0],
+                            TODAY - random.randint(0, 900))
+                 for habit_id in range(1, HABITS + 1)}
+    with tempfile.TemporaryDirectory() as directory:
+        conn = fresh_db(directory, "schedule.db")
+        conn.executemany("INSERT INTO habits(id, goal, frequency_type, schedule_start, next_due_date) "
+                         "VALUES(?, ?, ?, ?, ?)",
+                         [(habit_id, f"habit {habit_id}", frequency, start,
+                           occurrence_on_or_after(frequency, start, TODAY))
+                          for habit_id, (frequency, start) in schedules.items()])
+        conn.commit()
+        start = perf_counter()
+        scheduler = HabitScheduler.load(conn)
+        print(f"{HABITS:,} habits, scheduler loaded in {(perf_counter() - start) * 1000:.1f}ms")
+
+        for days in (0, 7):
+            expected = scan_due(schedules, TODAY + days, TODAY)
+            if [habit_id for _, habit_id in scheduler.due_within(TODAY, days)] != sorted(
+                    expected, key=lambda habit_id: (scheduler.next_due(habit_id), habit_id)):
+                print(f"FAIL heap disagrees with the scan for the next {days} days")
+                sys.exit(1)
+            scan_ms = per_call_ms(lambda: scan_due(schedules, TODAY + days, TODAY), 5)
+            heap_ms = per_call_ms(lambda: scheduler.due_within(TODAY, days), LOOKUPS)
+            index_ms = per_call_ms(lambda: due_habits(TODAY + days, conn), LOOKUPS)
+            print(f"  due in {days} days ({len(expected):,} habits): scan {scan_ms:.2f}ms  heap {heap_ms:.3f}ms "
+                  f"({scan_ms / heap_ms:.0f}x)  index {index_ms:.3f}ms ({scan_ms / index_ms:.0f}x)")
+
+        # each simulated day a random half of what's due gets done, then the next day rolls over
+        rollover_ms = []
+        for day in range(TODAY, TODAY + SIMULATED_DAYS):
+            for habit_id in scheduler.due_today(day):
+                if random.random() < 0.5:
+                    scheduler.complete(habit_id, day, conn)
+            start = perf_counter()
+            scheduler.rollover(day + 1, conn)
+            rollover_ms.append((perf_counter() - start) * 1000)
+        last_day = TODAY + SIMULATED_DAYS
+        stored = dict(conn.execute("SELECT id, next_due_date FROM habits").fetchall())
+        drifted = sum(stored[habit_id] != scheduler.next_due(habit_id) for habit_id in schedules)
+        overdue = conn.execute("SELECT count(*) FROM habits WHERE next_due_date < ?", (last_day,)).fetchone()[0]
+        print(f"  rollover over {SIMULATED_DAYS} days: {sum(rollover_ms) / len(rollover_ms):.1f}ms mean")
+        if drifted or overdue:
+            print(f"FAIL {drifted} habits disagree with the table, {overdue} left overdue")
+            sys.exit(1)
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
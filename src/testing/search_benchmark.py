@@ -0,0 +1,153 @@
+# run from src/: python -m testing.search_benchmark
+# fts5 prefix search vs LIKE '%...%' over 100k goals, what the search index's insert trigger costs a per row
+# insert (bulk inserts skip it and index each chunk at once, see db.NODE_BULK_REBUILDS), a ranking check and
+# the search prompter answering from a stream
+import os
+import random
+from itertools import accumulate
+from pathlib import Path
+import sys
+import tempfile
+from time import perf_counter
+import db
+import goal_search
+import old_prompting # registers the built-in prompters
+from prompt_io import AnswerStreamIO, use_io
+from prompter_registry import resolve
+from testing.db_benchmarks import PASSWORD, fresh_db, make_node
+
+
+GOALS = 100_000
+VOCABULARY = 20_000
+QUERIES = 200
+PER_ROW_SAMPLE = 3_000
+RANKING_GOALS = 1_599 # more matches than goal_search.CANDIDATE_LIMIT
+SYLLABLES = ("ka", "lo", "mi", "run", "tor", "vel", "sha", "ne", "qui", "bra", "zen", "po", "dri", "fa", "ul")
+LIKE_QUERY = """
+SELECT id FROM nodes WHERE intent LIKE :pattern OR description LIKE :pattern
+"""
+
+
+def vocabulary() -> list[str]:
+    words = set()
+    while len(words) < VOCABULARY:
+        words.add("".join(random.choices(SYLLABLES, k=random.randint(2, 4))))
+    words = sorted(words) # sets iterate in hash order, sort first so the seed decides the shuffle
+    random.shuffle(words)
+    return words
+
+
+def goals(words: list[str]):
+    # zipf-ish word choice, a few words are common and most are rare, like real text
+    cum_weights = list(accumulate(1 / rank for rank in range(1, len(words) + 1)))
+    for node_id in range(1, GOALS + 1):
+        node = make_node(node_id, 0, node_id)
+        node.intent = " ".join(random.choices(words, cum_weights=cum_weights, k=random.randint(3, 8)))
+        node.description = " ".join(random.choices(words, cum_weights=cum_weights, k=random.randint(10, 30)))
+        yield node
+
+
+def per_query_ms(func, inputs: list) -> float:
+    start = perf_counter()
+    for value in inputs:
+        func(value)
+    return (perf_counter() - start) * 1000 / len(inputs)
+
+
+def per_row_rate(conn, nodes) -> float:
+    start = perf_counter()
+    for node in nodes:
+        db.db_insert(db.INSERT_NODE_QUERY, db.node_to_row(node), conn)
+    return len(nodes) / (perf_counter() - start)
+
+
+def check_ranking(directory: str):
+    # the one goal titled with the word has to beat every goal that only mentions it, however old it is
+    conn = fresh_db(directory, "ranking.db")
+    nodes = [make_node(node_id, 0, node_id) for node_id in range(1, RANKING_GOALS + 1)]
+    nodes[0].intent = "quarterly taxes"
+    for node in nodes[1:]:
+        node.description = f"bring up at the quarterly review {node.id}"
+    db.insert_nodes(nodes, conn)
+    for text in ("quarterly", "quarterly taxes", "quarterly tax"):
+        if (results := goal_search.search(text, conn)) == [] or results[0].id != 1:
+            print(f"FAIL {text!r} didn't rank the goal titled with it first: {results[:3]}")
+            sys.exit(1)
+    conn.close()
+
+
+def check_search_prompter(directory: str):
+    # answered from a stream the "search" question takes the best match for each answer through the app's
+    # own pool, an answer with no match asks again and an empty one skips
+    saved = db.DATABASES["main"], os.environ.get(db.DB_KEY_ENV)
+    db.DATABASES["main"], os.environ[db.DB_KEY_ENV] = Path(directory) / "prompter.db", PASSWORD
+    try:
+        with db.db_connection() as conn:
+            db.insert_nodes([make_node(1, 0, 1), make_node(2, 0, 2)], conn)
+            conn.execute("UPDATE nodes SET intent = 'file quarterly taxes' WHERE id = 2")
+        ask = resolve({"type": "search", "name": "goal", "question": "which goal ?", "answer_type": str})
+        with use_io(AnswerStreamIO(["zzz", "quarterly", ""])):
+            picked, skipped = ask(), ask()
+    finally:
+        db.close_pools()
+        db.DATABASES["main"] = saved[0]
+        if saved[1] is None:
+            del os.environ[db.DB_KEY_ENV]
+        else:
+            os.environ[db.DB_KEY_ENV] = saved[1]
+    if picked is None or (picked.source_type, picked.id) != ("node", 2) or skipped is not None:
+        print(f"FAIL search prompter answered {picked}, {skipped} from an answer stream")
+        sys.exit(1)
+
+
+def main():
+    random.seed(21)
+    words = vocabulary()
+    with tempfile.TemporaryDirectory() as directory:
+        check_ranking(directory)
+        check_search_prompter(directory)
+        sample = list(goals(words))[:PER_ROW_SAMPLE]
+        conn = fresh_db(directory, "per_row.db")
+        indexed_rate = per_row_rate(conn, sample)
+        conn.close()
+        conn = fresh_db(directory, "per_row_unindexed.db")
+        conn.execute("DROP TRIGGER nodes_search_insert")
+        unindexed_rate = per_row_rate(conn, sample)
+        conn.close()
+        print(f"per row insert: {indexed_rate:,.0f} rows/s indexed by the trigger, {unindexed_rate:,.0f} rows/s "
+              f"without it ({1 - indexed_rate / unindexed_rate:.0%} slower)")
+
+        conn = fresh_db(directory, "search.db")
+        result = db.insert_nodes(goals(words), conn)
+        print(f"bulk insert: {GOALS:,} goals inserted and indexed in {result.secs:.2f}s "
+              f"({result.rows / result.secs:,.0f} rows/s)")
+
+        # what search-as-you-type sends: the start of a word, or a finished word then the start of the next one.
+        # only short prefixes are capped, full words are ranked either way. LIKE has no ranking, it has to hand
+        # back every match for something else to order
+        for label, inputs in (("2 letter prefix", [random.choice(words)[:2] for _ in range(QUERIES)]),
+                              ("3 letter prefix", [random.choice(words)[:3] for _ in range(QUERIES)]),
+                              ("word + 3 letters", [f"{random.choice(words[:2000])} {random.choice(words)[:3]}"
+                                                    for _ in range(QUERIES)]),
+                              ("full word", [random.choice(words) for _ in range(QUERIES)])):
+            capped_ms = per_query_ms(lambda text: goal_search.search(text, conn), inputs)
+            full_ms = per_query_ms(lambda text: goal_search.search(text, conn, candidate_limit=None), inputs)
+            like_ms = per_query_ms(lambda text: conn.execute(LIKE_QUERY, {"pattern": f"%{text.split()[-1]}%"}).fetchall(),
+                                   inputs[:20])
+            print(f"  {label:<18} fts5 {capped_ms:6.2f}ms  fts5 ranking every match {full_ms:6.2f}ms  "
+                  f"LIKE '%...%' {like_ms:6.2f}ms")
+
+        # the triggers keep the index in step with edits and deletes
+        conn.execute("UPDATE nodes SET intent = 'zzuniquezz goal' WHERE id = 5")
+        conn.execute("DELETE FROM nodes WHERE id = 6")
+        conn.commit()
+        found = [(result.source_type, result.id) for result in goal_search.search("zzunique", conn)]
+        indexed = conn.execute("SELECT count(*) FROM search_index").fetchone()[0]
+        if found != [("node", 5)] or indexed != GOALS - 1:
+            print(f"FAIL index out of step: found {found}, {indexed} rows indexed")
+            sys.exit(1)
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+# run from src/: python -m testing.select_benchmark
+# cost per keystroke of picking from a growing choice list. old_prompting's multi select restyles and
+# re-renders every choice on each key, select_prompt filters through the trigram index and renders one
+# window. then the bytes select_prompt actually writes per keystroke, driven through a pipe, and the registered
+# select prompters answering with the question's own choices on a terminal and from an answer stream
+import random
+import sys
+from time import perf_counter
+from prompt_toolkit.application import create_app_session
+from prompt_toolkit.data_structures import Size
+from prompt_toolkit.input import create_pipe_input
+from prompt_toolkit.output.vt100 import Vt100_Output
+from rich.console import Console
+from rich.text import Text
+import old_prompting # registers the built in prompters
+import prompter_registry
+from choice_index import ChoiceIndex
+from prompt_io import AnswerStreamIO, use_io
+from select_prompt import VirtualSelect, select_prompt
+from testing.render_benchmark import ByteCounter
+
+
+SIZES = (1_000, 10_000, 100_000)
+OLD_SIZES = (1_000, 10_000) # the full redraw takes seconds per key past this
+QUERY = "learn rust" # about 1 in 100 generated titles, enter does nothing without a match
+VERBS = ("learn", "finish", "read", "build", "practice", "write", "run", "plan", "fix", "clean")
+NOUNS = ("rust", "python", "guitar", "marathon", "novel", "garden", "budget", "garage", "spanish", "chess")
+
+
+def goal_titles(n: int, seed: int=7) -> list[str]:
+    rng = random.Random(seed)
+    return [f"{rng.choice(VERBS)} {rng.choice(NOUNS)} {idx}" for idx in range(n)]
+
+
+def keystrokes() -> list[str]:
+    # the query typed a character at a time then erased again
+    typed = [QUERY[:end] for end in range(1, len(QUERY) + 1)]
+    return typed + typed[-2::-1] + [""]
+
+
+def old_keystroke_ms(choices: list[str]) -> float:
+    # multi_select_prompt's work per key: append every choice to the question, restyle it, redraw it all
+    console = Console(file=ByteCounter(), force_terminal=True, color_system="truecolor", width=100)
+    start = perf_counter()
+    for key in keystrokes()[:3]:
+        question = Text("pick a goal")
+        for idx, choice in enumerate(choices, 1):
+            question.append_text(Text(f"\n{idx}. {choice}"))
+        question.highlight_words([choices[len(key)]], "bold black on #FFDA00")
+        console.print(question)
+    return (perf_counter() - start) * 1000 / 3
+
+
+def new_keystroke_ms(index: ChoiceIndex) -> tuple[float, int]:
+    select = VirtualSelect(index)
+    keys = keystrokes()
+    start = perf_counter()
+    for key in keys:
+        select.set_query(key)
+        select.fragments()
+    secs = perf_counter() - start
+    select.set_query(QUERY)
+    return secs * 1000 / len(keys), len(select.matches)
+
+
+def bytes_per_keystroke(index: ChoiceIndex) -> tuple[float, list[str]|str|None]:
+    # a real prompt_toolkit session, pick the first match and finish
+    counter = ByteCounter()
+    output = Vt100_Output(counter, lambda: Size(rows=40, columns=100), term="xterm-256color",  # pyright: ignore[]
+                          enable_cpr=False)
+    with create_pipe_input() as pipe, create_app_session(input=pipe, output=output):
+        pipe.send_text(QUERY + "\t\r")
+        answer = select_prompt("goal:", index)
+    return counter.bytes / (len(QUERY) + 2), answer
+
+
+class Goal:
+    # a choice that isn't a str, the prompters have to hand back this object and not its label
+    def __init__(self, title: str):
+        self.title = title
+
+    def __str__(self) -> str:
+        return self.title
+
+
+def check_prompters(titles: list[str]):
+    goals = [Goal(title) for title in titles]
+    multi = {"type": "select", "name": "goals", "question": "goals ?", "answer_type": list, "choices": goals}
+    single = {"type": "select", "name": "goal", "question": "goal ?", "answer_type": str, "choices": goals}
+    matches = [goal for goal in goals if QUERY in goal.title]
+    # on a terminal: filter, pick the first two matches (multi_select_prompt asks for exactly 2) and finish
+    with create_pipe_input() as pipe, create_app_session(input=pipe, output=Vt100_Output(
+            ByteCounter(), lambda: Size(rows=40, columns=100), term="xterm-256color", enable_cpr=False)):  # pyright: ignore[]
+        pipe.send_text(QUERY + "\t\x1b[B\t\r")
+        picked = prompter_registry.ask(multi) # pyright: ignore[]
+    # from a stream: numbers or labels, toggling one off again, Q once there are exactly 2
+    stream = AnswerStreamIO(["3", "5", "3", "Q", matches[1].title, "Q", matches[0].title])
+    with use_io(stream):
+        streamed, one = prompter_registry.ask(multi), prompter_registry.ask(single) # pyright: ignore[]
+    if picked != matches[:2] or streamed != [goals[4], matches[1]] or one is not matches[0]:
+        print(f"FAIL select prompters answered {picked}, {streamed}, {one}")
+        sys.exit(1)
+
+
+def main():
+    for size in SIZES:
+        choices = goal_titles(size)
+        start = perf_counter()
+        index = ChoiceIndex(choices)
+        build_ms = (perf_counter() - start) * 1000
+        new_ms, matches = new_keystroke_ms(index)
+        expected = [choice for choice in choices if QUERY in choice]
+        if not expected or [choices[idx] for idx in index.search(QUERY)] != expected or matches != len(expected):
+            print(f"FAIL index disagrees with a scan at {size:,} choices")
+            sys.exit(1)
+        per_key_bytes, answer = bytes_per_keystroke(index)
+        if answer != expected[:1]:
+            print(f"FAIL select_prompt answered {answer}")
+            sys.exit(1)
+        old = f"old {old_keystroke_ms(choices):9.2f}ms" if size in OLD_SIZES else f"{'':>16}"
+        if size == SIZES[0]:
+            check_prompters(choices)
+        print(f"{size:>8,} choices  index built in {build_ms:6.0f}ms  per key: {old}  new {new_ms:.3f}ms  "
+              f"{per_key_bytes:,.0f} bytes written")
+
+
+if __name__ == "__main__":
+    main()
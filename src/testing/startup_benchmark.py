@@ -0,0 +1,70 @@
+# run from src/: python -m testing.startup_benchmark
+# cold start cost of the non-interactive cli commands, exits non-zero when a command blows the
+# budget or pulls in one of the interactive ui modules
+import re
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from time import perf_counter
+
+
+SRC_DIR = Path(__file__).resolve().parent.parent
+RUNS = 7
+BUDGET_MS = 100.0
+COMMANDS: list[list[str]] = [
+    ["get", "version"],
+    ["not", "valid"],
+]
+# none of these should be imported unless the command actually prompts for something
+UI_MODULES = {"questionary", "prompt_toolkit", "rich.layout", "rich.live", "rich.panel", "rich.prompt",
+              "goal_collection", "old_prompting", "prompt_logic", "custom_prompter"}
+IMPORT_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+def run(args: list[str], importtime: bool=False) -> tuple[float, str]:
+    flags = ["-X", "importtime"] if importtime else []
+    start = perf_counter()
+    result = subprocess.run([sys.executable, *flags, "main.py", *args],
+                            cwd=SRC_DIR, capture_output=True, text=True)
+    return (perf_counter() - start) * 1000, result.stderr
+
+
+def parse_importtime(stderr: str) -> dict[str, int]:
+    # {module: cumulative microseconds} for top level imports only
+    imports = {}
+    for line in stderr.splitlines():
+        if (match := IMPORT_LINE.match(line)) and len(match.group(3)) == 1:
+            imports[match.group(4)] = int(match.group(2))
+    return imports
+
+
+def imported_modules(stderr: str) -> set[str]:
+    return {match.group(4) for line in stderr.splitlines() if (match := IMPORT_LINE.match(line))}
+
+
+def main():
+    failed = False
+    for args in COMMANDS:
+        wall = statistics.median(run(args)[0] for _ in range(RUNS))
+        _, stderr = run(args, importtime=True)
+        top_level = parse_importtime(stderr)
+        ui_loaded = sorted(UI_MODULES & imported_modules(stderr))
+        print(f"speedyj {' '.join(args)}: {wall:.1f}ms median of {RUNS} "
+              f"({sum(top_level.values()) / 1000:.1f}ms in imports)")
+        for module, micros in sorted(top_level.items(), key=lambda item: -item[1])[:5]:
+            print(f"  {module:<24} {micros / 1000:6.1f}ms")
+        if ui_loaded:
+            print(f"  FAIL imported ui modules: {', '.join(ui_loaded)}")
+            failed = True
+        if "main" in imported_modules(stderr):
+            print("  FAIL main.py was imported again as a module")
+            failed = True
+        if wall > BUDGET_MS:
+            print(f"  FAIL over the {BUDGET_MS:.0f}ms budget")
+            failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
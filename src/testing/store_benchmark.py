@@ -0,0 +1,85 @@
+# run from src/: python -m testing.store_benchmark
+# memory held by a list of GoalNode objects vs the same nodes in a GoalTreeStore
+import gc
+import random
+import sys
+import tracemalloc
+from collections import defaultdict
+from time import perf_counter
+from custom_types import GoalNode
+from goal_store import GoalTreeStore
+from testing.db_benchmarks import random_tree
+
+
+TREE_SIZE = 200_000
+STATUSES = ("incomplete", "in progress", "complete", "locked")
+
+
+def realistic_nodes(size: int) -> list[GoalNode]:
+    # random_tree nodes plus a few requisites, varied statuses, fractional ratings and missing descriptions,
+    # the way row_to_node returns them
+    random.seed(11)
+    nodes = list(random_tree(size))
+    for node in nodes:
+        node.status = random.choice(STATUSES)
+        node.priority = random.choice((2.7, 7, 9.35))
+        node.importance = random.uniform(1, 10)
+        if random.random() < 0.2:
+            node.description = None # pyright: ignore[]
+        node.prerequisite = random.sample(range(1, node.id), min(node.id - 1, random.randint(0, 2)))
+        node.postrequisite = []
+    return nodes
+
+
+def with_adjacency(nodes: list[GoalNode]) -> list[GoalNode]:
+    # what load_children/load_siblings leave behind on every node
+    children: defaultdict[int, list[int]] = defaultdict(list)
+    for node in nodes:
+        children[node.parent_id].append(node.id)
+    for node in nodes:
+        node.children = children.get(node.id, [])
+        node.siblings = [sibling for sibling in children[node.parent_id] if sibling != node.id]
+    return nodes
+
+
+def traced(build) -> tuple[object, int]:
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current
+
+
+def main():
+    nodes, plain_bytes = traced(lambda: realistic_nodes(TREE_SIZE))
+    del nodes
+    nodes, loaded_bytes = traced(lambda: with_adjacency(realistic_nodes(TREE_SIZE)))
+    del nodes
+    # only the store is resident once it's built, the nodes stream through it
+    store, store_bytes = traced(lambda: GoalTreeStore(iter(realistic_nodes(TREE_SIZE))))
+    print(f"{TREE_SIZE:,} nodes")
+    for label, total in (("list[GoalNode]", plain_bytes), ("list[GoalNode] + children/siblings", loaded_bytes),
+                         ("GoalTreeStore", store_bytes)):
+        print(f"  {label:<36} {total / 2**20:8.1f}MiB {total / TREE_SIZE:7.0f}B/node")
+    print(f"  GoalTreeStore columns + strings      {store.nbytes() / 2**20:8.1f}MiB")  # pyright: ignore[]
+
+    # views are built on access, check they round trip and what one costs
+    reference = {node.id: node for node in with_adjacency(realistic_nodes(TREE_SIZE))}
+    sample = random.sample(sorted(reference), 1000)
+    for node_id in sample:
+        view, node = store.get(node_id), reference[node_id] # pyright: ignore[]
+        view.children, view.siblings = sorted(view.children), sorted(view.siblings) # pyright: ignore[]
+        node.children, node.siblings = sorted(node.children), sorted(node.siblings) # pyright: ignore[]
+        if view != node:
+            print(f"FAIL node {node_id} doesn't round trip")
+            sys.exit(1)
+    start = perf_counter()
+    for node_id in sample:
+        store.get(node_id) # pyright: ignore[]
+    print(f"  GoalNode view: {(perf_counter() - start) / len(sample) * 1e6:.1f}us per access")
+
+
+if __name__ == "__main__":
+    main()
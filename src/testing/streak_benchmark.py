@@ -0,0 +1,95 @@
+# run from src/: python -m testing.streak_benchmark
+# vectorized backfill vs folding every event, and per-event upkeep vs recomputing from history
+import math
+import random
+import sys
+import tempfile
+from dataclasses import astuple
+from time import perf_counter
+import numpy as np
+import streaks
+from testing.db_benchmarks import fresh_db
+
+
+HABITS = 5_000
+DAYS = 365
+FIRST_DAY = 19_000
+LIVE_EVENTS = 2_000
+
+
+def history(rng: np.random.Generator) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # every habit has its own hit rate and a random start, events come out shuffled
+    starts = rng.integers(0, DAYS // 2, HABITS)
+    lengths = DAYS - starts
+    habit_ids = np.repeat(np.arange(1, HABITS + 1), lengths)
+    offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    days = FIRST_DAY + np.repeat(starts, lengths) + offsets
+    completed = rng.random(len(habit_ids)) < np.repeat(rng.uniform(0.3, 0.95, HABITS), lengths)
+    order = rng.permutation(len(habit_ids))
+    return habit_ids[order], days[order], completed[order]
+
+
+def fold_all(habit_ids: np.ndarray, days: np.ndarray, completed: np.ndarray) -> dict[int, streaks.StreakState]:
+    states = {}
+    order = np.lexsort((days, habit_ids))
+    for habit_id, day, done in zip(habit_ids[order].tolist(), days[order].tolist(), completed[order].tolist()):
+        states[habit_id] = streaks.fold_event(states.get(habit_id), habit_id, day, done)
+    return states
+
+
+def same_state(a: streaks.StreakState, b: streaks.StreakState) -> bool:
+    # averages are a running mean on one side and total / count on the other
+    return all(math.isclose(x, y) if isinstance(x, float) else x == y for x, y in zip(astuple(a), astuple(b)))
+
+
+def main():
+    rng = np.random.default_rng(5)
+    habit_ids, days, completed = history(rng)
+    print(f"{len(habit_ids):,} events for {HABITS:,} habits")
+
+    start = perf_counter()
+    folded = fold_all(habit_ids, days, completed)
+    fold_secs = perf_counter() - start
+    start = perf_counter()
+    computed = streaks.compute_streaks(habit_ids, days, completed)
+    vector_secs = perf_counter() - start
+    print(f"backfill: fold_event loop {fold_secs:.2f}s  vectorized {vector_secs:.3f}s  {fold_secs / vector_secs:.1f}x")
+    mismatched = [state.habit_id for state in computed if not same_state(state, folded[state.habit_id])]
+    if len(computed) != len(folded) or mismatched:
+        print(f"FAIL vectorized backfill disagrees with fold_event for {len(mismatched)} habits")
+        sys.exit(1)
+
+    with tempfile.TemporaryDirectory() as directory:
+        conn = fresh_db(directory, "streaks.db")
+        conn.executemany("INSERT INTO habits(id, goal) VALUES(?, ?)",
+                         [(habit_id, f"habit {habit_id}") for habit_id in range(1, HABITS + 1)])
+        conn.execute("CREATE TEMP TABLE events(habit_id, day, completed)")
+        conn.executemany("INSERT INTO temp.events VALUES(?, ?, ?)",
+                         zip(habit_ids.tolist(), days.tolist(), completed.tolist()))
+        conn.execute("CREATE INDEX temp.events_habit ON events(habit_id, day)")
+        conn.commit()
+        start = perf_counter()
+        written = streaks.backfill_streaks(habit_ids, days, completed, conn)
+        print(f"backfill into streaks: {written:,} rows in {perf_counter() - start:.2f}s")
+
+        # the next day's events, folded into the stored row vs re-read and recomputed from all of history
+        random.seed(5)
+        live = random.sample(range(1, HABITS + 1), LIVE_EVENTS)
+        next_day = FIRST_DAY + DAYS
+        start = perf_counter()
+        for habit_id in live:
+            streaks.record_event(habit_id, next_day, random.random() < 0.7, conn)
+        incremental_ms = (perf_counter() - start) * 1000 / LIVE_EVENTS
+        start = perf_counter()
+        for habit_id in live:
+            rows = conn.execute("SELECT habit_id, day, completed FROM temp.events WHERE habit_id = ? ORDER BY day",
+                                (habit_id,)).fetchall()
+            streaks.compute_streaks(*zip(*rows))
+        recompute_ms = (perf_counter() - start) * 1000 / LIVE_EVENTS
+        print(f"per event: fold into stored row {incremental_ms:.3f}ms  recompute from history {recompute_ms:.3f}ms  "
+              f"{recompute_ms / incremental_ms:.1f}x")
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+# run from src/: python -m testing.time_benchmark
+# single pass time/duration parsing, checks a table of answers first then times bulk parsing at two sizes
+# (linear means twice the values takes twice the time) against a strptime loop over the clock formats
+import random
+import sys
+from datetime import datetime
+from time import perf_counter
+from custom_types import TimeInfo
+from time_parsing import _parse, parse_durations, parse_time
+
+
+N_VALUES = 100_000
+CASES: dict[str, TimeInfo|None] = {
+    "12:30": TimeInfo(12, 30), "1:02:03.25": TimeInfo(1, 2, 3, 250_000), "5pm": TimeInfo(17),
+    "5 p.m.": TimeInfo(17), "12:15 am": TimeInfo(0, 15), "25:30": TimeInfo(25, 30),
+    "2 hours 5 minutes": TimeInfo(2, 5), "2 hours and 5 minutes": TimeInfo(2, 5), "1.5h": TimeInfo(1, 30),
+    "2h5m30s": TimeInfo(2, 5, 30), "90 min": TimeInfo(1, 30), "2.5": TimeInfo(0, 0, 2, 500_000),
+    "3 ms": TimeInfo(0, 0, 0, 3000), "13:00 pm": None, "90": None, "noon": None, "1:2": None, "1:60": None,
+    "5 minutes 5 minutes": None, "": None,
+}
+CLOCK_FORMATS = ("%H:%M", "%H:%M:%S", "%H:%M:%S.%f", "%I:%M %p", "%I:%M%p")
+
+
+def random_values(n: int, seed: int=7) -> list[str]:
+    # what a total_time_spent import column looks like, mostly unique so the cache doesn't hide the cost
+    rng = random.Random(seed)
+    kinds = [lambda: f"{rng.randint(0, 99)}:{rng.randint(0, 59):02}:{rng.randint(0, 59):02}",
+             lambda: f"{rng.randint(1, 12)}:{rng.randint(0, 59):02} {rng.choice(('am', 'pm'))}",
+             lambda: f"{rng.randint(1, 40)} hours {rng.randint(1, 59)} minutes {rng.randint(1, 59)} seconds",
+             lambda: f"{rng.randint(1, 9)}.{rng.randint(0, 99)}h",
+             lambda: f"{rng.randint(1, 600)}m{rng.randint(0, 59)}s"]
+    return [rng.choice(kinds)() for _ in range(n)]
+
+
+def strptime_loop(value: str) -> datetime|None:
+    # the clock formats only, a strptime loop can't read unit words at all
+    for fmt in CLOCK_FORMATS:
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+    return None
+
+
+def timed(fn, values: list[str]) -> float:
+    _parse.cache_clear()
+    start = perf_counter()
+    fn(values)
+    return perf_counter() - start
+
+
+def main():
+    wrong = {value: parse_time(value) for value, expected in CASES.items() if parse_time(value) != expected}
+    if wrong:
+        print(f"FAIL {wrong}")
+        sys.exit(1)
+
+    values = random_values(N_VALUES * 2)
+    half = timed(parse_durations, values[:N_VALUES])
+    full = timed(parse_durations, values)
+    if None in parse_durations(values):
+        print("FAIL generated value didn't parse")
+        sys.exit(1)
+    clock = [value for value in values[:N_VALUES] if ":" in value and int(value.split(":")[0]) < 24]
+    strptime_secs = timed(lambda batch: [strptime_loop(value) for value in batch], clock)
+    tokenizer_secs = timed(parse_durations, clock)
+
+    print(f"{N_VALUES:,} durations {half * 1000:.0f}ms, {N_VALUES * 2:,} {full * 1000:.0f}ms "
+          f"({full / half:.2f}x for twice the values)")
+    print(f"{len(clock):,} clock times: strptime loop {strptime_secs * 1000:.0f}ms  tokenizer "
+          f"{tokenizer_secs * 1000:.0f}ms  {strptime_secs / tokenizer_secs:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+import re
+from datetime import time
+from functools import lru_cache
+from typing import Final, Iterable
+from custom_types import TimeInfo
+
+
+PARSE_CACHE_SIZE: Final[int] = 4096
+# one regex pass splits the input into tokens, separators and "and" are dropped. anything the
+# alternation doesn't know is a "bad" token and fails the parse
+_TOKENS: Final[re.Pattern] = re.compile(r"(\d+)|([a-z]+)|(:)|(\.)|[\s,]+|(.)")
+_US: Final[dict[str, int]] = {"hour": 3_600_000_000, "minute": 60_000_000, "second": 1_000_000,
+                              "millisecond": 1_000, "microsecond": 1}
+_UNITS: Final[dict[str, str]] = {
+        **dict.fromkeys(("h", "hr", "hrs", "hour", "hours"), "hour"),
+        **dict.fromkeys(("m", "min", "mins", "minute", "minutes"), "minute"),
+        **dict.fromkeys(("s", "sec", "secs", "second", "seconds"), "second"),
+        **dict.fromkeys(("ms", "msec", "msecs", "millisecond", "milliseconds", "milisecond", "miliseconds"),
+                        "millisecond"),
+        **dict.fromkeys(("us", "microsecond", "microseconds"), "microsecond")}
+_MERIDIEMS: Final[dict[str, bool]] = {"am": False, "pm": True, "a.m.": False, "p.m.": True, "a.m": False,
+                                      "p.m": True}
+_CLOCK_MARKS: Final[frozenset[str]] = frozenset((":", "am", "pm", "a", "p"))
+
+type Fields = tuple[int, int, int, int] # hours, minute, second, microsecond
+
+
+def _tokenize(value: str) -> list[str]|None:
+    # each token is its text, which is enough to tell the kinds apart: digits, letters, ":" or "."
+    tokens = []
+    for num, word, colon, dot, bad in _TOKENS.findall(value.lower()):
+        if bad:
+            return None
+        if token := num or word or colon or dot:
+            if token != "and":
+                tokens.append(token)
+    return tokens
+
+
+def _fraction(digits: str, unit_us: int) -> int:
+    return int(digits) * unit_us // 10 ** len(digits)
+
+
+def _from_us(total: int) -> Fields:
+    hours, total = divmod(total, _US["hour"])
+    minute, total = divmod(total, _US["minute"])
+    second, microsecond = divmod(total, _US["second"])
+    return hours, minute, second, microsecond
+
+
+def _meridiem(tokens: list[str], idx: int) -> tuple[bool|None, int]:
+    # am/pm and a.m./p.m. after a clock time, returns (pm or None, index after it)
+    if idx == len(tokens):
+        return None, idx
+    for length in (1, 4, 3): # "pm", "p . m .", "p . m"
+        if (pm := _MERIDIEMS.get("".join(tokens[idx:idx + length]))) is not None and idx + length == len(tokens):
+            return pm, idx + length
+    raise ValueError
+
+
+def _clock(tokens: list[str]) -> Fields:
+    # H[:MM[:SS[.ffffff]]] [am|pm], hours are unbounded without am/pm so it doubles as an elapsed time
+    if not tokens[0].isdigit():
+        raise ValueError
+    fields = [int(tokens[0]), 0, 0, 0]
+    idx, colons = 1, 0
+    while idx + 1 < len(tokens) and tokens[idx] == ":" and colons < 2 and tokens[idx + 1].isdigit():
+        colons += 1
+        if len(tokens[idx + 1]) != 2:
+            raise ValueError
+        fields[colons] = int(tokens[idx + 1])
+        idx += 2
+    if colons == 2 and idx + 1 < len(tokens) and tokens[idx] == "." and tokens[idx + 1].isdigit():
+        if len(tokens[idx + 1]) > 6:
+            raise ValueError
+        fields[3] = _fraction(tokens[idx + 1], _US["second"])
+        idx += 2
+    pm, idx = _meridiem(tokens, idx)
+    if idx != len(tokens) or fields[1] > 59 or fields[2] > 59 or (colons == 0 and pm is None):
+        raise ValueError
+    if pm is not None:
+        if not 1 <= fields[0] <= 12:
+            raise ValueError
+        fields[0] = fields[0] % 12 + (12 if pm else 0)
+    return fields[0], fields[1], fields[2], fields[3]
+
+
+def _units(tokens: list[str]) -> Fields:
+    # (N[.N] unit)+ like "2 hours 5 minutes", "1.5h" or "2h5m30s", a bare "N.N" is seconds
+    total, seen, idx = 0, set(), 0
+    while idx < len(tokens):
+        if not tokens[idx].isdigit():
+            raise ValueError
+        whole, frac = tokens[idx], ""
+        idx += 1
+        if idx + 1 < len(tokens) and tokens[idx] == "." and tokens[idx + 1].isdigit():
+            frac = tokens[idx + 1]
+            idx += 2
+        if idx == len(tokens) and frac and not seen:
+            unit = "second"
+        elif idx < len(tokens) and (unit := _UNITS.get(tokens[idx])) is not None and unit not in seen:
+            idx += 1
+        else:
+            raise ValueError
+        seen.add(unit)
+        total += int(whole) * _US[unit] + (_fraction(frac, _US[unit]) if frac else 0)
+    return _from_us(total)
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def _parse(value: str) -> Fields|None:
+    if not (tokens := _tokenize(value)):
+        return None
+    try:
+        return _clock(tokens) if not _CLOCK_MARKS.isdisjoint(tokens) else _units(tokens)
+    except ValueError:
+        return None
+
+
+def parse_time(value: str) -> TimeInfo|None:
+    """
+    a clock time (H:MM, H:MM:SS.ffffff, optionally am/pm) or a duration ("2 hours 5 minutes", "1.5h",
+    "90 min", "2.5" seconds) in one pass over the string. None when it's neither
+    """
+    return None if (fields := _parse(value)) is None else TimeInfo(*fields)
+
+
+def parse_durations(values: Iterable[str]) -> list[TimeInfo|None]:
+    # bulk imports, one pass per value and repeated values come from the cache
+    return [None if (fields := _parse(value)) is None else TimeInfo(*fields) for value in values]
+
+
+def total_seconds(info: TimeInfo) -> float:
+    return info.hours * 3600 + info.minute * 60 + info.second + info.microsecond / 1_000_000
+
+
+def to_time(info: TimeInfo) -> time:
+    # raises ValueError for durations of a day or more, they aren't a time of day
+    return time(info.hours, info.minute, info.second, info.microsecond)
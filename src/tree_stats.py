@@ -0,0 +1,84 @@
+from typing import Final, NamedTuple
+from sqlcipher3 import dbapi2 as sqlite
+from db import transaction
+
+
+# the stored values are kept current by the triggers in migrations/tree_stats.sql
+STORED_STATS_QUERY: Final[str] = """
+SELECT node_count, tree_height, tree_width, completion_percentage FROM trees WHERE id = ?
+"""
+# full recompute, depths come from walking node_edges down from the roots rather than nodes.depth
+RECOMPUTE_LEVELS_QUERY: Final[str] = """
+WITH RECURSIVE walk(id, depth) AS (
+  SELECT id, 0 FROM nodes WHERE tree_id = :tree AND parent_id = 0
+  UNION ALL
+  SELECT node_edges.child_id, walk.depth + 1 FROM node_edges JOIN walk ON node_edges.parent_id = walk.id
+)
+SELECT walk.depth, count(*), sum(nodes.status = 'complete')
+FROM walk JOIN nodes ON nodes.id = walk.id
+GROUP BY walk.depth
+"""
+TREE_NODE_COUNT_QUERY: Final[str] = "SELECT count(*), sum(status = 'complete') FROM nodes WHERE tree_id = ?"
+
+
+class TreeStats(NamedTuple):
+    node_count: int
+    tree_height: int
+    tree_width: int
+    completion_percentage: float
+
+
+def read_tree_stats(tree_id: int, conn: sqlite.Connection) -> TreeStats|None:
+    row = conn.execute(STORED_STATS_QUERY, (tree_id,)).fetchone()
+    return None if row is None else TreeStats(*row)
+
+
+def recompute_tree_stats(tree_id: int, conn: sqlite.Connection) -> TreeStats:
+    node_count, complete_count = conn.execute(TREE_NODE_COUNT_QUERY, (tree_id,)).fetchone()
+    levels = conn.execute(RECOMPUTE_LEVELS_QUERY, {"tree": tree_id}).fetchall()
+    return TreeStats(node_count,
+                     max((depth + 1 for depth, _, _ in levels), default=0),
+                     max((count for _, count, _ in levels), default=0),
+                     0.0 if node_count == 0 else 100.0 * (complete_count or 0) / node_count)
+
+
+def _stats_match(stored: float, actual: float) -> bool:
+    return abs(stored - actual) < 1e-9
+
+
+# returns {stat: (stored, actual)} for every stat that has drifted, fix=True writes the recomputed values
+# back and rebuilds the tree's depth/level bookkeeping
+def verify_tree_stats(tree_id: int, conn: sqlite.Connection, fix: bool=False) -> dict[str, tuple[float, float]]:
+    stored = read_tree_stats(tree_id, conn)
+    if stored is None:
+        raise KeyError(f"no tree with id {tree_id}")
+    actual = recompute_tree_stats(tree_id, conn)
+    diff = {stat: (stored_value, actual_value)
+            for stat, stored_value, actual_value in zip(TreeStats._fields, stored, actual)
+            if not _stats_match(stored_value, actual_value)}
+    if diff and fix:
+        rebuild_tree_stats(tree_id, conn)
+    return diff
+
+
+def rebuild_tree_stats(tree_id: int, conn: sqlite.Connection):
+    with transaction(conn, "IMMEDIATE"):
+        conn.execute("""
+            WITH RECURSIVE walk(id, depth) AS (
+              SELECT id, 0 FROM nodes WHERE tree_id = :tree AND parent_id = 0
+              UNION ALL
+              SELECT node_edges.child_id, walk.depth + 1 FROM node_edges JOIN walk ON node_edges.parent_id = walk.id
+            )
+            UPDATE nodes SET depth = walk.depth FROM walk WHERE nodes.id = walk.id
+            """, {"tree": tree_id})
+        conn.execute("DELETE FROM tree_levels WHERE tree_id = ?", (tree_id,))
+        conn.execute("""
+            INSERT INTO tree_levels(tree_id, depth, node_count)
+            SELECT tree_id, depth, count(*) FROM nodes WHERE tree_id = ? GROUP BY depth
+            """, (tree_id,))
+        stats = recompute_tree_stats(tree_id, conn)
+        conn.execute("""
+            UPDATE trees SET node_count = ?, tree_height = ?, tree_width = ?, completion_percentage = ?,
+            complete_count = (SELECT count(*) FROM nodes WHERE tree_id = trees.id AND status = 'complete')
+            WHERE id = ?
+            """, (*stats, tree_id))